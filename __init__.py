@@ -1,4 +1,3 @@
-from .main import MapCraftPlugin
-
 def classFactory(iface):
+    from .main import MapCraftPlugin  # Imported here, so tools and tests can import the package without QGIS
     return MapCraftPlugin(iface)
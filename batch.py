@@ -0,0 +1,358 @@
+import os
+import csv
+import json
+import time
+import multiprocessing
+from multiprocessing.util import Finalize
+from datetime import datetime
+from qgis.core import QgsApplication, QgsProxyProgressTask
+from qgis.PyQt.QtCore import QTimer
+from .export_task import EXPORT_PROFILES, parse_formats
+from .framing import ATLAS_MODES
+
+# Manifest columns and their defaults (same defaults as the dialog)
+JOB_DEFAULTS = {
+    "wtg": "",
+    "wtg_buffer": "",
+    "wtg_buffer_size": "",
+    "site_boundary": "",
+    "site_boundary_buffer": "",
+    "site_boundary_buffer_size": "",
+    "priority_area": "",
+    "potential_area": "",
+    "project_name": "",
+    "map_title": "Übersichtskarte",
+    "layout_size": "A3",
+    "basemap_type": "Topographic",
+    "state": "Baden-Württemberg",
+    "scale": "25000",
+    "atlas": "none",
+    "export_format": "PDF",
+    "export_profile": "print",
+    "output_folder": "",
+    "keep_layers": "false",
+    "force": "false",
+}
+
+# Columns holding file or folder paths, resolved relative to the manifest
+PATH_FIELDS = ["wtg", "wtg_buffer", "site_boundary", "site_boundary_buffer",
+               "priority_area", "potential_area", "output_folder"]
+
+REPORT_FIELDS = ["job", "project_name", "status", "seconds", "output_path", "error"]
+
+
+def normalize_job(raw_job, base_dir=""):
+    """
+    Fills in defaults and converts one manifest row into a job dict for MapCraftPlugin.generate_automated_map.
+
+    Raises:
+        ValueError: If the row contains unknown columns, an invalid scale, atlas mode, export format or profile.
+    """
+    unknown = [key for key in raw_job if key and key not in JOB_DEFAULTS]
+    if unknown:
+        raise ValueError(f"Unknown manifest columns: {', '.join(sorted(unknown))}")
+
+    job = dict(JOB_DEFAULTS)
+    for key, value in raw_job.items():
+        if isinstance(value, (list, tuple)):  # e.g. "export_format": ["PDF", "PNG"] in JSON manifests
+            value = "+".join(str(item) for item in value)
+        if value is not None and str(value).strip() != "":
+            job[key] = str(value).strip()
+
+    for key in PATH_FIELDS:
+        if job[key] and base_dir and not os.path.isabs(job[key]):
+            job[key] = os.path.normpath(os.path.join(base_dir, job[key]))
+
+    if job["scale"].lower() == "auto":
+        job["scale"] = "auto"  # Chosen from the extent of the inputs, see framing.AUTO_SCALE
+    else:
+        try:
+            job["scale"] = int(float(job["scale"]))
+        except ValueError:
+            raise ValueError(f"Invalid scale '{job['scale']}' for project '{job['project_name']}'")
+
+    job["atlas"] = job["atlas"].lower()
+    if job["atlas"] not in ATLAS_MODES:
+        raise ValueError(f"Invalid atlas mode '{job['atlas']}' for project '{job['project_name']}'")
+
+    # One or more formats, e.g. "PDF" or "PDF+PNG+TIFF"
+    try:
+        job["export_format"] = "+".join(parse_formats(job["export_format"]))
+    except ValueError:
+        raise ValueError(f"Invalid export format '{job['export_format']}' for project '{job['project_name']}'")
+
+    job["export_profile"] = job["export_profile"].lower()
+    if job["export_profile"] not in EXPORT_PROFILES:
+        raise ValueError(f"Invalid export profile '{job['export_profile']}' for project '{job['project_name']}'")
+
+    job["keep_layers"] = job["keep_layers"].lower() in ("1", "true", "yes", "y")
+    job["force"] = job["force"].lower() in ("1", "true", "yes", "y")
+    return job
+
+
+def read_manifest(manifest_path):
+    """
+    Reads a job manifest.
+
+    CSV manifests have one job per row (comma or semicolon separated). JSON manifests are
+    either a list of jobs or {"defaults": {...}, "jobs": [...]}. Relative paths are resolved
+    against the folder of the manifest.
+
+    Returns:
+        list[dict]: Normalized jobs.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    defaults = {}
+
+    if manifest_path.lower().endswith(".json"):
+        with open(manifest_path, 'r', encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            defaults = data.get("defaults", {})
+            rows = data.get("jobs", [])
+        else:
+            rows = data
+    else:
+        with open(manifest_path, 'r', encoding="utf-8-sig", newline="") as f:
+            content = f.read()
+        first_line = content.split("\n", 1)[0]
+        delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+        rows = list(csv.DictReader(content.splitlines(), delimiter=delimiter))
+
+    return [normalize_job({**defaults, **row}, base_dir) for row in rows]
+
+
+def default_report_path(manifest_path):
+    """
+    Returns the report path used for a manifest: <manifest>_report_<timestamp>.csv next to it.
+    """
+    stem = os.path.splitext(manifest_path)[0]
+    return f"{stem}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+
+
+def write_report(results, report_path, wall_seconds=None):
+    """
+    Writes the per-job results as CSV, or as JSON when report_path ends with .json.
+    wall_seconds is the elapsed time of the whole batch (lower than the job sum when running in parallel).
+    """
+    if report_path.lower().endswith(".json"):
+        summary = {
+            "total": len(results),
+            "succeeded": sum(1 for result in results if result["status"] == "success"),
+            "seconds": round(sum(result["seconds"] for result in results), 2),
+            "wall_seconds": wall_seconds,
+            "jobs": results,
+        }
+        with open(report_path, 'w', encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return
+
+    with open(report_path, 'w', encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def job_result(index, job, status="success"):
+    """
+    Returns an empty report row of a job.
+    """
+    return {"job": index, "project_name": job["project_name"], "status": status,
+            "seconds": 0.0, "output_path": "", "error": ""}
+
+
+def run_job(plugin, index, job):
+    """
+    Runs one job and returns its report row. Errors are recorded, never raised.
+    """
+    result = job_result(index, job)
+    start = time.perf_counter()
+    try:
+        result["output_path"] = "; ".join(plugin.generate_automated_map(job, background=False))
+    except Exception as e:  # One broken job must not stop the whole batch
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    print("MapCraft batch", f"[{index}] {job['project_name']}: {result['status']} ({result['seconds']} s)")
+    return result
+
+
+def run_batch(plugin, jobs, report_path=None):
+    """
+    Generates one map per job with the automated pipeline, sharing templates and basemaps between jobs.
+
+    Args:
+        plugin (MapCraftPlugin): Plugin instance (iface may be None when running headless).
+        jobs (list[dict]): Jobs as returned by read_manifest().
+        report_path (str): Optional CSV/JSON report path.
+
+    Returns:
+        list[dict]: One report row per job.
+    """
+    results = []
+    start = time.perf_counter()
+    plugin.basemap_pool = {}
+    try:
+        for index, job in enumerate(jobs, start=1):
+            results.append(run_job(plugin, index, job))
+    finally:
+        finish_batch(plugin, results, report_path, start)
+    return results
+
+
+def run_batch_async(plugin, jobs, report_path=None, on_finished=None):
+    """
+    Like run_batch, but for the QGIS desktop: each map is exported by a background export task, and the next
+    job starts from the event loop once the export of the previous one ended. Building a map (opening the
+    inputs, loading the basemap, filling the layout) still runs on the main thread, so QGIS is busy while a map
+    is built but not while it is rendered and written.
+
+    The batch is shown in the task manager with its progress and can be canceled there; the running map
+    finishes, the remaining jobs are reported as canceled. on_finished(results) is called at the end.
+
+    Returns:
+        QgsProxyProgressTask: Task of the batch, cancel() stops it after the running map.
+    """
+    task = QgsProxyProgressTask(f"MapCraft batch: {len(jobs)} maps")
+    QgsApplication.taskManager().addTask(task)
+    results = []
+    start = time.perf_counter()
+    plugin.basemap_pool = {}
+
+    def start_job(index, job):
+        result = job_result(index, job)
+        job_start = time.perf_counter()
+
+        def job_exported(success, error):
+            if not success:
+                result["status"], result["error"] = "failed", error
+            result["seconds"] = round(time.perf_counter() - job_start, 2)
+            print("MapCraft batch", f"[{index}] {job['project_name']}: {result['status']} ({result['seconds']} s)")
+            results.append(result)
+            task.setProxyProgress(100 * index / len(jobs))
+            QTimer.singleShot(0, next_job)
+
+        try:
+            result["output_path"] = "; ".join(plugin.generate_automated_map(job, background=True,
+                                                                           on_exported=job_exported))
+        except Exception as e:  # One broken job must not stop the whole batch
+            job_exported(False, str(e))
+
+    def next_job():
+        index = len(results) + 1
+        if index <= len(jobs) and not task.isCanceled():
+            start_job(index, jobs[index - 1])
+            return
+
+        for index, job in enumerate(jobs[len(results):], start=len(results) + 1):
+            results.append(job_result(index, job, "canceled"))
+        finish_batch(plugin, results, report_path, start)
+        task.finalize(not task.isCanceled())
+        if on_finished:
+            on_finished(results)
+
+    QTimer.singleShot(0, next_job)
+    return task
+
+
+def finish_batch(plugin, results, report_path, start):
+    """
+    Removes the shared basemaps of a batch, reports leaked resources and writes the report.
+    """
+    release_batch(plugin)
+    if report_path:
+        write_report(results, report_path, round(time.perf_counter() - start, 2))
+
+
+def release_batch(plugin):
+    """
+    Removes the shared basemaps of a batch and reports the resources its runs left behind.
+    """
+    plugin.release_basemap_pool()
+
+    from .layer_store import leak_counts
+    leaks = leak_counts()
+    if any(leaks.values()):
+        print("MapCraft batch", f"Resources left behind by the batch: {leaks}")
+
+
+def start_qgis(profile_folder=""):
+    """
+    Starts a QgsApplication without GUI. Uses the offscreen Qt platform unless another one is configured.
+
+    Args:
+        profile_folder (str): QGIS profile folder holding the settings, the user's default profile if empty.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    qgs = QgsApplication([], False, profile_folder)
+    qgs.initQgis()
+    return qgs
+
+
+# Per worker process state, set up once by _init_worker
+_worker_qgis = None
+_worker_plugin = None
+
+
+def _init_worker():
+    """
+    Starts a private QGIS instance in a worker process. Basemaps are shared between the jobs of the worker.
+    """
+    global _worker_qgis, _worker_plugin
+    from .main import MapCraftPlugin
+
+    _worker_qgis = start_qgis()
+    _worker_plugin = MapCraftPlugin(None)
+    _worker_plugin.basemap_pool = {}
+    # Worker processes end with os._exit(), atexit handlers do not run but multiprocessing finalizers do
+    Finalize(None, _shutdown_worker, exitpriority=10)
+
+
+def _shutdown_worker():
+    """
+    Releases the shared basemaps of a worker process, reports its leaks and stops its QGIS instance.
+    """
+    global _worker_qgis, _worker_plugin
+    if _worker_plugin is not None:
+        release_batch(_worker_plugin)
+        _worker_plugin = None
+    if _worker_qgis is not None:
+        _worker_qgis.exitQgis()
+        _worker_qgis = None
+
+
+def _run_worker_job(indexed_job):
+    index, job = indexed_job
+    return run_job(_worker_plugin, index, job)
+
+
+def run_batch_parallel(jobs, workers, report_path=None):
+    """
+    Like run_batch, but spreads the jobs over a pool of worker processes, each with its own QgsApplication.
+
+    Only meant for the headless runner: inside the QGIS desktop, sys.executable is QGIS itself, not Python.
+
+    Args:
+        jobs (list[dict]): Jobs as returned by read_manifest().
+        workers (int): Number of worker processes.
+        report_path (str): Optional CSV/JSON report path.
+
+    Returns:
+        list[dict]: One report row per job, in manifest order.
+    """
+    workers = max(1, min(workers, len(jobs)))
+    start = time.perf_counter()
+
+    # spawn: every worker starts from a clean interpreter, forking an initialized QGIS is not safe
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=workers, initializer=_init_worker) as pool:
+        results = list(pool.imap_unordered(_run_worker_job, enumerate(jobs, start=1)))
+        # Let the workers exit on their own, so they run _shutdown_worker (terminate() would kill them)
+        pool.close()
+        pool.join()
+    results.sort(key=lambda result: result["job"])
+
+    if report_path:
+        write_report(results, report_path, round(time.perf_counter() - start, 2))
+    return results
@@ -0,0 +1,432 @@
+"""
+Benchmark harness for MapCraft, without the QGIS desktop and without the real basemap servers.
+
+Generates synthetic wind park shapefiles, serves WMS and XYZ basemaps from a local stand-in server with a
+configurable latency and times the automated pipeline (total and per stage) for every combination of
+feature count, geometry complexity, layout size and scale. Run from the folder that contains the plugin folder:
+
+    python -m MapCraft.benchmark --sizes 10 1000 --layouts A3 --scales 10000 25000 --latency 0.05
+    python -m MapCraft.benchmark --compare benchmark_results/1.0_20260101T120000.json benchmark_results/1.0_20260201T120000.json
+
+The print templates of the plugin folder are used, so the templates must be installed next to the plugin.
+"""
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import struct
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+
+# Center of the synthetic wind park (EPSG:25832, near Stuttgart)
+CENTER = (513000, 5403000)
+
+# Distance between neighbouring WTGs in m
+WTG_SPACING = 450
+
+# Name of the layer offered by the stand-in WMS
+STAND_IN_LAYER = "mapcraft_benchmark"
+
+
+def png_image(width, height, rgb):
+    """
+    Returns a PNG of one color, encoded without Qt so it can be built in the server threads.
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    row = b"\x00" + bytes(rgb) * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(row * height, 1))
+            + chunk(b"IEND", b""))
+
+
+def capabilities_xml(base_url):
+    """
+    Returns a minimal WMS 1.3.0 capabilities document offering the stand-in layer in both UTM zones.
+    """
+    online_resource = f'<OnlineResource xmlns:xlink="http://www.w3.org/1999/xlink" xlink:href="{base_url}/wms?"/>'
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<WMS_Capabilities version="1.3.0" xmlns="http://www.opengis.net/wms">
+  <Service><Name>WMS</Name><Title>MapCraft benchmark</Title>{online_resource}</Service>
+  <Capability>
+    <Request>
+      <GetCapabilities><Format>text/xml</Format>
+        <DCPType><HTTP><Get>{online_resource}</Get></HTTP></DCPType></GetCapabilities>
+      <GetMap><Format>image/png</Format>
+        <DCPType><HTTP><Get>{online_resource}</Get></HTTP></DCPType></GetMap>
+    </Request>
+    <Exception><Format>XML</Format></Exception>
+    <Layer queryable="0">
+      <Name>{STAND_IN_LAYER}</Name><Title>MapCraft benchmark</Title>
+      <CRS>EPSG:25832</CRS><CRS>EPSG:25833</CRS><CRS>EPSG:3857</CRS><CRS>EPSG:4326</CRS>
+      <EX_GeographicBoundingBox>
+        <westBoundLongitude>5</westBoundLongitude><eastBoundLongitude>16</eastBoundLongitude>
+        <southBoundLatitude>47</southBoundLatitude><northBoundLatitude>56</northBoundLatitude>
+      </EX_GeographicBoundingBox>
+    </Layer>
+  </Capability>
+</WMS_Capabilities>""".encode("utf-8")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers WMS GetCapabilities/GetMap requests on /wms and XYZ tile requests on /xyz/{z}/{x}/{y}.png.
+    """
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        params = {key.upper(): value for key, value in parse_qsl(url.query)}
+        self.server.requests += 1
+        self.server.paths.append(self.path)
+
+        if url.path.startswith("/xyz/"):
+            self.reply(self.server.image(256, 256), "image/png")
+        elif url.path == "/wms" and params.get("REQUEST", "").lower() == "getcapabilities":
+            self.reply(capabilities_xml(self.server.base_url), "text/xml")
+        elif url.path == "/wms" and params.get("REQUEST", "").lower() == "getmap":
+            self.reply(self.server.image(int(params.get("WIDTH", 256)), int(params.get("HEIGHT", 256))), "image/png")
+        else:
+            self.send_error(404)
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the benchmark output readable
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the state WMS and the XYZ tile servers, delaying every answer by latency seconds.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self.requests = 0
+        self.paths = []  # Request paths with their query, in the order they arrived
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def image(self, width, height):
+        with self._lock:
+            if (width, height) not in self._images:
+                self._images[(width, height)] = png_image(width, height, (228, 222, 206))
+            return self._images[(width, height)]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def use_stand_in(main_module, base_url):
+    """
+    Points the basemap configurations of the plugin module at the stand-in server (this process only).
+    """
+    for state_conf in main_module.STATE_SETTINGS.values():
+        for scale_conf in state_conf["scales"].values():
+            scale_conf["wms_url"] = f"{base_url}/wms?"
+            scale_conf["layer_name"] = STAND_IN_LAYER
+    for xyz_settings in main_module.XYZ_BASEMAPS.values():
+        xyz_settings["basemap"]["url"] = f"{base_url}/xyz/{{z}}/{{x}}/{{y}}.png"
+
+
+def write_shapefile(path, geometry_type, geometries, layout_value=None):
+    """
+    Writes geometries (OGR) to a shapefile in EPSG:25832, with a LAYOUT field when layout_value is given.
+    """
+    from osgeo import ogr, osr
+
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    if os.path.exists(path):
+        driver.DeleteDataSource(path)
+    data_source = driver.CreateDataSource(path)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(25832)
+    layer = data_source.CreateLayer(os.path.splitext(os.path.basename(path))[0], srs, geometry_type)
+    if layout_value is not None:
+        layer.CreateField(ogr.FieldDefn("LAYOUT", ogr.OFTString))
+    for geometry in geometries:
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetGeometry(geometry)
+        if layout_value is not None:
+            feature.SetField("LAYOUT", layout_value)
+        layer.CreateFeature(feature)
+    data_source = None  # Flush to disk
+    return path
+
+
+def write_fixtures(folder, features, complexity):
+    """
+    Writes a synthetic wind park: WTG points on a jittered grid, rotor buffers, site boundary, boundary buffer,
+    potential and priority area. "complex" geometries have round buffers and boundaries densified to 5 m.
+
+    Returns:
+        dict: Job inputs (manifest keys) pointing to the shapefiles.
+    """
+    from osgeo import ogr
+
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(features)  # Same park for the same size in every run
+    segments = 64 if complexity == "complex" else 8
+    side = math.ceil(math.sqrt(features))
+
+    points = []
+    for index in range(features):
+        point = ogr.Geometry(ogr.wkbPoint)
+        point.AddPoint_2D(CENTER[0] + (index % side - side / 2) * WTG_SPACING + rng.uniform(-60, 60),
+                          CENTER[1] + (index // side - side / 2) * WTG_SPACING + rng.uniform(-60, 60))
+        points.append(point)
+    buffers = [point.Buffer(80, segments) for point in points]
+
+    collection = ogr.Geometry(ogr.wkbMultiPoint)
+    for point in points:
+        collection.AddGeometry(point)
+    boundary = collection.ConvexHull().Buffer(300, segments)
+    boundary_buffer = boundary.Buffer(400, segments)
+    potential_area = boundary.Buffer(1500, segments)
+    priority_area = boundary.Buffer(800, segments)
+    if complexity == "complex":
+        for geometry in (boundary, boundary_buffer, potential_area, priority_area):
+            geometry.Segmentize(5)
+
+    name = f"{features}_{complexity}"
+    return {
+        "wtg": write_shapefile(os.path.join(folder, f"wtg_{name}.shp"), ogr.wkbPoint, points, "V1"),
+        "wtg_buffer": write_shapefile(os.path.join(folder, f"wtg_buffer_{name}.shp"), ogr.wkbPolygon, buffers),
+        "wtg_buffer_size": "80",
+        "site_boundary": write_shapefile(os.path.join(folder, f"site_{name}.shp"), ogr.wkbPolygon, [boundary]),
+        "site_boundary_buffer": write_shapefile(os.path.join(folder, f"site_buffer_{name}.shp"), ogr.wkbPolygon,
+                                                [boundary_buffer]),
+        "site_boundary_buffer_size": "400",
+        "potential_area": write_shapefile(os.path.join(folder, f"potential_{name}.shp"), ogr.wkbPolygon,
+                                          [potential_area]),
+        "priority_area": write_shapefile(os.path.join(folder, f"priority_{name}.shp"), ogr.wkbPolygon,
+                                         [priority_area]),
+    }
+
+
+def read_stages(output_folder):
+    """
+    Returns {stage: seconds} of the last run logged in the profile log of an output folder.
+    """
+    from .profiling import PROFILE_LOG
+
+    return last_run_stages(os.path.join(output_folder, PROFILE_LOG))
+
+
+def last_run_stages(path):
+    """
+    Returns {stage: seconds} of the last run of a profile log (mapcraft_profile.jsonl), {} if there is none.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines:
+        return {}
+    run = lines[-1]["run"]
+    return {line["stage"]: round(line["seconds"], 4) for line in lines if line["run"] == run}
+
+
+def plugin_version():
+    """
+    Returns the plugin version from metadata.txt and the git commit of the plugin folder, if any.
+    """
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    version = "unknown"
+    try:
+        with open(os.path.join(plugin_dir, "metadata.txt"), encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("version="):
+                    version = line.split("=", 1)[1].strip()
+    except OSError:
+        pass
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=plugin_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return version, commit
+
+
+def run_benchmark(args):
+    """
+    Runs every case of the matrix and writes the results file.
+
+    Returns:
+        str: Path of the results file.
+    """
+    from .batch import start_qgis
+
+    # QGIS runs on a throw-away profile in the work folder, so the benchmark settings never reach the user's
+    # profile, even if the run is interrupted
+    work_dir = tempfile.mkdtemp(prefix="mapcraft_benchmark_")
+    qgs = start_qgis(os.path.join(work_dir, "profile"))
+    server = StandInServer(args.latency).start()
+    try:
+        from qgis.core import Qgis, QgsSettings
+        from . import main as main_module
+
+        # Caches and profile log stay in the work folder. Every map is exported and rendered in full: no
+        # skipping of unchanged maps and no pre-rendered map frames.
+        settings = QgsSettings()
+        settings.setValue("MapCraft/cache_dir", os.path.join(work_dir, "cache"))
+        settings.setValue("MapCraft/profiling/enabled", True)
+        settings.setValue("MapCraft/incremental/enabled", False)
+        settings.setValue("MapCraft/frame_cache/enabled", False)
+        use_stand_in(main_module, server.base_url)
+
+        plugin = main_module.MapCraftPlugin(None)
+        cases = []
+        for features in args.sizes:
+            for complexity in args.complexity:
+                inputs = write_fixtures(os.path.join(work_dir, "fixtures"), features, complexity)
+                for layout_size in args.layouts:
+                    for scale in args.scales:
+                        cases.append(run_case(plugin, inputs, work_dir, features, complexity, layout_size,
+                                              scale, args))
+
+        version, commit = plugin_version()
+        results = {
+            "version": version,
+            "commit": commit,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "qgis": Qgis.version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "repeat": args.repeat,
+            "server_requests": server.requests,
+            "cases": cases,
+        }
+    finally:
+        server.shutdown()
+        qgs.exitQgis()
+
+    os.makedirs(args.results, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    results_path = os.path.join(args.results, f"{version}_{stamp}.json")
+    with open(results_path, 'w', encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return results_path
+
+
+def run_case(plugin, inputs, work_dir, features, complexity, layout_size, scale, args):
+    """
+    Exports one case args.repeat times. The first run starts with empty basemap caches.
+    """
+    from .layer_store import leak_counts
+
+    name = f"{features}_{complexity}_{layout_size}_{scale}_{args.basemap}"
+    job = dict(inputs, project_name=f"Benchmark {features}", map_title="Benchmark", layout_size=layout_size,
+               basemap_type=args.basemap, state=args.state, scale=int(scale), atlas="none", export_format="PDF",
+               export_profile="print", keep_layers=False)
+
+    for cache in (plugin.get_tile_cache(), plugin.get_wms_cache(), plugin.get_frame_cache()):
+        if cache is not None:
+            cache.disk_cache.invalidate()
+
+    runs = []
+    for repeat in range(args.repeat):
+        job["output_folder"] = os.path.join(work_dir, "out", name, str(repeat))
+        os.makedirs(job["output_folder"], exist_ok=True)
+        start = time.perf_counter()
+        try:
+            plugin.generate_automated_map(job, background=False)
+            status, error = "success", ""
+        except Exception as e:
+            status, error = "failed", str(e)
+        runs.append({
+            "seconds": round(time.perf_counter() - start, 4),
+            "status": status,
+            "error": error,
+            "cold": repeat == 0,
+            "stages": read_stages(job["output_folder"]),
+            "leaks": leak_counts(),  # Should stay all zero, every run releases what it created
+        })
+    print(f"mapcraft benchmark: {name}: " + ", ".join(f"{run['seconds']:.2f} s" if run["status"] == "success"
+                                                      else "failed" for run in runs))
+    return {"case": name, "features": features, "complexity": complexity, "layout_size": layout_size,
+            "scale": int(scale), "basemap_type": args.basemap, "runs": runs}
+
+
+def median_seconds(case, cold):
+    seconds = [run["seconds"] for run in case["runs"] if run["status"] == "success" and run["cold"] == cold]
+    return statistics.median(seconds) if seconds else None
+
+
+def compare(old_path, new_path):
+    """
+    Prints the median cold and warm times of the cases found in both result files.
+    """
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{'case':<40} {'cold old':>9} {'cold new':>9} {'warm old':>9} {'warm new':>9} {'ratio':>6}")
+    old_cases = {case["case"]: case for case in old["cases"]}
+    for case in new["cases"]:
+        if case["case"] not in old_cases:
+            continue
+        values = []
+        for cold in (True, False):
+            values += [median_seconds(old_cases[case["case"]], cold), median_seconds(case, cold)]
+
+        # New / old of the warm runs, or of the cold runs when there are no warm ones
+        ratio = None
+        for old_seconds, new_seconds in ((values[2], values[3]), (values[0], values[1])):
+            if old_seconds and new_seconds:
+                ratio = f"{new_seconds / old_seconds:6.2f}"
+                break
+        cells = [f"{value:9.2f}" if value is not None else f"{'-':>9}" for value in values]
+        print(f"{case['case']:<40} " + " ".join(cells) + " " + (ratio or f"{'-':>6}"))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="mapcraft-benchmark", description="Benchmark the MapCraft pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="Number of WTGs per synthetic park (default: 10 100 1000 10000)")
+    parser.add_argument("--complexity", nargs="+", choices=["simple", "complex"], default=["simple", "complex"])
+    parser.add_argument("--layouts", nargs="+", choices=["A3", "A4"], default=["A3", "A4"])
+    parser.add_argument("--scales", nargs="+", choices=["10000", "15000", "25000", "50000"],
+                        default=["10000", "15000", "25000", "50000"])
+    parser.add_argument("--basemap", choices=["Topographic", "Satellite", "OpenStreetMap"], default="Topographic")
+    parser.add_argument("--state", default="Baden-Württemberg")
+    parser.add_argument("--latency", type=float, default=0.05, help="Delay of every stand-in answer in s")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the first one with empty caches")
+    parser.add_argument("--results", default="benchmark_results", help="Folder for the results files")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files and exit")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    print(f"mapcraft benchmark: results written to {run_benchmark(args)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import os
+import time
+import shutil
+import sqlite3
+import threading
+from qgis.core import QgsApplication, QgsSettings, QgsNetworkAccessManager
+from qgis.PyQt.QtCore import QUrl
+from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
+from .profiling import current_profiler
+
+
+def cache_root():
+    """
+    Returns the folder for MapCraft caches (setting MapCraft/cache_dir, default inside the QGIS profile).
+    """
+    default = os.path.join(QgsApplication.qgisSettingsDirPath(), "mapcraft_cache")
+    return QgsSettings().value("MapCraft/cache_dir", default)
+
+
+def fetch_url(url, profiler=None):
+    """
+    Downloads a URL through the QGIS network manager (proxy and SSL settings of the profile apply).
+
+    Args:
+        profiler (StageProfiler or None): Profiler the request is counted for, defaults to the one of this
+            thread. Download threads get it passed from the thread that builds the map.
+
+    Returns:
+        bytes or None: The response body, or None on network errors.
+    """
+    profiler = profiler or current_profiler()
+    request = QNetworkRequest(QUrl(url))
+    request.setRawHeader(b"User-Agent", b"MapCraft QGIS plugin")
+    started = time.perf_counter()
+    reply = QgsNetworkAccessManager.blockingGet(request)
+    if profiler is not None:
+        profiler.record_request(url, time.perf_counter() - started)
+    if reply.error() != QNetworkReply.NoError:
+        return None
+    return bytes(reply.content())
+
+
+class DiskCache:
+    """
+    File cache with a size limit, LRU eviction and a time to live.
+
+    Entries are stored as <directory>/<namespace>/<key>, so a namespace can be used directly as a
+    folder (e.g. as the root of an XYZ file URL). The index lives in a SQLite database next to the
+    files, which lets several MapCraft processes share one cache.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, ttl_seconds=30 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT, key TEXT, size INTEGER, created REAL, accessed REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.commit()
+
+    def path(self, namespace, key):
+        """
+        Returns the file path of an entry, whether it exists or not.
+        """
+        parts = [namespace] + key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"Invalid cache key: {namespace}/{key}")
+        return os.path.join(self.directory, *parts)
+
+    def get(self, namespace, key):
+        """
+        Returns the file path of a valid entry and marks it as used, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT created FROM entries WHERE namespace = ? AND key = ?",
+                                   (namespace, key)).fetchone()
+            if row is None:
+                return None
+
+            path = self.path(namespace, key)
+            if now - row[0] > self.ttl_seconds or not os.path.exists(path):
+                self._remove(namespace, key)
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+            self._db.commit()
+            return path
+
+    def put(self, namespace, key, data):
+        """
+        Stores data (bytes) for an entry and returns its file path.
+        """
+        path = self.path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see half written files
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                             (namespace, key, len(data), now, now))
+            self._db.commit()
+        return path
+
+    def evict(self):
+        """
+        Removes expired entries, then the least recently used ones until the cache fits max_bytes.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        removed = 0
+        with self._lock:
+            expired = self._db.execute("SELECT namespace, key FROM entries WHERE created < ?",
+                                       (time.time() - self.ttl_seconds,)).fetchall()
+            for namespace, key in expired:
+                self._remove(namespace, key)
+                removed += 1
+
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._db.execute("SELECT namespace, key, size FROM entries ORDER BY accessed").fetchall()
+                for namespace, key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self._remove(namespace, key)
+                    total -= size
+                    removed += 1
+            self._db.commit()
+        return removed
+
+    def invalidate(self, namespace=None):
+        """
+        Removes all entries of a namespace, or the whole cache when namespace is None.
+        """
+        with self._lock:
+            if namespace is None:
+                namespaces = [row[0] for row in self._db.execute("SELECT DISTINCT namespace FROM entries")]
+                self._db.execute("DELETE FROM entries")
+            else:
+                namespaces = [namespace]
+                self._db.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._db.commit()
+
+        for name in namespaces:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def stats(self):
+        """
+        Returns {"entries": int, "bytes": int} for the whole cache.
+        """
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size}
+
+    def _remove(self, namespace, key):
+        # Caller holds the lock and commits
+        self._db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        try:
+            os.remove(self.path(namespace, key))
+        except OSError:
+            pass
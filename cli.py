@@ -0,0 +1,188 @@
+"""
+Command line runner for MapCraft, without the QGIS desktop.
+
+Run from the folder that contains the plugin folder, e.g.:
+
+    python -m MapCraft.cli --wtg layout.shp --project-name Winterlingen --output-folder out
+    python -m MapCraft.cli --manifest jobs.csv --report report.csv --workers 8
+    python -m MapCraft.cli --manifest jobs.csv --seed-tiles
+    python -m MapCraft.cli --wtg layout.shp --project-name Winterlingen --scale 10000 --prefetch
+    python -m MapCraft.cli --invalidate-wms Hessen
+
+Exit codes: 0 if every map was exported, 1 if at least one job failed, 2 for invalid arguments or manifests.
+"""
+import os
+import sys
+import argparse
+
+from .batch import (JOB_DEFAULTS, normalize_job, read_manifest, run_batch, run_batch_parallel,
+                    default_report_path, start_qgis)
+from .export_task import EXPORT_PROFILES
+from .framing import ATLAS_MODES
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="mapcraft", description="Generate MapCraft wind park maps without the QGIS desktop.")
+    parser.add_argument("--manifest", help="CSV/JSON job manifest. Single-job options below are ignored when given.")
+    parser.add_argument("--report", help="Report path (.csv or .json). Defaults to a report next to the manifest.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes, each with its own QGIS instance (default: 1)")
+    parser.add_argument("--seed-tiles", action="store_true",
+                        help="Only download the XYZ basemap tiles of the map extents into the tile cache, no export")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Only download the basemap of the map extents into offline GeoPackages, no export")
+    parser.add_argument("--invalidate-wms", metavar="STATE",
+                        help="Remove the cached WMS images of a state (or 'all') and exit")
+
+    job = parser.add_argument_group("single job")
+    job.add_argument("--wtg", help="WTG layout SHP")
+    job.add_argument("--wtg-buffer", help="WTG buffer SHP")
+    job.add_argument("--wtg-buffer-size", help="WTG buffer distance in m")
+    job.add_argument("--site-boundary", help="Site boundary SHP")
+    job.add_argument("--site-boundary-buffer", help="Site boundary buffer SHP")
+    job.add_argument("--site-boundary-buffer-size", help="Site boundary buffer distance in m")
+    job.add_argument("--priority-area", help="Wind priority area SHP")
+    job.add_argument("--potential-area", help="Wind potential area SHP")
+    job.add_argument("--project-name")
+    job.add_argument("--map-title")
+    job.add_argument("--layout-size", choices=["A3", "A4"])
+    job.add_argument("--basemap-type", choices=["Topographic", "Satellite", "OpenStreetMap"])
+    job.add_argument("--state")
+    job.add_argument("--scale", choices=["10000", "15000", "25000", "50000", "auto"])
+    job.add_argument("--atlas", choices=ATLAS_MODES, help="Print several pages into one PDF")
+    job.add_argument("--export-format", help="PDF, PNG, SVG or TIFF, several joined by '+', e.g. PDF+PNG")
+    job.add_argument("--export-profile", choices=list(EXPORT_PROFILES),
+                     help="Export quality: draft (120 dpi), review (200 dpi) or print (300 dpi, default)")
+    job.add_argument("--output-folder")
+    job.add_argument("--force", action="store_true", default=None,
+                     help="Export even if nothing changed since the last export")
+    return parser
+
+
+def jobs_from_args(args):
+    """
+    Returns the jobs to run: the manifest jobs, or one job built from the command line options.
+    """
+    if args.manifest:
+        return read_manifest(args.manifest)
+
+    raw_job = {key: getattr(args, key) for key in JOB_DEFAULTS if getattr(args, key, None) is not None}
+    return [normalize_job(raw_job, os.getcwd())]
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.invalidate_wms:
+        return invalidate_wms(args.invalidate_wms)
+
+    try:
+        jobs = jobs_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"mapcraft: {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("mapcraft: no jobs to run", file=sys.stderr)
+        return 2
+
+    report_path = args.report
+    if not report_path and args.manifest:
+        report_path = default_report_path(args.manifest)
+
+    if args.seed_tiles:
+        return seed_tiles(jobs)
+    if args.prefetch:
+        return prefetch(jobs)
+
+    if args.workers > 1 and len(jobs) > 1:
+        results = run_batch_parallel(jobs, args.workers, report_path)
+        return report_failures(results)
+
+    qgs = start_qgis()
+    try:
+        from .main import MapCraftPlugin
+
+        plugin = MapCraftPlugin(None)
+        results = run_batch(plugin, jobs, report_path)
+    finally:
+        qgs.exitQgis()
+    return report_failures(results)
+
+
+def invalidate_wms(state):
+    """
+    Clears the WMS image cache of one state, or of all states.
+    """
+    qgs = start_qgis()
+    try:
+        from .tile_cache import provider_key
+        from .wms_cache import WmsCache
+
+        wms_cache = WmsCache.from_settings()
+        if wms_cache is None:
+            print("mapcraft: the WMS cache is disabled", file=sys.stderr)
+            return 2
+        wms_cache.invalidate(None if state == "all" else provider_key(state))
+    finally:
+        qgs.exitQgis()
+    print(f"mapcraft: WMS cache cleared for {state}")
+    return 0
+
+
+def seed_tiles(jobs):
+    """
+    Pre-seeds the tile cache for every job and returns the process exit code.
+    """
+    qgs = start_qgis()
+    failed = 0
+    try:
+        from .main import MapCraftPlugin
+
+        plugin = MapCraftPlugin(None)
+        for index, job in enumerate(jobs, start=1):
+            try:
+                zoom = plugin.seed_job_tiles(job)
+                print(f"mapcraft: job {index} ({job['project_name']}) seeded at zoom {zoom}")
+            except Exception as e:
+                failed += 1
+                print(f"mapcraft: job {index} ({job['project_name']}) not seeded: {e}", file=sys.stderr)
+    finally:
+        qgs.exitQgis()
+    return 1 if failed else 0
+
+
+def prefetch(jobs):
+    """
+    Writes the offline basemap package of every job and returns the process exit code.
+    """
+    qgs = start_qgis()
+    failed = 0
+    try:
+        from .main import MapCraftPlugin
+
+        plugin = MapCraftPlugin(None)
+        for index, job in enumerate(jobs, start=1):
+            try:
+                path = plugin.prefetch_basemap(job)
+                print(f"mapcraft: job {index} ({job['project_name']}) basemap saved to {path}")
+            except Exception as e:
+                failed += 1
+                print(f"mapcraft: job {index} ({job['project_name']}) not prefetched: {e}", file=sys.stderr)
+    finally:
+        qgs.exitQgis()
+    return 1 if failed else 0
+
+
+def report_failures(results):
+    """
+    Prints failed jobs to stderr and returns the process exit code.
+    """
+    failed = [result for result in results if result["status"] != "success"]
+    for result in failed:
+        print(f"mapcraft: job {result['job']} ({result['project_name']}) failed: {result['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
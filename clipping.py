@@ -0,0 +1,106 @@
+import os
+from qgis.core import (QgsRectangle, QgsCoordinateTransform, QgsProject, QgsVectorLayer, QgsFeature,
+                       QgsFeatureRequest, QgsWkbTypes, QgsMapLayerStyle)
+
+# Paper distance kept around the map frame when clipping, wider than the thickest outline
+CLIP_MARGIN_MM = 10
+
+# Simplification tolerance in output pixels, deviations below it are not visible in the export
+PIXEL_TOLERANCE = 0.5
+
+# Clipped layers kept in memory by MapCraftPlugin.prepare_area_layer
+AREA_CACHE_SIZE = 16
+
+
+def print_tolerance(scale, dpi):
+    """
+    Returns the ground distance in metres below which a map printed at scale and dpi shows no difference.
+    """
+    pixel_size = scale * 0.0254 / dpi  # Metres covered by one output pixel
+    return pixel_size * PIXEL_TOLERANCE
+
+
+def clip_rect(extent, crs, layer_crs, scale):
+    """
+    Returns extent (QgsRectangle in crs) plus the clip margin, in the CRS of the layer.
+    """
+    rect = QgsRectangle(extent)
+    rect.grow(CLIP_MARGIN_MM * scale / 1000)
+    if crs != layer_crs:
+        rect = QgsCoordinateTransform(crs, layer_crs, QgsProject.instance()).transformBoundingBox(rect)
+    return rect
+
+
+def source_key(layer):
+    """
+    Identifies the data of a layer: its source and the size and modification time of its files.
+    """
+    source = layer.source()
+    stem, extension = os.path.splitext(source.split("|")[0])
+    files = [stem + part for part in (".shp", ".dbf")] if extension.lower() == ".shp" else [source.split("|")[0]]
+    stats = tuple((os.path.getsize(path), os.path.getmtime(path)) for path in files if os.path.isfile(path))
+    return source, stats
+
+
+def clip_features(layer, rect, tolerance):
+    """
+    Reads the features of layer inside rect, clipped to rect and simplified with tolerance (layer units).
+
+    Features that disappear when simplified (smaller than the tolerance) are dropped.
+
+    Returns:
+        list[QgsFeature]: Features with multi-part geometries and all attributes of the layer.
+    """
+    if layer.crs().isGeographic():
+        tolerance /= 111320  # Metres per degree at the equator, errs on the side of less simplification
+
+    request = QgsFeatureRequest().setFilterRect(rect)
+    features = []
+    for feature in layer.getFeatures(request):
+        geometry = feature.geometry()
+        if geometry.isEmpty():
+            continue
+        if not rect.contains(geometry.boundingBox()):
+            geometry = geometry.clipped(rect)
+        geometry = geometry.simplify(tolerance)
+        if geometry.isEmpty():
+            continue
+        geometry.convertToMultiType()
+
+        clipped = QgsFeature(feature)
+        clipped.setGeometry(geometry)
+        features.append(clipped)
+    return features
+
+
+def subset_features(layer, rect):
+    """
+    Reads the features of layer whose bounding box meets rect, with unchanged (multi-part) geometries.
+    """
+    features = []
+    for feature in layer.getFeatures(QgsFeatureRequest().setFilterRect(rect)):
+        geometry = feature.geometry()
+        geometry.convertToMultiType()
+        feature.setGeometry(geometry)
+        features.append(feature)
+    return features
+
+
+def memory_layer(source_layer, features):
+    """
+    Returns a memory layer with the fields, CRS, name and style of source_layer holding features.
+    """
+    geometry_type = QgsWkbTypes.displayString(QgsWkbTypes.multiType(source_layer.wkbType()))
+    layer = QgsVectorLayer(f"{geometry_type}?index=yes", source_layer.name(), "memory")
+    layer.setCrs(source_layer.crs())
+    provider = layer.dataProvider()
+    provider.addAttributes(source_layer.fields().toList())
+    layer.updateFields()
+    provider.addFeatures(features)
+    layer.updateExtents()
+
+    # Renderer, labels and opacity
+    style = QgsMapLayerStyle()
+    style.readFromLayer(source_layer)
+    style.writeToLayer(layer)
+    return layer
@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import configparser
+from datetime import datetime
+from qgis.core import QgsSettings
+
+# State file written into the output folder, one record per exported map
+STATE_FILE = "mapcraft_state.json"
+
+# Files that belong to a shapefile and change its content
+SHAPEFILE_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+# Job keys that only affect the layout (texts, page, quality), not the input data
+FIELD_KEYS = ("project_name", "map_title", "layout_size", "scale", "atlas", "export_format", "export_profile",
+              "wtg_buffer_size", "site_boundary_buffer_size")
+
+
+def incremental_enabled():
+    """
+    Returns True unless unchanged maps should be exported again anyway (setting MapCraft/incremental/enabled).
+    """
+    return QgsSettings().value("MapCraft/incremental/enabled", True, type=bool)
+
+
+def file_digest(path, chunk_size=1024 ** 2):
+    """
+    Returns the SHA-1 of a vector input, including the sidecar files of a shapefile, or "" for no path.
+    """
+    if not path:
+        return ""
+    stem, extension = os.path.splitext(path)
+    files = [stem + part for part in SHAPEFILE_PARTS] if extension.lower() == ".shp" else [path]
+
+    digest = hashlib.sha1()
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        digest.update(os.path.basename(file_path).lower().encode("utf-8"))
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def value_digest(value):
+    """
+    Returns the SHA-1 of a JSON serializable value (dict keys are sorted).
+    """
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def plugin_signature(plugin_dir):
+    """
+    Returns the plugin version (metadata.txt) and the modification times of its Python files, so a new release
+    or a code change exports every map again.
+    """
+    metadata = configparser.ConfigParser()
+    metadata.read(os.path.join(plugin_dir, "metadata.txt"), encoding="utf-8")
+    version = metadata.get("general", "version", fallback="")
+    code_times = {name: os.path.getmtime(os.path.join(plugin_dir, name))
+                  for name in sorted(os.listdir(plugin_dir)) if name.endswith(".py")}
+    return {"version": version, "code": code_times}
+
+
+def job_fingerprint(job, input_keys, template_files, basemap_conf, plugin=None):
+    """
+    Fingerprints everything an automated map depends on, part by part.
+
+    Args:
+        job (dict): Automated job (see batch.JOB_DEFAULTS).
+        input_keys (list[str]): Job keys holding vector inputs, hashed by content.
+        template_files (list[str]): Template and style files, compared by modification time.
+        basemap_conf (dict): Basemap configuration (service URLs, layers, scales) of the job.
+        plugin (dict): Plugin version and code, see plugin_signature().
+
+    Returns:
+        dict: Digest per part: "inputs", "fields", "template", "basemap" and "plugin".
+    """
+    template_times = {os.path.basename(path): os.path.getmtime(path) if os.path.exists(path) else None
+                      for path in template_files}
+    return {
+        "inputs": value_digest({key: file_digest(job[key]) for key in input_keys}),
+        "fields": value_digest({key: job.get(key) for key in FIELD_KEYS}),
+        "template": value_digest(template_times),
+        "basemap": value_digest({"type": job["basemap_type"], "state": job["state"], "conf": basemap_conf}),
+        "plugin": value_digest(plugin),
+    }
+
+
+class ExportState:
+    """
+    Remembers the fingerprint and output files of every map exported into a folder.
+
+    A map whose fingerprint did not change and whose files still exist does not have to be exported again.
+    """
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, STATE_FILE)
+        self.records = {}
+        try:
+            with open(self.path, 'r', encoding="utf-8") as f:
+                self.records = json.load(f)
+        except (OSError, ValueError):
+            pass  # No state yet or unreadable, every map is exported
+
+    def changed_parts(self, key, fingerprint):
+        """
+        Returns the parts of fingerprint that differ from the last export of key, all parts if there was none.
+        """
+        previous = self.records.get(key, {}).get("fingerprint", {})
+        return [part for part, digest in fingerprint.items() if previous.get(part) != digest]
+
+    def up_to_date(self, key, fingerprint):
+        """
+        Returns the output paths of the last export of key if nothing changed and all files exist, else None.
+        """
+        record = self.records.get(key)
+        if not record or self.changed_parts(key, fingerprint):
+            return None
+        paths = record.get("paths", [])
+        if not paths or not all(os.path.exists(path) for path in paths):
+            return None
+        return paths
+
+    def record(self, key, fingerprint, paths):
+        """
+        Stores a finished export and writes the state file.
+        """
+        self.records[key] = {"fingerprint": fingerprint, "paths": list(paths),
+                             "time": datetime.now().isoformat(timespec="seconds")}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding="utf-8") as f:
+                json.dump(self.records, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("MapCraft Plugin", f"Could not write the export state: {e}")
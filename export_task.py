@@ -0,0 +1,328 @@
+import os
+from qgis.core import (QgsTask, QgsLayoutExporter, QgsLayoutRenderContext, QgsRenderContext, QgsMessageLog, Qgis,
+                       QgsLayoutItemMap, QgsLayoutItemLegend)
+
+# Export quality profiles:
+#   dpi: export resolution, also used to size the basemap requests
+#   text_outlines: PDF text as curves (exact look) instead of text objects (smaller, faster)
+#   simplify: simplify vector geometries to the output resolution
+#   lossless_images: PDF images without JPEG compression
+#   resampling: basemap resampling when it is drawn at a different resolution ("nearest", "bilinear", "cubic")
+#   basemap_opacity: None keeps the basemap opacity, 1.0 draws it opaque without blending
+EXPORT_PROFILES = {
+    "draft": {"dpi": 120, "text_outlines": False, "simplify": True, "lossless_images": False,
+              "resampling": "nearest", "basemap_opacity": 1.0},
+    "review": {"dpi": 200, "text_outlines": True, "simplify": True, "lossless_images": False,
+               "resampling": "bilinear", "basemap_opacity": None},
+    "print": {"dpi": 300, "text_outlines": True, "simplify": False, "lossless_images": True,
+              "resampling": "cubic", "basemap_opacity": None},
+}
+
+DEFAULT_PROFILE = "print"
+
+
+# Output formats and their file extensions
+EXPORT_FORMATS = {"PDF": "pdf", "PNG": "png", "SVG": "svg", "TIFF": "tif"}
+
+# Formats that are rasters anyway, the only ones a pre-rendered map frame may be used for
+RASTER_FORMATS = ("PNG", "TIFF")
+
+
+def parse_formats(value):
+    """
+    Returns the output formats of "PDF", "PDF+PNG" or ["PDF", "PNG"] as a list without duplicates.
+
+    Raises:
+        ValueError: If a format is not one of EXPORT_FORMATS.
+    """
+    if isinstance(value, str):
+        value = value.replace(",", "+").split("+")
+    formats = []
+    for export_format in value:
+        export_format = export_format.strip().upper()
+        if export_format == "TIF":
+            export_format = "TIFF"
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Invalid export format '{export_format}'")
+        if export_format not in formats:
+            formats.append(export_format)
+    if not formats:
+        raise ValueError("No export format")
+    return formats
+
+
+def output_paths(filename_base, export_formats, paged=False):
+    """
+    Returns the output path of each format, e.g. {"PDF": ".../name.pdf", "PNG": ".../name.png"}.
+
+    With paged=True (atlas) all pages go into one PDF; the other formats write one file per page and
+    the path of the first page is returned.
+    """
+    paths = {}
+    for export_format in export_formats:
+        extension = EXPORT_FORMATS[export_format]
+        if paged and export_format != "PDF":
+            paths[export_format] = f"{filename_base}_1.{extension}"
+        else:
+            paths[export_format] = f"{filename_base}.{extension}"
+    return paths
+
+
+def page_paths(first_page_path, page_count):
+    """
+    Returns the files of all pages of a paged image export, from the path of its first page (see output_paths()).
+    """
+    stem, extension = os.path.splitext(first_page_path)
+    stem = stem[:-len("_1")]
+    return [f"{stem}_{page}{extension}" for page in range(1, page_count + 1)]
+
+
+def export_settings(export_format, profile=DEFAULT_PROFILE):
+    """
+    Returns the QgsLayoutExporter settings of an export format and quality profile.
+    """
+    conf = EXPORT_PROFILES[profile]
+    text_format = (QgsRenderContext.TextFormatAlwaysOutlines if conf["text_outlines"]
+                   else QgsRenderContext.TextFormatAlwaysText)
+
+    if export_format == "PDF":
+        settings = QgsLayoutExporter.PdfExportSettings()
+        settings.dpi = conf["dpi"]
+        settings.simplifyGeometries = conf["simplify"]
+        settings.textRenderFormat = text_format
+        if conf["lossless_images"]:
+            settings.flags = settings.flags | QgsLayoutRenderContext.FlagLosslessImageRendering
+        return settings
+
+    if export_format == "SVG":
+        settings = QgsLayoutExporter.SvgExportSettings()
+        settings.dpi = conf["dpi"]
+        settings.simplifyGeometries = conf["simplify"]
+        settings.textRenderFormat = text_format
+        return settings
+
+    settings = QgsLayoutExporter.ImageExportSettings()
+    settings.dpi = conf["dpi"]
+    return settings
+
+
+def export_pages(layout, folder, export_format, settings, exporter, is_canceled=None, on_page=None):
+    """
+    Exports every atlas page of a layout to its own image or SVG file in folder, named by the atlas filename
+    expression. Unlike the atlas export of QgsLayoutExporter it can stop and report progress after each page.
+
+    Args:
+        is_canceled (callable): Optional, stops before the next page when it returns True.
+        on_page (callable): Optional, called with (pages done, page count) after each page.
+
+    Returns:
+        int: QgsLayoutExporter result code, Canceled if is_canceled stopped the export.
+    """
+    atlas = layout.atlas()
+    if not atlas.beginRender():
+        return QgsLayoutExporter.IteratorError
+    extension = EXPORT_FORMATS[export_format]
+    count = atlas.count()
+    try:
+        for page in range(count):
+            if is_canceled is not None and is_canceled():
+                return QgsLayoutExporter.Canceled
+            if not atlas.seekTo(page):
+                return QgsLayoutExporter.IteratorError
+            path = os.path.join(folder, f"{atlas.currentFilename()}.{extension}")
+            if export_format == "SVG":
+                result = exporter.exportToSvg(path, settings)
+            else:
+                result = exporter.exportToImage(path, settings)
+            if result != QgsLayoutExporter.Success:
+                return result
+            if on_page is not None:
+                on_page(page + 1, count)
+    finally:
+        atlas.endRender()
+    return QgsLayoutExporter.Success
+
+
+def export_layout(layout, output_path, export_format, profile=DEFAULT_PROFILE, exporter=None, is_canceled=None,
+                  on_page=None):
+    """
+    Exports a prepared print layout to PDF, PNG, SVG or TIFF.
+
+    TIFF files are georeferenced by QgsLayoutExporter from the reference map of the layout.
+
+    Args:
+        layout (QgsPrintLayout): Fully populated layout.
+        output_path (str): Target file path.
+        export_format (str): One of EXPORT_FORMATS.
+        profile (str): Quality profile, a key of EXPORT_PROFILES.
+        exporter (QgsLayoutExporter): Exporter of the layout to reuse, a new one is created if None.
+        is_canceled, on_page (callable): Optional, see export_pages(). Used for the pages of image and SVG
+            atlases; an atlas PDF is written in one call.
+
+    Returns:
+        int: QgsLayoutExporter result code.
+    """
+    if exporter is None:
+        exporter = QgsLayoutExporter(layout)
+    atlas = layout.atlas()
+    settings = export_settings(export_format, profile)
+
+    if export_format == "PDF":
+        if atlas.enabled():
+            # All pages go into one PDF
+            result, error = QgsLayoutExporter.exportToPdf(atlas, output_path, settings)
+            return result
+        return exporter.exportToPdf(output_path, settings)
+
+    if atlas.enabled():
+        # One file per page in the folder of output_path
+        return export_pages(layout, os.path.dirname(output_path), export_format, settings, exporter,
+                            is_canceled, on_page)
+    if export_format == "SVG":
+        return exporter.exportToSvg(output_path, settings)
+    return exporter.exportToImage(output_path, settings)
+
+
+def export_all(layout, paths, profile=DEFAULT_PROFILE, is_canceled=None, resources=None, progress=None):
+    """
+    Exports one prepared layout to several formats with a single exporter.
+
+    Template, layers and basemap images are prepared once; each further format only renders and encodes
+    the layout again.
+
+    Args:
+        paths (dict): Output path by format, see output_paths().
+        is_canceled (callable): Optional, stops before the next format or atlas page when it returns True.
+        resources (RunResources): Optional, tracks the exporter for the run.
+        progress (callable): Optional, called with the percentage done after each format and atlas page.
+
+    Returns:
+        dict: QgsLayoutExporter result code by format, for the formats that were (partly) exported.
+    """
+    exporter = QgsLayoutExporter(layout)
+    if resources is not None:
+        resources.track_exporter(exporter)
+    results = {}
+    for number, (export_format, output_path) in enumerate(paths.items()):
+        if is_canceled is not None and is_canceled():
+            break
+
+        def on_page(done, count):
+            if progress is not None:
+                progress(100 * (number + done / count) / len(paths))
+
+        results[export_format] = export_layout(layout, output_path, export_format, profile, exporter,
+                                               is_canceled, on_page)
+        if results[export_format] != QgsLayoutExporter.Success:
+            break
+        if progress is not None:
+            progress(100 * (number + 1) / len(paths))
+    return results
+
+
+def clone_for_export(layout):
+    """
+    Returns a copy of a prepared layout that an export task owns and renders in its own thread.
+
+    A cloned layout finds its layers through the project, so the layers of map items, the legend entries and
+    the atlas coverage are linked again from the original: private working layers and the page coverage are
+    not in the project.
+    """
+    copy = layout.clone()
+    for item in layout.items():
+        if not isinstance(item, (QgsLayoutItemMap, QgsLayoutItemLegend)):
+            continue
+        copy_item = copy.itemByUuid(item.uuid())
+        if copy_item is None:
+            continue
+        if isinstance(item, QgsLayoutItemMap):
+            copy_item.setLayers(item.layers())
+        else:
+            root_group = copy_item.model().rootGroup()
+            root_group.removeAllChildren()
+            for node in item.model().rootGroup().children():
+                root_group.addChildNode(node.clone())
+            copy_item.refresh()
+
+    atlas = layout.atlas()
+    if atlas.enabled():
+        copy.atlas().setCoverageLayer(atlas.coverageLayer())
+        copy.atlas().setEnabled(True)
+    return copy
+
+
+class MapExportTask(QgsTask):
+    """
+    Runs the layout export in the QGIS task manager so the GUI is not blocked.
+
+    The layout and its layers are built on the main thread. The task renders a copy of the layout made for it
+    (clone_for_export()), so the worker thread never touches the layout of the main thread. Progress is
+    reported per format and atlas page, and a cancel stops the export before the next one. on_finished is
+    called on the main thread with (task, success) once the task is done, failed or was canceled.
+    """
+
+    def __init__(self, layout, paths, on_finished=None, profile=DEFAULT_PROFILE, resources=None):
+        first_path = next(iter(paths.values()))
+        super().__init__(f"MapCraft: exporting {os.path.basename(first_path)}", QgsTask.CanCancel)
+        self.layout = layout  # Keep a reference, the layout owns the atlas coverage of the copy
+        self.export_copy = clone_for_export(layout)
+        self.paths = paths
+        self.profile = profile
+        self.resources = resources
+        self.on_finished = on_finished
+        self.results = {}
+        atlas = layout.atlas()
+        self.page_count = atlas.updateFeatures() if atlas.enabled() else 0  # Pages of a paged layout
+
+    def run(self):
+        self.setProgress(1)
+        self.results = export_all(self.export_copy, self.paths, self.profile, self.isCanceled, self.resources,
+                                  self.setProgress)
+        if self.isCanceled():
+            return False
+        return (len(self.results) == len(self.paths)
+                and all(result == QgsLayoutExporter.Success for result in self.results.values()))
+
+    def finished(self, result):
+        # Remove the files of the formats a canceled export started, every page of paged images. Formats it
+        # did not reach keep the files of earlier exports.
+        if self.isCanceled():
+            for output_path in self.output_files(self.results):
+                if not os.path.exists(output_path):
+                    continue
+                try:
+                    os.remove(output_path)
+                except OSError as e:
+                    QgsMessageLog.logMessage(f"Could not remove {output_path}: {e}", "MapCraft", Qgis.Warning)
+        self.export_copy = None  # Deleted on the main thread that created it
+
+        if self.on_finished:
+            self.on_finished(self, result)
+
+    def output_files(self, export_formats=None):
+        """
+        Returns every file the export writes, one per page for the image formats of a paged layout.
+
+        Args:
+            export_formats (iterable or None): Only the files of these formats, all formats if None.
+        """
+        return written_files(self.paths, self.page_count, export_formats)
+
+
+def written_files(paths, page_count=0, export_formats=None):
+    """
+    Returns the files an export of paths (see output_paths()) writes: every page of the image and SVG formats
+    of a paged layout with page_count pages, one file for the other formats.
+
+    Args:
+        export_formats (iterable or None): Only the files of these formats, all formats if None.
+    """
+    files = []
+    for export_format, output_path in paths.items():
+        if export_formats is not None and export_format not in export_formats:
+            continue
+        if page_count and export_format != "PDF":
+            files.extend(page_paths(output_path, page_count))
+        else:
+            files.append(output_path)
+    return files
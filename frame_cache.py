@@ -0,0 +1,134 @@
+import os
+import hashlib
+from qgis.core import QgsSettings, QgsMapLayerStyle, QgsMapRendererParallelJob
+from qgis.PyQt.QtCore import QSizeF
+from .cache import DiskCache, cache_root
+from .wms_cache import georeference
+from .export_state import SHAPEFILE_PARTS
+
+
+def feature_digest(layer):
+    """
+    Returns the SHA-1 of the geometries and attributes of all features of a (memory) layer.
+    """
+    digest = hashlib.sha1()
+    for feature in layer.getFeatures():
+        digest.update(bytes(feature.geometry().asWkb()))
+        digest.update(repr(feature.attributes()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def layer_signature(layer):
+    """
+    Describes what a layer draws and its current style.
+
+    File layers are described by provider, source and the size and modification time of their files. Memory
+    layers (clipped areas, private working copies) have a source that differs per instance, they are described
+    by the file they were made from (custom property mapcraft/source) and a hash of their features.
+    """
+    style = QgsMapLayerStyle()
+    style.readFromLayer(layer)
+    style_digest = hashlib.sha1(style.xmlData().encode("utf-8")).hexdigest()
+
+    if layer.providerType() == "memory":
+        derived = str(layer.customProperty("mapcraft/source", ""))
+        return "|".join(["memory", derived, feature_digest(layer), str(layer.opacity()), style_digest])
+
+    source = layer.source()
+    local_path = source.split("|")[0]
+    stem, extension = os.path.splitext(local_path)
+    files = [stem + part for part in SHAPEFILE_PARTS] if extension.lower() == ".shp" else [local_path]
+    content = ",".join(f"{os.stat(path).st_size}:{os.stat(path).st_mtime}" for path in files if os.path.isfile(path))
+    return "|".join([layer.providerType(), source, content, str(layer.opacity()), style_digest])
+
+
+class FrameCache:
+    """
+    On-disk cache of rendered map frames (basemap and vector layers of the map item), stored as GeoTIFF.
+
+    Entries are keyed by extent, CRS, scale, image size, DPI and the signature of every layer, so any
+    change of data or styling renders a new frame. Layout items around the map are drawn at export time.
+    """
+
+    def __init__(self, disk_cache):
+        self.disk_cache = disk_cache
+        self.jobs = {}  # key -> render job of a frame drawn in the background
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Creates the frame cache configured in the QGIS settings, or returns None when it is not enabled.
+        MapCraft/frame_cache/enabled (off by default), /max_mb (default 2048) and /ttl_days (default 30).
+        """
+        settings = QgsSettings()
+        if not settings.value("MapCraft/frame_cache/enabled", False, type=bool):
+            return None
+        max_mb = settings.value("MapCraft/frame_cache/max_mb", 2048, type=int)
+        ttl_days = settings.value("MapCraft/frame_cache/ttl_days", 30, type=int)
+        disk_cache = DiskCache(os.path.join(cache_root(), "frames"), max_mb * 1024 ** 2, ttl_days * 24 * 3600)
+        return cls(disk_cache)
+
+    @staticmethod
+    def cache_key(extent, crs, scale, width, height, dpi, layers):
+        frame = "|".join([crs, f"{extent.xMinimum():.3f},{extent.yMinimum():.3f},"
+                               f"{extent.xMaximum():.3f},{extent.yMaximum():.3f}",
+                          str(scale), str(width), str(height), str(dpi)])
+        digest = hashlib.sha1(frame.encode("utf-8"))
+        for layer in layers:
+            digest.update(layer_signature(layer).encode("utf-8"))
+        return digest.hexdigest() + ".tif"
+
+    def get_frame(self, map_item, dpi, render=True):
+        """
+        Returns a GeoTIFF of the map item's current extent and layers.
+
+        Args:
+            map_item (QgsLayoutItemMap): Map item with its extent, scale and layers set.
+            dpi (int): Export resolution.
+            render (bool): Render a missing frame before returning (blocks until it is drawn). Otherwise a miss
+                returns None at once and the frame is rendered in the background for the next export.
+
+        Returns:
+            str or None: Path of the cached GeoTIFF, or None if the frame is not (yet) available.
+        """
+        layers = [layer for layer in map_item.layers() if layer is not None]
+        if not layers:
+            return None
+        extent = map_item.extent()
+        crs = map_item.crs().authid()
+        width = int(round(map_item.rect().width() / 25.4 * dpi))  # Layout units are mm
+        height = int(round(map_item.rect().height() / 25.4 * dpi))
+
+        key = self.cache_key(extent, crs, round(map_item.scale()), width, height, dpi, layers)
+        path = self.disk_cache.get("frames", key)
+        if path or key in self.jobs:
+            return path
+
+        self.disk_cache.evict()
+        bbox = (extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum())
+        job = QgsMapRendererParallelJob(map_item.mapSettings(extent, QSizeF(width, height), dpi, True))
+        if not render:
+            # The renderer draws in its own threads, the GUI stays responsive
+            self.jobs[key] = job
+            job.finished.connect(lambda: self.store(self.jobs.pop(key), key, bbox, crs))
+            job.start()
+            return None
+
+        job.start()
+        job.waitForFinished()
+        return self.store(job, key, bbox, crs)
+
+    def store(self, job, key, bbox, crs):
+        """
+        Puts the image of a finished render job into the cache and returns its path, or None if nothing was drawn.
+        """
+        image = job.renderedImage()
+        if image.isNull():
+            return None
+        return self.disk_cache.put("frames", key, georeference(image, bbox, crs))
+
+    def invalidate(self):
+        """
+        Removes all cached frames.
+        """
+        self.disk_cache.invalidate()
@@ -0,0 +1,153 @@
+import math
+from qgis.core import (QgsRectangle, QgsReferencedRectangle, QgsCoordinateTransform, QgsProject, QgsVectorLayer,
+                       QgsFeature, QgsFeatureRequest, QgsGeometry, QgsLayoutItemMap)
+
+# Scale value that lets MapCraft choose the scale from the extent of the inputs
+AUTO_SCALE = "auto"
+
+# Scales offered in the dialog
+MAP_SCALES = [10000, 15000, 25000, 50000]
+
+# Atlas modes: one map, a grid of pages over all inputs, or only the grid pages that contain WTGs
+ATLAS_NONE = "none"
+ATLAS_GRID = "grid"
+ATLAS_WTG = "wtg"
+ATLAS_MODES = (ATLAS_NONE, ATLAS_GRID, ATLAS_WTG)
+
+# Share of the map frame kept free around the inputs
+FRAME_MARGIN = 0.05
+
+# Overlap of neighbouring pages when the inputs do not fit on one page
+PAGE_OVERLAP = 0.1
+
+
+def referenced_extent(layer):
+    """
+    Returns the extent of a layer with its CRS. The extent comes from the provider metadata and is cached by the layer.
+    """
+    return QgsReferencedRectangle(layer.extent(), layer.crs())
+
+
+def union_extent(extents, crs):
+    """
+    Combines extents (QgsReferencedRectangle) into one rectangle in crs. Empty extents are skipped.
+
+    Returns:
+        QgsRectangle or None: The union, or None if there is no extent.
+    """
+    union = None
+    for extent in extents:
+        if extent is None or extent.isEmpty():
+            continue
+        rect = QgsRectangle(extent)
+        if extent.crs().isValid() and extent.crs() != crs:
+            rect = QgsCoordinateTransform(extent.crs(), crs, QgsProject.instance()).transformBoundingBox(rect)
+        if union is None:
+            union = rect
+        else:
+            union.combineExtentWith(rect)
+    return union
+
+
+def frame_size(map_item, scale):
+    """
+    Returns the (width, height) in metres shown by the map item at a scale.
+    """
+    return map_item.rect().width() * scale / 1000, map_item.rect().height() * scale / 1000
+
+
+def fitting_scale(extent, map_item, scales, margin=FRAME_MARGIN):
+    """
+    Returns the smallest scale denominator of scales at which extent fits into the map item, or None.
+    """
+    for scale in sorted(scales):
+        width, height = frame_size(map_item, scale)
+        if extent.width() <= width * (1 - 2 * margin) and extent.height() <= height * (1 - 2 * margin):
+            return scale
+    return None
+
+
+def page_extents(extent, map_item, scale, margin=FRAME_MARGIN, overlap=PAGE_OVERLAP):
+    """
+    Splits extent into a grid of map frames at scale, centered on extent. Neighbouring pages overlap.
+
+    Returns:
+        list[QgsRectangle]: Page extents row by row from the north-west.
+    """
+    width, height = frame_size(map_item, scale)
+    needed_width = extent.width() + 2 * margin * width
+    needed_height = extent.height() + 2 * margin * height
+    step_x = width * (1 - overlap)
+    step_y = height * (1 - overlap)
+    cols = max(1, math.ceil((needed_width - width) / step_x) + 1)
+    rows = max(1, math.ceil((needed_height - height) / step_y) + 1)
+
+    x_min = extent.center().x() - (width + (cols - 1) * step_x) / 2
+    y_max = extent.center().y() + (height + (rows - 1) * step_y) / 2
+    pages = []
+    for row in range(rows):
+        for col in range(cols):
+            left = x_min + col * step_x
+            top = y_max - row * step_y
+            pages.append(QgsRectangle(left, top - height, left + width, top))
+    return pages
+
+
+def occupied_pages(pages, layer, crs):
+    """
+    Returns the pages (QgsRectangle in crs) that contain at least one feature of layer.
+    Each page asks the provider for a single feature inside its rectangle, without attributes.
+    """
+    to_layer_crs = QgsCoordinateTransform(crs, layer.crs(), QgsProject.instance())
+    occupied = []
+    for page in pages:
+        request = QgsFeatureRequest()
+        request.setFilterRect(to_layer_crs.transformBoundingBox(page))
+        request.setNoAttributes()
+        request.setLimit(1)
+        for _ in layer.getFeatures(request):
+            occupied.append(page)
+            break
+    return occupied
+
+
+def pages_extent(pages):
+    """
+    Returns the rectangle covering all page extents.
+    """
+    extent = QgsRectangle(pages[0])
+    for page in pages[1:]:
+        extent.combineExtentWith(page)
+    return extent
+
+
+def setup_page_atlas(layout, map_item, pages, filename_stem):
+    """
+    Turns the layout into an atlas with one page per extent, driving the map item.
+
+    The pages are stored in a memory layer owned by the layout. Image exports are named <filename_stem>_<page>.
+    """
+    coverage = QgsVectorLayer(f"Polygon?crs={map_item.crs().authid()}&field=page:integer", "MapCraft pages", "memory")
+    features = []
+    for number, page in enumerate(pages, start=1):
+        feature = QgsFeature(coverage.fields())
+        feature.setGeometry(QgsGeometry.fromRect(page))
+        feature.setAttribute("page", number)
+        features.append(feature)
+    coverage.dataProvider().addFeatures(features)
+    coverage.updateExtents()
+    coverage.setParent(layout)  # The atlas only keeps a weak reference to its coverage layer
+
+    atlas = layout.atlas()
+    atlas.setCoverageLayer(coverage)
+    atlas.setHideCoverage(True)
+    atlas.setSortFeatures(True)
+    atlas.setSortExpression('"page"')
+    atlas.setFilenameExpression("'{}_' || \"page\"".format(filename_stem.replace("'", "''")))
+    atlas.setEnabled(True)
+
+    # Pages have the aspect ratio of the map item, so fitting them without margin shows exactly the page extent
+    map_item.setAtlasDriven(True)
+    map_item.setAtlasScalingMode(QgsLayoutItemMap.Auto)
+    map_item.setAtlasMargin(0.0)
+    return coverage
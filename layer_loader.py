@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from qgis.core import QgsApplication, QgsVectorLayer, QgsFeatureRequest
+
+
+def open_vector_layer(path):
+    """
+    Opens an OGR layer named after its file. Runs in a worker thread and hands the layer over to the main thread,
+    where it is styled and added to the project.
+    """
+    layer = QgsVectorLayer(path, os.path.basename(path), "ogr")
+    layer.moveToThread(QgsApplication.instance().thread())
+    return layer
+
+
+def load_inputs(paths, basemap_check=None):
+    """
+    Opens all input layers and runs the basemap check at the same time, instead of one after another.
+
+    Args:
+        paths (dict): Input key -> file path. Empty paths are skipped.
+        basemap_check (callable or None): Called in a worker thread alongside the layer opens.
+
+    Returns:
+        Tuple(dict, object): Input key -> QgsVectorLayer for every given path, and the result of basemap_check
+        (None without a check).
+    """
+    paths = {key: path for key, path in paths.items() if path}
+    if not paths and basemap_check is None:
+        return {}, None
+
+    with ThreadPoolExecutor(max_workers=len(paths) + 1) as pool:
+        check = pool.submit(basemap_check) if basemap_check else None
+        opens = {key: pool.submit(open_vector_layer, path) for key, path in paths.items()}
+        layers = {key: future.result() for key, future in opens.items()}
+        basemap_result = check.result() if check else None
+    return layers, basemap_result
+
+
+def scan_wtg_layer(layer, field_name="LAYOUT"):
+    """
+    Reads the first non-empty value of field_name, and the extent of the layer.
+
+    Only that attribute is requested, without geometries, and the scan stops at the first value. The extent
+    comes from the provider metadata (SHP header, GeoPackage extent table), so the caller can reuse it
+    instead of asking the layer again.
+
+    Returns:
+        Tuple(object or None, QgsRectangle): The value and the layer extent.
+    """
+    value = None
+    if layer.fields().indexOf(field_name) != -1:
+        request = QgsFeatureRequest()
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([field_name], layer.fields())
+        for feature in layer.getFeatures(request):
+            if feature[field_name]:
+                value = feature[field_name]
+                break
+    return value, layer.extent()
@@ -0,0 +1,149 @@
+import uuid
+import threading
+from qgis.core import QgsProject, QgsMapLayerStore, QgsSettings
+from .clipping import clip_rect, source_key, subset_features, memory_layer
+
+# Custom property of the layers MapCraft removes again, holds the id of the run that created them
+RUN_PROPERTY = "mapcraft/run"
+
+# Runs that have not been released yet, run id -> RunResources
+OPEN_RUNS = {}
+
+# Resources currently held by open runs
+LIVE_COUNTS = {"runs": 0, "layers": 0, "layouts": 0, "exporters": 0}
+_counts_lock = threading.Lock()  # Exporters are registered from export tasks
+
+
+def _count(kind, delta):
+    with _counts_lock:
+        LIVE_COUNTS[kind] += delta
+
+
+def working_layers_enabled():
+    """
+    Returns True if automated maps work on private in-memory copies of their inputs
+    (setting MapCraft/working_layers/enabled, off by default).
+    """
+    return QgsSettings().value("MapCraft/working_layers/enabled", False, type=bool)
+
+
+def leak_counts(project=None):
+    """
+    Returns the resources still held by MapCraft runs, for leak checks after a run or a batch.
+
+    Returns:
+        dict: "runs", "layers", "layouts" and "exporters" of open runs, and "project_layers": layers of released
+        runs that are still in the project although they should have been removed.
+    """
+    project = project or QgsProject.instance()
+    orphans = [layer for layer in project.mapLayers().values()
+               if layer.customProperty(RUN_PROPERTY, "") and layer.customProperty(RUN_PROPERTY) not in OPEN_RUNS]
+    with _counts_lock:
+        return dict(LIVE_COUNTS, project_layers=len(orphans))
+
+
+def release_open_runs():
+    """
+    Releases every run that is still open, e.g. when the plugin is unloaded.
+    """
+    for resources in list(OPEN_RUNS.values()):
+        resources.release()
+
+
+class RunResources:
+    """
+    Owns the layers, layouts and exporters created for one map run and releases them together, whether the run
+    succeeded, failed or was canceled. release() can be called more than once.
+
+    In private mode the layers added through add() live in a QgsMapLayerStore of their own instead of the user's
+    project, so they cannot clash with project layers of the same source. All other tracked layers that are not
+    kept (e.g. the basemap) are removed from the project again, in both modes.
+    """
+
+    def __init__(self, private=False):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.store = QgsMapLayerStore() if private else None
+        self.layers = []  # (layer id, keep)
+        self.layouts = []
+        self.exporters = []
+        self.released = False
+        OPEN_RUNS[self.run_id] = self
+        _count("runs", 1)
+
+    @property
+    def private(self):
+        return self.store is not None
+
+    def add(self, layer, show=True, keep=False):
+        """
+        Adds a layer to the private store, or to the project (in the layer tree if show is True), and tracks it.
+        """
+        if self.store is not None:
+            self.store.addMapLayer(layer)
+            keep = False  # Nothing of a private run stays
+        else:
+            QgsProject.instance().addMapLayer(layer, show)
+        return self.track(layer, keep)
+
+    def track(self, layer, keep=False, temporary=None):
+        """
+        Tracks a layer that was added to the project elsewhere (e.g. the basemap).
+
+        Args:
+            keep (bool): The layer stays in the project after the run.
+            temporary (bool or None): The layer has to be gone eventually (leak check), defaults to not keep.
+                Shared batch basemaps are kept by the run but removed at the end of the batch.
+        """
+        if layer is None:
+            return None
+        if (not keep) if temporary is None else temporary:
+            layer.setCustomProperty(RUN_PROPERTY, self.run_id)
+        self.layers.append((layer.id(), keep))
+        _count("layers", 1)
+        return layer
+
+    def track_layout(self, layout):
+        self.layouts.append(layout)
+        _count("layouts", 1)
+        return layout
+
+    def track_exporter(self, exporter):
+        self.exporters.append(exporter)
+        _count("exporters", 1)
+        return exporter
+
+    def copy(self, layer, extent, scale):
+        """
+        Returns an in-memory copy of the features of layer on the map frame, with the style of layer.
+
+        Args:
+            extent (QgsReferencedRectangle): Map frame of all pages with its CRS.
+        """
+        rect = clip_rect(extent, extent.crs(), layer.crs(), scale)
+        working_layer = memory_layer(layer, subset_features(layer, rect))
+        working_layer.setCustomProperty("mapcraft/source", repr((source_key(layer), rect.toString(3))))
+        return self.add(working_layer, False)
+
+    def release(self):
+        """
+        Removes the layers that are not kept from the project, deletes the private store and drops the layouts
+        and exporters of the run.
+        """
+        if self.released:
+            return
+        self.released = True
+
+        # Layers of the private store, then the tracked layers that were added to the project (e.g. the basemap)
+        if self.store is not None:
+            self.store.removeAllMapLayers()
+        project = QgsProject.instance()
+        remove_ids = [layer_id for layer_id, keep in self.layers if not keep and project.mapLayer(layer_id)]
+        if remove_ids:
+            project.removeMapLayers(remove_ids)
+
+        _count("layers", -len(self.layers))
+        _count("layouts", -len(self.layouts))
+        _count("exporters", -len(self.exporters))
+        _count("runs", -1)
+        self.layers, self.layouts, self.exporters = [], [], []
+        OPEN_RUNS.pop(self.run_id, None)
@@ -0,0 +1,72 @@
+from qgis.core import QgsLayerTreeGroup, QgsLayerTreeLayer, QgsRasterLayer, QgsVectorLayer
+
+
+class LayerTreeSnapshot:
+    """
+    Visible layers of the project layer tree, collected in one walk.
+
+    The walk is repeated only after the tree reports a change (layers added, removed or moved, visibility
+    or names changed), so several reads during one map build cost a single pass.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.dirty = True
+        self.visible_layers = []  # Visible layers in tree order
+        self.first_visible_layer = None
+        self.reference_names = []  # Names for the REF label, WMS layers excluded
+        self.legend_layers = []  # Visible vector layers
+
+        self.signals = [root.addedChildren, root.removedChildren, root.visibilityChanged, root.nameChanged]
+        for signal in self.signals:
+            signal.connect(self.invalidate)
+
+    def invalidate(self, *args):
+        self.dirty = True
+
+    def disconnect(self):
+        """
+        Stops listening to the layer tree.
+        """
+        for signal in self.signals:
+            signal.disconnect(self.invalidate)
+        self.signals = []
+
+    def refresh(self):
+        """
+        Walks the tree again if it changed since the last walk, and returns the snapshot.
+        """
+        if not self.dirty:
+            return self
+
+        visible_layers = []
+        reference_names = []
+
+        def collect_visible_layers(node):
+            if isinstance(node, QgsLayerTreeLayer):
+                layer = node.layer()
+                if not node.isVisible() or layer is None:
+                    return
+                visible_layers.append(layer)
+
+                # Exclude WMS layers from the Reference
+                layer_path = layer.source()
+                if isinstance(layer, QgsRasterLayer) and 'wms' in layer_path.lower():
+                    return
+                # Try to extract the layer name from the source string
+                if "|layername=" in layer_path:
+                    reference_names.append(layer_path.split("|layername=")[-1])
+                elif "layers=" not in layer_path:  # Skip WMS layers
+                    reference_names.append(layer.name())
+
+            elif isinstance(node, QgsLayerTreeGroup):
+                for child in node.children():
+                    collect_visible_layers(child)
+
+        collect_visible_layers(self.root)
+        self.visible_layers = visible_layers
+        self.first_visible_layer = visible_layers[0] if visible_layers else None
+        self.reference_names = reference_names
+        self.legend_layers = [layer for layer in visible_layers if isinstance(layer, QgsVectorLayer)]
+        self.dirty = False
+        return self
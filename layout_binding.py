@@ -0,0 +1,56 @@
+from qgis.core import QgsLayoutItem
+
+
+class LayoutBinding:
+    """
+    Indexes the items of a layout by id and type once after the template is loaded.
+
+    Handlers are registered against item ids and run in one pass by apply(), instead of
+    scanning layout.items() for every item that has to be filled.
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.items_by_id = {}
+        self.items_by_type = {}
+        self.handlers = {}  # item id -> (handler, item type or None)
+
+        for item in layout.items():
+            if not isinstance(item, QgsLayoutItem):  # Skip page and selection graphics
+                continue
+            self.items_by_type.setdefault(item.type(), []).append(item)
+            if item.id() and item.id() not in self.items_by_id:
+                self.items_by_id[item.id()] = item
+
+    def item(self, item_id, item_type=None):
+        """
+        Returns the item with the given id (and type, if given), or None.
+        """
+        item = self.items_by_id.get(item_id)
+        if item is None or (item_type is not None and item.type() != item_type):
+            return None
+        return item
+
+    def items(self, item_type):
+        """
+        Returns all items of a QgsLayoutItemRegistry type.
+        """
+        return self.items_by_type.get(item_type, [])
+
+    def register(self, item_id, handler, item_type=None):
+        """
+        Registers handler(item) for the item with the given id. A later registration replaces an earlier one.
+        """
+        self.handlers[item_id] = (handler, item_type)
+
+    def apply(self, wrap=None):
+        """
+        Runs every registered handler whose item exists in the layout, in registration order.
+        wrap(item_id, handler), if given, returns the callable to run instead of the handler (e.g. a timed one).
+        """
+        for item_id, (handler, item_type) in self.handlers.items():
+            item = self.item(item_id, item_type)
+            if item is not None:
+                if wrap is not None:
+                    handler = wrap(item_id, handler)
+                handler(item)
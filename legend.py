@@ -0,0 +1,30 @@
+def build_legend(legend_item, map_item, entries, fonts=None):
+    """
+    Fills a layout legend with a fixed list of layers in one pass.
+
+    Args:
+        legend_item (QgsLayoutItemLegend): Legend of the template.
+        map_item (QgsLayoutItemMap): Map the legend is linked to.
+        entries (list): (layer, label) tuples in legend order. Entries without a valid layer are skipped,
+            a label of None keeps the layer name.
+        fonts (dict or None): QgsLegendStyle -> QFont, applied once after the entries are added.
+    """
+    legend_item.setLinkedMap(map_item)
+
+    # Disable auto-update to manually control legend entries
+    legend_item.setAutoUpdateModel(False)
+
+    root_group = legend_item.model().rootGroup()
+    root_group.removeAllChildren()
+
+    for layer, label in entries:
+        if layer is None or not layer.isValid():
+            continue
+        node = root_group.addLayer(layer)  # Name the returned node instead of searching the tree for it
+        if label is not None:
+            node.setName(label)
+
+    for style, font in (fonts or {}).items():
+        legend_item.setStyleFont(style, font)
+
+    legend_item.refresh()
@@ -1,4 +1,5 @@
 import os
+import math
 import getpass
 from datetime import datetime
 from PyQt5.QtWidgets import (QAction, QFileDialog, QWidget, QVBoxLayout, QLabel, QLineEdit,
@@ -9,13 +10,248 @@ from PyQt5.QtCore import Qt, QSizeF, QRectF
 from qgis.utils import iface
 from qgis.core import (
     QgsProject, QgsVectorLayer, QgsRasterLayer,
-    QgsPrintLayout, QgsLayoutItemMap, QgsReadWriteContext, QgsRectangle,
+    QgsPrintLayout, QgsReadWriteContext, QgsRectangle,
     QgsLayoutExporter, QgsLayoutItemRegistry, QgsLineSymbol, QgsSingleSymbolRenderer,
-    QgsLayoutItemScaleBar, QgsUnitTypes, QgsLayerTreeLayer, QgsLayoutSize, QgsFillSymbol,
-    QgsSimpleFillSymbolLayer, QgsSimpleLineSymbolLayer, QgsLayoutPoint, QgsLayerTreeGroup, QgsLegendStyle, QgsTextFormat,
-    Qgis, QgsLayoutMeasurement
+    QgsUnitTypes, QgsLayoutSize, QgsFillSymbol,
+    QgsSimpleFillSymbolLayer, QgsSimpleLineSymbolLayer, QgsLayoutPoint, QgsLegendStyle, QgsTextFormat,
+    Qgis, QgsLayoutMeasurement, QgsApplication, QgsReferencedRectangle, QgsCoordinateTransform,
+    QgsCoordinateReferenceSystem, QgsBilinearRasterResampler, QgsCubicRasterResampler, QgsWkbTypes, QgsMessageLog
 )
 from qgis.PyQt.QtXml import QDomDocument
+from .export_task import (MapExportTask, export_all, output_paths, written_files, parse_formats, EXPORT_PROFILES,
+                          DEFAULT_PROFILE, RASTER_FORMATS)
+from .batch import read_manifest, run_batch_async, default_report_path
+from .tile_cache import TileCache, provider_key, bulk_download_allowed
+from .wms_cache import WmsCache, wms_layer_available
+from .frame_cache import FrameCache
+from .clipping import (AREA_CACHE_SIZE, print_tolerance, clip_rect, source_key, clip_features,
+                       memory_layer)
+from .offline import package_path, package_covers, write_package, xyz_geotiff
+from .layout_binding import LayoutBinding
+from .layer_loader import load_inputs, scan_wtg_layer
+from .legend import build_legend
+from .layer_tree import LayerTreeSnapshot
+from .profiling import StageProfiler
+from .layer_store import RunResources, working_layers_enabled, release_open_runs
+from .export_state import ExportState, job_fingerprint, plugin_signature, incremental_enabled
+from .framing import (AUTO_SCALE, MAP_SCALES, ATLAS_NONE, ATLAS_GRID, ATLAS_WTG, referenced_extent, union_extent,
+                      fitting_scale, page_extents, occupied_pages, pages_extent, setup_page_atlas)
+
+
+# --- State-specific topographic WMS configurations ---
+STATE_SETTINGS = {
+    "Baden-Württemberg": {
+        "scales": {
+            "10000": {
+                "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_10_K?",
+                "layer_name": "RDS.LY_DTK10K_COL",
+                "title": "DTK10 Color"
+            },
+            "15000": {
+                "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_10_K?",
+                "layer_name": "RDS.LY_DTK10K_COL",
+                "title": "DTK10 Color"
+            },
+            "25000": {
+                "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_25_K_A?",
+                "layer_name": "RDS_LY_DTK25K_COL",
+                "title": "DTK25 Color"
+            },
+            "50000": {
+                "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_50_K_A?",
+                "layer_name": "RDS_LY_DTK50K_COL",
+                "title": "DTK50 Color"
+            }
+        },
+        "copyright": "LGL-BW(2026) Datenlizenz Deutschland-Namensnennung-Version 2.0, www.lgl-bw.de"
+    },
+    "Hessen": {
+        "scales": {
+            "10000": {
+                "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
+                "layer_name": "he_pg10",
+                "title": "DTK10 Hessen"
+            },
+            "15000": {
+                "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
+                "layer_name": "he_pg10",
+                "title": "DTK15 Hessen"
+            },
+            "25000": {
+                "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
+                "layer_name": "he_dtk25",
+                "title": "DTK25 Hessen"
+            },
+            "50000": {
+                "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
+                "layer_name": "he_dtk50",
+                "title": "DTK50 Hessen"
+            }
+        },
+        "copyright": "Hessische Verwaltung für Bodenmanagement und Geoinformation, 2026"
+    },
+    "Niedersachsen": {
+        "scales": {
+            "10000": {
+                "wms_url": "https://www.geobasisdaten.niedersachsen.de/wms/dtk25?",
+                "layer_name": "DTK25",
+                "title": "DTK25 NI"
+            },
+            "25000": {
+                "wms_url": "https://www.geobasisdaten.niedersachsen.de/wms/dtk25?",
+                "layer_name": "DTK25",
+                "title": "DTK25 NI"
+            },
+            "50000": {
+                "wms_url": "https://www.geobasisdaten.niedersachsen.de/wms/dtk50?",
+                "layer_name": "DTK50",
+                "title": "DTK50 NI"
+            }
+        },
+        "copyright": "LGLN 2026"
+    },
+    "Mecklenburg-Vorpommern": {
+        "scales": {
+            "10000": {
+                "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk10?",
+                "layer_name": "mv_dtk10",
+                "title": "DTK10 MV"
+            },
+            "15000": {
+                "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk10?",
+                "layer_name": "mv_dtk10",
+                "title": "DTK15 MV"
+            },
+            "25000": {
+                "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk25?",
+                "layer_name": "mv_dtk25",
+                "title": "DTK25 MV"
+            },
+            "50000": {
+                "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk50?",
+                "layer_name": "mv_dtk50",
+                "title": "DTK50 MV"
+            }
+        },
+        "copyright": "GeoBasis-DE/MV, 2026, CC BY 4.0"
+    },
+    "Rheinland-Pfalz": {
+        "scales": {
+            "10000": {
+                "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk10.fcgi?",
+                "layer_name": "rp_dtk10",
+                "title": "DTK10 RLP"
+            },
+            "15000": {
+                "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk10.fcgi?",
+                "layer_name": "rp_dtk10",
+                "title": "DTK10 RLP"
+            },
+            "25000": {
+                "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk25.fcgi?",
+                "layer_name": "rp_dtk25",
+                "title": "DTK25 RLP"
+            },
+            "50000": {
+                "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk50.fcgi?",
+                "layer_name": "rp_dtk50",
+                "title": "DTK50 RLP"
+            }
+        },
+        "copyright": "GeoBasis-DE/LVermGeoRP (2006) dl-de/by-2-0"
+    },
+    "Schleswig-Holstein": {
+        "scales": {
+            "10000": {
+                "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK5_OpenGBD?",
+                "layer_name": "sh_dtk5_col",
+                "title": "DTK5 SH"
+            },
+            "15000": {
+                "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK25_OpenGBD?",
+                "layer_name": "sh_dtk25_col",
+                "title": "DTK25 SH"
+            },
+            "25000": {
+                "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK25_OpenGBD?",
+                "layer_name": "sh_dtk25_col",
+                "title": "DTK25 SH"
+            },
+            "50000": {
+                "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK50_OpenGBD?",
+                "layer_name": "sh_dtk50_col",
+                "title": "DTK50 SH"
+            }
+        },
+        "copyright": "GeoBasis-DE/LVermGeo 2026 SH/CC BY 4.0"
+    }
+}
+
+
+# --- Global Satellite (XYZ) ESRI Basemap ---
+SATELLITE_SETTINGS = {
+    "basemap": {
+        "zmin": 0,
+        "zmax": 19,
+        "crs": "EPSG:3857",
+        "url": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+        "title": "World Imagery"
+    },
+    "copyright": "Esri, Maxar, Earthstar Geographics, and the GIS User Community"
+
+}
+
+# --- Google Satellite (XYZ) Basemap ---
+SATELLITE_SETTINGS_2 = {
+    "basemap": {
+        "zmin": 0,
+        "zmax": 19,
+        "crs": "EPSG:3857",
+        "url": "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}",
+        "title": "Google Satellite"
+    },
+    "copyright": "Imagery 2026 Google, Maxar Technologies"
+}
+# --- OpenStreetMap (XYZ) Basemap ---
+OSM_SETTINGS = {
+    "basemap": {
+        "zmin": 0,
+        "zmax": 19,
+        "crs": "EPSG:3857",
+        "url": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+        "title": "OpenStreetMap"
+    },
+    "copyright": "OpenStreetMap (and) contributors, CC-BY-SA"
+}
+
+# XYZ basemaps by basemap type
+XYZ_BASEMAPS = {
+    "Satellite": SATELLITE_SETTINGS,
+    "OpenStreetMap": OSM_SETTINGS,
+}
+
+# Scale bar per layout size and scale: (real world km, segments, x offset in mm)
+SCALE_BAR_SETTINGS = {
+    "A4": {
+        10000: (0.25, 2, 2),
+        15000: (0.5, 2, -3),
+        25000: (1, 2, -5),
+        50000: (2, 2, -5),
+    },
+    "A3": {  # A3 or larger
+        10000: (0.5, 2, -5),
+        15000: (0.5, 2, 5),
+        25000: (1.0, 2, 0),
+        50000: (2.0, 2, 0),
+    },
+}
+
+# Measured text widths kept by MapCraftPlugin.text_width, a long session sees many project names and sizes
+TEXT_WIDTH_CACHE_SIZE = 4096
+
+
+class MapCraftError(Exception):
+    """Raised when a map cannot be generated from the given inputs."""
 
 # START OF PLUG-IN CONFIGURATION
 class MapCraftPlugin:
@@ -23,6 +259,16 @@ class MapCraftPlugin:
         self.iface = iface
         self.plugin_dir = os.path.dirname(__file__)
         self.dialog = None
+        self.export_tasks = []  # Keep running tasks alive until they finish
+        self.template_cache = {}  # (layout size, UTM zone) -> (template path, mtime, parsed QDomDocument)
+        self.text_width_cache = {}  # (font family, weight, italic, point size, text) -> measured width
+        self.basemap_pool = None  # Shared basemaps while a batch is running
+        self.batch_task = None  # Progress task of the batch run from the menu
+        self.tile_cache = None  # Created on first use from the QGIS settings
+        self.wms_cache = None
+        self.frame_cache = None
+        self.area_cache = {}  # (source, CRS, clip extent, scale, dpi) -> clipped and simplified features
+        self.layer_tree_snapshot = None  # Visible layers of the project, refreshed on layer tree changes
 
     def initGui(self):
         icon_path = os.path.join(self.plugin_dir, 'logo.png')
@@ -31,9 +277,24 @@ class MapCraftPlugin:
         self.iface.addToolBarIcon(self.action)
         self.iface.addPluginToMenu('MapCraft', self.action)
 
+        self.batch_action = QAction('MapCraft batch run', self.iface.mainWindow())
+        self.batch_action.triggered.connect(self.run_batch_from_manifest)
+        self.iface.addPluginToMenu('MapCraft', self.batch_action)
+
     def unload(self):
         self.iface.removePluginMenu('MapCraft', self.action)
+        self.iface.removePluginMenu('MapCraft', self.batch_action)
         self.iface.removeToolBarIcon(self.action)
+        if self.layer_tree_snapshot is not None:
+            self.layer_tree_snapshot.disconnect()
+            self.layer_tree_snapshot = None
+
+        # Nothing created by an unfinished run stays behind
+        if self.batch_task is not None:
+            self.batch_task.cancel()
+        for task in list(self.export_tasks):
+            task.cancel()
+        release_open_runs()
 
     def open_dialog(self):
         if self.dialog is None:
@@ -161,10 +422,18 @@ class MapCraftPlugin:
 
             # Scale
             self.scale_combo = QComboBox()
-            self.scale_combo.addItems(["25000", "10000","15000", "50000"])
+            self.scale_combo.addItems(["25000", "10000","15000", "50000", "Auto"])
             form_layout.addWidget(QLabel("Map scale:"))
             form_layout.addWidget(self.scale_combo)
 
+            # Pages
+            self.atlas_combo = QComboBox()
+            self.atlas_combo.addItem("Single map", ATLAS_NONE)
+            self.atlas_combo.addItem("Atlas: grid over all inputs", ATLAS_GRID)
+            self.atlas_combo.addItem("Atlas: only pages with WTGs", ATLAS_WTG)
+            form_layout.addWidget(QLabel("Pages:"))
+            form_layout.addWidget(self.atlas_combo)
+
             # Output Folder
             pdf_layout = QHBoxLayout()
             self.pdf_path = QLineEdit()
@@ -176,15 +445,31 @@ class MapCraftPlugin:
             pdf_layout.addWidget(browse_pdf)
             form_layout.addLayout(pdf_layout)
 
-            # Format Selector
-            self.format_combo = QComboBox()
-            self.format_combo.addItems(["PDF", "PNG"])
-            form_layout.addWidget(QLabel("Export format:"))
-            form_layout.addWidget(self.format_combo)
+            # Format Selector, all checked formats are exported from the same layout
+            format_layout = QHBoxLayout()
+            self.format_checkboxes = {}
+            for export_format, label in (("PDF", "PDF"), ("PNG", "PNG"), ("SVG", "SVG"),
+                                         ("TIFF", "GeoTIFF")):
+                self.format_checkboxes[export_format] = QCheckBox(label)
+                format_layout.addWidget(self.format_checkboxes[export_format])
+            self.format_checkboxes["PDF"].setChecked(True)
+            form_layout.addWidget(QLabel("Export formats:"))
+            form_layout.addLayout(format_layout)
+
+            # Quality profile
+            self.profile_combo = QComboBox()
+            self.profile_combo.addItem("Print (300 dpi)", "print")
+            self.profile_combo.addItem("Review (200 dpi)", "review")
+            self.profile_combo.addItem("Draft (120 dpi)", "draft")
+            form_layout.addWidget(QLabel("Export quality:"))
+            form_layout.addWidget(self.profile_combo)
 
             self.keepLayersCheckBox = QCheckBox("Keep layers in QGIS after map exporting")
             form_layout.addWidget(self.keepLayersCheckBox)
 
+            self.forceExportCheckBox = QCheckBox("Force re-export (even if nothing changed)")
+            form_layout.addWidget(self.forceExportCheckBox)
+
             # Reset Button
             reset_button = QPushButton("Reset")
             reset_button.clicked.connect(self.reset_fields)
@@ -300,6 +585,7 @@ class MapCraftPlugin:
         self.priory_area.setEnabled(is_automated)
         self.potential_area.setEnabled(is_automated)
         self.keepLayersCheckBox.setEnabled(is_automated)
+        self.forceExportCheckBox.setEnabled(is_automated)
 
         # Disable/enable browse buttons associated with SHP files
         for button in self.dialog.findChildren(QPushButton):
@@ -363,14 +649,18 @@ class MapCraftPlugin:
         # self.Map_title_input.clear()
         self.state_combo.setCurrentIndex(0)
         self.scale_combo.setCurrentIndex(0)
+        self.atlas_combo.setCurrentIndex(0)
         self.pdf_path.clear()
         self.keepLayersCheckBox.setChecked(False)
-        self.format_combo.setCurrentIndex(0)
+        self.forceExportCheckBox.setChecked(False)
+        for export_format, checkbox in self.format_checkboxes.items():
+            checkbox.setChecked(export_format == "PDF")
+        self.profile_combo.setCurrentIndex(0)
         self.mode_combo.setCurrentIndex(0)
         self.toggle_shp_inputs()
 
 # END OF PLUG-IN CONFIGURATION
-    def load_wms_layer(self, state_selected, scale, basemap_type):
+    def load_wms_layer(self, state_selected, scale, basemap_type, tile_zoom=None, raster_path=None):
         """
         Loads a WMS or XYZ raster layer based on the selected state, scale, and basemap type.
 
@@ -378,236 +668,74 @@ class MapCraftPlugin:
             state_selected (str): Name of the German federal state.
             scale (int or str): Map scale, e.g., 10000, 25000, 50000.
             basemap_type (str): Either "Topographic" or "Satellite".
+            tile_zoom (int or None): Zoom level already seeded in the tile cache. XYZ basemaps are then read from disk.
+            raster_path (str or None): Local raster of the map frame (WMS cache or offline package), used instead
+                of the remote WMS/XYZ source.
 
         Returns:
             Tuple(QgsRasterLayer, dict or None, dict or None): The loaded raster layer, config (state or satellite), and scale config (or None for Satellite).
         """
 
-        # --- State-specific topographic WMS configurations ---
-        state_settings = {
-            "Baden-Württemberg": {
-                "scales": {
-                    "10000": {
-                        "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_10_K?",
-                        "layer_name": "RDS.LY_DTK10K_COL",
-                        "title": "DTK10 Color"
-                    },
-                    "15000": {
-                        "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_10_K?",
-                        "layer_name": "RDS.LY_DTK10K_COL",
-                        "title": "DTK10 Color"
-                    },
-                    "25000": {
-                        "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_25_K_A?",
-                        "layer_name": "RDS_LY_DTK25K_COL",
-                        "title": "DTK25 Color"
-                    },
-                    "50000": {
-                        "wms_url": "https://owsproxy.lgl-bw.de/owsproxy/ows/WMS_LGL-BW_ATKIS_DTK_50_K_A?",
-                        "layer_name": "RDS_LY_DTK50K_COL",
-                        "title": "DTK50 Color"
-                    }
-                },
-                "copyright": "LGL-BW(2026) Datenlizenz Deutschland-Namensnennung-Version 2.0, www.lgl-bw.de"
-            },
-            "Hessen": {
-                "scales": {
-                    "10000": {
-                        "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
-                        "layer_name": "he_pg10",
-                        "title": "DTK10 Hessen"
-                    },
-                    "15000": {
-                        "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
-                        "layer_name": "he_pg10",
-                        "title": "DTK15 Hessen"
-                    },
-                    "25000": {
-                        "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
-                        "layer_name": "he_dtk25",
-                        "title": "DTK25 Hessen"
-                    },
-                    "50000": {
-                        "wms_url": "https://www.gds-srv.hessen.de/cgi-bin/lika-services/ogc-free-maps.ows?",
-                        "layer_name": "he_dtk50",
-                        "title": "DTK50 Hessen"
-                    }
-                },
-                "copyright": "Hessische Verwaltung für Bodenmanagement und Geoinformation, 2026"
-            },
-            "Niedersachsen": {
-                "scales": {
-                    "10000": {
-                        "wms_url": "https://www.geobasisdaten.niedersachsen.de/wms/dtk25?",
-                        "layer_name": "DTK25",
-                        "title": "DTK25 NI"
-                    },
-                    "25000": {
-                        "wms_url": "https://www.geobasisdaten.niedersachsen.de/wms/dtk25?",
-                        "layer_name": "DTK25",
-                        "title": "DTK25 NI"
-                    },
-                    "50000": {
-                        "wms_url": "https://www.geobasisdaten.niedersachsen.de/wms/dtk50?",
-                        "layer_name": "DTK50",
-                        "title": "DTK50 NI"
-                    }
-                },
-                "copyright": "LGLN 2026"
-            },
-            "Mecklenburg-Vorpommern": {
-                "scales": {
-                    "10000": {
-                        "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk10?",
-                        "layer_name": "mv_dtk10",
-                        "title": "DTK10 MV"
-                    },
-                    "15000": {
-                        "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk10?",
-                        "layer_name": "mv_dtk10",
-                        "title": "DTK15 MV"
-                    },
-                    "25000": {
-                        "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk25?",
-                        "layer_name": "mv_dtk25",
-                        "title": "DTK25 MV"
-                    },
-                    "50000": {
-                        "wms_url": "https://www.geodaten-mv.de/dienste/adv_dtk50?",
-                        "layer_name": "mv_dtk50",
-                        "title": "DTK50 MV"
-                    }
-                },
-                "copyright": "GeoBasis-DE/MV, 2026, CC BY 4.0"
-            },
-            "Rheinland-Pfalz": {
-                "scales": {
-                    "10000": {
-                        "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk10.fcgi?",
-                        "layer_name": "rp_dtk10",
-                        "title": "DTK10 RLP"
-                    },
-                    "15000": {
-                        "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk10.fcgi?",
-                        "layer_name": "rp_dtk10",
-                        "title": "DTK10 RLP"
-                    },
-                    "25000": {
-                        "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk25.fcgi?",
-                        "layer_name": "rp_dtk25",
-                        "title": "DTK25 RLP"
-                    },
-                    "50000": {
-                        "wms_url": "https://geo4.service24.rlp.de/wms/rp_dtk50.fcgi?",
-                        "layer_name": "rp_dtk50",
-                        "title": "DTK50 RLP"
-                    }
-                },
-                "copyright": "GeoBasis-DE/LVermGeoRP (2006) dl-de/by-2-0"
-            },
-            "Schleswig-Holstein": {
-                "scales": {
-                    "10000": {
-                        "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK5_OpenGBD?",
-                        "layer_name": "sh_dtk5_col",
-                        "title": "DTK5 SH"
-                    },
-                    "15000": {
-                        "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK25_OpenGBD?",
-                        "layer_name": "sh_dtk25_col",
-                        "title": "DTK25 SH"
-                    },
-                    "25000": {
-                        "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK25_OpenGBD?",
-                        "layer_name": "sh_dtk25_col",
-                        "title": "DTK25 SH"
-                    },
-                    "50000": {
-                        "wms_url": "https://service.gdi-sh.de/WMS_SH_DTK50_OpenGBD?",
-                        "layer_name": "sh_dtk50_col",
-                        "title": "DTK50 SH"
-                    }
-                },
-                "copyright": "GeoBasis-DE/LVermGeo 2026 SH/CC BY 4.0"
-            }
-        }
-
-
-        # --- Global Satellite (XYZ) ESRI Basemap ---
-        satellite_settings = {
-            "basemap": {
-                "zmin": 0,
-                "zmax": 19,
-                "crs": "EPSG:3857",
-                "url": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
-                "title": "World Imagery"
-            },
-            "copyright": "Esri, Maxar, Earthstar Geographics, and the GIS User Community"
-
-        }
-
-        # --- Google Satellite (XYZ) Basemap ---
-        satellite_settings_2 = {
-            "basemap": {
-                "zmin": 0,
-                "zmax": 19,
-                "crs": "EPSG:3857",
-                "url": "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}",
-                "title": "Google Satellite"
-            },
-            "copyright": "Imagery 2026 Google, Maxar Technologies"
-        }
-        # --- OpenStreetMap (XYZ) Basemap ---
-        osm_settings = {
-            "basemap": {
-                "zmin": 0,
-                "zmax": 19,
-                "crs": "EPSG:3857",
-                "url": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
-                "title": "OpenStreetMap"
-            },
-            "copyright": "OpenStreetMap (and) contributors, CC-BY-SA"
-        }
-
         scale_str = str(scale)
 
         # --- Satellite Mode ---
         if basemap_type == "Satellite":
-            satellite_conf = satellite_settings["basemap"]
+            satellite_conf = SATELLITE_SETTINGS["basemap"]
             url = satellite_conf["url"]
             zmin = satellite_conf["zmin"]
             zmax = satellite_conf["zmax"]
             crs = satellite_conf["crs"]
             title = satellite_conf["title"]
 
+            # Offline package of the project, no tile requests at all
+            if raster_path:
+                layer = QgsRasterLayer(raster_path, title, "gdal")
+                if layer.isValid():
+                    layer.setOpacity(0.80)
+                    QgsProject.instance().addMapLayer(layer)
+                    return layer, SATELLITE_SETTINGS, None
+
+            # Render from the tile cache at the seeded zoom level only
+            if tile_zoom is not None:
+                url = self.get_tile_cache().local_url(provider_key(title))
+                zmin = zmax = tile_zoom
+
             encoded_url = url.replace("=", "%3D").replace("&", "%26")
             uri = f"type=xyz&url={encoded_url}&zmin={zmin}&zmax={zmax}&crs={crs}"
 
             layer = QgsRasterLayer(uri, title, "wms")
             if not layer.isValid():
-                self.iface.messageBar().pushCritical("MapCraft Plugin", "Could not load satellite basemap.")
+                self.push_message("critical", "MapCraft Plugin", "Could not load satellite basemap.")
                 return None, None, None
 
             layer.setOpacity(0.80)
             QgsProject.instance().addMapLayer(layer)
 
             # Return satellite settings so they can be used in layout updates
-            return layer, satellite_settings, None
+            return layer, SATELLITE_SETTINGS, None
 
         # --- Topographic Mode ---
         elif basemap_type == "Topographic":
-            state_conf = state_settings.get(state_selected)
+            state_conf = STATE_SETTINGS.get(state_selected)
             if not state_conf:
-                self.iface.messageBar().pushCritical("MapCraft Plugin",
-                                                     f"No configuration found for state '{state_selected}'.")
+                self.push_message("critical", "MapCraft Plugin",
+                                  f"No configuration found for state '{state_selected}'.")
                 return None, None, None
 
             scale_conf = state_conf["scales"].get(scale_str)
             if not scale_conf:
-                self.iface.messageBar().pushCritical("MapCraft Plugin",
-                                                     f"No topographic WMS for {state_selected} at scale {scale_str}.")
+                self.push_message("critical", "MapCraft Plugin",
+                                  f"No topographic WMS for {state_selected} at scale {scale_str}.")
                 return None, None, None
 
+            # Map frame already in the WMS cache or an offline package, the state server is not contacted at all
+            if raster_path:
+                wms_layer = QgsRasterLayer(raster_path, f"{state_selected} Basemap", "gdal")
+                if wms_layer.isValid():
+                    wms_layer.setOpacity(0.6)
+                    QgsProject.instance().addMapLayer(wms_layer)
+                    return wms_layer, state_conf, scale_conf
+
             # Determine the correct EPSG for the state
             # MV is usually 25833, others are 25832.
 
@@ -643,13 +771,26 @@ class MapCraftPlugin:
             return wms_layer, state_conf, scale_conf
 
         elif basemap_type == "OpenStreetMap":
-            osm_conf = osm_settings["basemap"]
+            osm_conf = OSM_SETTINGS["basemap"]
             url = osm_conf["url"]
             zmin = osm_conf["zmin"]
             zmax = osm_conf["zmax"]
             crs = osm_conf["crs"]
             title = osm_conf["title"]
 
+            # Offline package of the project, no tile requests at all
+            if raster_path:
+                layer = QgsRasterLayer(raster_path, title, "gdal")
+                if layer.isValid():
+                    layer.setOpacity(0.75)
+                    QgsProject.instance().addMapLayer(layer)
+                    return layer, OSM_SETTINGS, None
+
+            # Render from the tile cache at the seeded zoom level only
+            if tile_zoom is not None:
+                url = self.get_tile_cache().local_url(provider_key(title))
+                zmin = zmax = tile_zoom
+
             encoded_url = url.replace("=", "%3D").replace("&", "%26")
             uri = f"type=xyz&url={encoded_url}&zmin={zmin}&zmax={zmax}&crs={crs}"
 
@@ -661,7 +802,7 @@ class MapCraftPlugin:
             layer.setOpacity(0.75)
             QgsProject.instance().addMapLayer(layer)
 
-            return layer, osm_settings, None
+            return layer, OSM_SETTINGS, None
 
         else:
             print("MapCraft Plugin", f"Unknown basemap type: {basemap_type}")
@@ -700,37 +841,11 @@ class MapCraftPlugin:
 
     def get_visible_layers_in_tree(self):
         """
-                Creates the layer reference for the map.
-                """
-        visible_layers = []
-        shp_layers_ref = []
-
-        def collect_visible_layers(node):
-            if isinstance(node, QgsLayerTreeLayer):
-                if node.isVisible():
-                    layer = node.layer()
-                    visible_layers.append(layer)
-
-                    # Exclude WMS layers from the Reference
-                    if isinstance(layer, QgsRasterLayer) and 'wms' in layer.source().lower():
-                        return
-                    layer_path = layer.source()
-                    # Try to extract the layer name from the source string
-                    if "|layername=" in layer_path:
-                        layer_name = layer_path.split("|layername=")[-1]
-                    elif "layers=" in layer_path:
-                        return  # Skip WMS layers
-                    else:
-                        layer_name = layer.name()  # fallback
-                    shp_layers_ref.append(layer_name)
-
-            elif isinstance(node, QgsLayerTreeGroup):
-                for child in node.children():
-                    collect_visible_layers(child)
-
-        root = QgsProject.instance().layerTreeRoot()
-        collect_visible_layers(root)
-        return visible_layers, shp_layers_ref
+        Returns the snapshot of the visible layers in the project layer tree, walking the tree only if it changed.
+        """
+        if self.layer_tree_snapshot is None:
+            self.layer_tree_snapshot = LayerTreeSnapshot(QgsProject.instance().layerTreeRoot())
+        return self.layer_tree_snapshot.refresh()
 
     def adjust_font_size_to_fit(self, label_item, text, max_width, min_font_size, default_font_size):
         """
@@ -744,17 +859,29 @@ class MapCraftPlugin:
         font.setFamily("Arial")
         font.setPointSize(default_font_size)
 
-        # 2. Measurement logic
-        fm = QFontMetricsF(font)
-        text_width = fm.width(text)
+        # 2. Bisection over the 0.5 pt steps between the default and the minimum size.
+        # Step k means default_font_size - 0.5 * k; the last step may fall below min_font_size,
+        # exactly like the former loop that shrank in 0.5 pt steps while the size was above the minimum.
+        last_step = max(0, math.ceil((default_font_size - min_font_size) / 0.5))
+
+        def fits(step):
+            return self.text_width(font, default_font_size - 0.5 * step, text) <= max_width
 
-        # Note: Using font.pointSize() > min_font_size might fail if sizes are floats
-        current_size = float(default_font_size)
-        while text_width > max_width and current_size > min_font_size:
-            current_size -= 0.5  # Use smaller steps for smoother fitting
-            font.setPointSize(current_size)
-            fm = QFontMetricsF(font)
-            text_width = fm.width(text)
+        if fits(0):
+            step = 0
+        else:
+            # Invariant: the text does not fit at low, hi is the first candidate that may fit
+            low, high = 0, last_step
+            while high - low > 1:
+                middle = (low + high) // 2
+                if fits(middle):
+                    high = middle
+                else:
+                    low = middle
+            step = high
+
+        current_size = float(default_font_size) - 0.5 * step
+        font.setPointSizeF(current_size)
 
         # 3. Apply changes back to the Format object
         text_format.setFont(font)
@@ -766,6 +893,567 @@ class MapCraftPlugin:
         label_item.setText(text)
         label_item.refresh()
 
+    def text_width(self, font, size, text):
+        """
+        Returns the width of text in font at a point size, memoized per (family, size, text).
+        Weight and italic are part of the key as well, since they change the width. At most
+        TEXT_WIDTH_CACHE_SIZE widths are kept, the oldest are dropped first.
+        """
+        key = (font.family(), font.weight(), font.italic(), size, text)
+        width = self.text_width_cache.get(key)
+        if width is None:
+            font = QFont(font)
+            font.setPointSizeF(size)
+            width = QFontMetricsF(font).width(text)
+            if len(self.text_width_cache) >= TEXT_WIDTH_CACHE_SIZE:
+                self.text_width_cache.pop(next(iter(self.text_width_cache)))  # Oldest entry
+            self.text_width_cache[key] = width
+        return width
+
+    def setup_scale_bar(self, scale_bar_item, map_item, layout_size, scale):
+        """
+        Links the scale bar to the map and sets its segments and position for the layout size and scale.
+        """
+        scale_bar_item.setStyle('Line Ticks Up')
+        scale_bar_item.setUnits(QgsUnitTypes.DistanceKilometers)
+        scale_bar_item.setNumberOfSegmentsLeft(0)
+        scale_bar_item.setLinkedMap(map_item)
+
+        size_settings = SCALE_BAR_SETTINGS["A4" if layout_size == "A4" else "A3"]
+        if scale not in size_settings:
+            return
+        real_world_km, segments, x_offset = size_settings[scale]
+
+        # Apply to scale bar
+        scale_bar_item.setNumberOfSegments(segments)
+        scale_bar_item.setUnitsPerSegment(real_world_km / segments)
+
+        if x_offset:
+            # Adjust scale bar position, keep Y position unchanged
+            current_pos = scale_bar_item.pos()
+            scale_bar_item.attemptMove(
+                QgsLayoutPoint(current_pos.x() + x_offset, current_pos.y(), QgsUnitTypes.LayoutMillimeters))
+
+    def register_label_handlers(self, binding, layout_size, project_name, Map_title, projection, ref_text,
+                                copyright_text):
+        """
+        Registers the handlers filling the text labels of the template (shared by automated and manual mode).
+        """
+        today = datetime.today().strftime("%d/%m/%y")
+        username = getpass.getuser()
+        dpi_ = binding.layout.renderContext().dpi()
+        label_type = QgsLayoutItemRegistry.LayoutLabel
+
+        def text_label(text, a3_size=None, a4_size=None, bold=False):
+            def handler(item):
+                if a3_size is not None:
+                    font = item.font()
+                    if bold:
+                        font.setBold(True)
+                    if layout_size == "A3":
+                        font.setPointSizeF(a3_size)
+                    elif layout_size == "A4":
+                        font.setPointSizeF(a4_size)
+                    item.setFont(font)
+                item.setText(text)
+            return handler
+
+        def fitted_label(text, a3_sizes, other_sizes):
+            # sizes are (min_font_size, default_font_size)
+            def handler(item):
+                max_width = item.rect().width()
+                max_width_px = max_width * dpi_ / 25.4
+                min_font_size, default_font_size = a3_sizes if layout_size == "A3" else other_sizes
+                self.adjust_font_size_to_fit(item, text, max_width_px, min_font_size=min_font_size,
+                                             default_font_size=default_font_size)
+            return handler
+
+        def windpark_label(item):
+            text_label(f"Windpark {project_name}", 13, 10, bold=True)(item)
+
+            # if the name is too long, move the box up north
+            if layout_size == "A3" and len(project_name) > 21:
+                shift_y = -5
+            elif layout_size == "A4" and len(project_name) > 15:
+                shift_y = -3
+            else:
+                return
+            current_pos = item.pos()
+            item.attemptMove(QgsLayoutPoint(current_pos.x(), current_pos.y() + shift_y, QgsUnitTypes.LayoutMillimeters))
+
+        binding.register('label_proj', text_label(f"CRS: {projection}", 10, 7), label_type)
+        binding.register('label_druck', text_label(f"Druck: {layout_size}", 10, 7), label_type)
+        binding.register('label_Maßstab', text_label("Maßstab:", 10, 7), label_type)
+        binding.register('label_creator', text_label(f"Karte erzeugt am {today} von {username}", 10, 7), label_type)
+        binding.register('label_title', text_label(f"{Map_title}"), label_type)
+        binding.register('label_Windpark', windpark_label, label_type)
+        binding.register('label_Vattenfall', text_label("(c) Vattenfall Europe Windkraft GmbH 2026", 5, 3), label_type)
+        binding.register('label_address', text_label(
+            "Vattenfall Europe Windkraft GmbH, Amerigo-Vespucci-Platz 2 20457 Hamburg. Tel: +49 (0) 40 790 222 525",
+            5, 3.5), label_type)
+        binding.register('label_ref', fitted_label(f"Ref: {ref_text}", (2.5, 5), (2, 4)), label_type)
+        binding.register('label_CR', fitted_label(f"Hintergrund: (c){copyright_text}", (2.5, 4), (2.5, 3)),
+                         label_type)
+
+    def push_message(self, level, title, text):
+        """
+        Shows a message in the QGIS message bar, or prints it when running without the desktop GUI.
+        level is one of "success", "info", "warning" or "critical".
+        """
+        if self.iface is None:
+            print(title, text)
+            return
+        message_bar = self.iface.messageBar()
+        push = {
+            "success": message_bar.pushSuccess,
+            "info": message_bar.pushInfo,
+            "warning": message_bar.pushWarning,
+        }.get(level, message_bar.pushCritical)
+        push(title, text)
+
+    def template_path(self, layout_size, state_selected):
+        """
+        Returns the .qpt template for a layout size. Mecklenburg-Vorpommern uses the UTM zone 33 templates.
+        """
+        if state_selected == "Mecklenburg-Vorpommern":
+            template_name = f"Übersichskarte_{layout_size}_UTM33.qpt"
+        else:
+            template_name = f"Übersichskarte_{layout_size}.qpt"
+        return os.path.join(self.plugin_dir, template_name)
+
+    def export_fingerprint(self, job, style_path):
+        """
+        Fingerprints an automated job for incremental re-export (see export_state.job_fingerprint).
+        """
+        if job["basemap_type"] == "Topographic":
+            basemap_conf = STATE_SETTINGS.get(job["state"])
+        else:
+            basemap_conf = XYZ_BASEMAPS.get(job["basemap_type"])
+        template_files = [self.template_path(job["layout_size"], job["state"]), style_path]
+        input_keys = ["wtg", "wtg_buffer", "site_boundary", "site_boundary_buffer", "priority_area", "potential_area"]
+        return job_fingerprint(job, input_keys, template_files, basemap_conf, plugin_signature(self.plugin_dir))
+
+    def map_extent(self, center, map_item, scale):
+        """
+        Returns the extent shown by the map item at the given scale, centered on center.
+        """
+        map_width_m = (map_item.rect().width() * scale) / 1000
+        map_height_m = (map_item.rect().height() * scale) / 1000
+        return QgsRectangle(center.x() - map_width_m / 2, center.y() - map_height_m / 2,
+                            center.x() + map_width_m / 2, center.y() + map_height_m / 2)
+
+    def available_scales(self, basemap_type, state_selected):
+        """
+        Returns the scales a basemap can be printed at, topographic WMS are not available at every scale.
+        """
+        if basemap_type == "Topographic":
+            scales = STATE_SETTINGS.get(state_selected, {}).get("scales", {})
+            return sorted(int(scale) for scale in scales if int(scale) in MAP_SCALES)
+        return list(MAP_SCALES)
+
+    def plan_pages(self, extents, map_item, scale, basemap_type, state_selected, atlas=ATLAS_NONE, wtg_layer=None):
+        """
+        Chooses the scale and map extents that show all inputs.
+
+        A fixed scale gives one page centered on the inputs. With AUTO_SCALE, the smallest available scale
+        that fits everything is used, and if nothing fits the inputs are tiled into pages at the largest scale.
+        In atlas mode the inputs are always tiled, at the given scale or the most detailed one for AUTO_SCALE;
+        ATLAS_WTG keeps only the pages that contain features of wtg_layer.
+
+        Args:
+            extents (list): QgsReferencedRectangle of every input to show.
+
+        Returns:
+            Tuple(int, list[QgsRectangle]): The scale and the page extents in the CRS of the map item.
+        """
+        extent = union_extent(extents, map_item.crs())
+        if extent is None:
+            raise MapCraftError("The input layers have no extent.")
+
+        if atlas in (ATLAS_GRID, ATLAS_WTG):
+            if scale == AUTO_SCALE:
+                scales = self.available_scales(basemap_type, state_selected)
+                if not scales:
+                    raise MapCraftError(f"No scale available for {basemap_type} in {state_selected}.")
+                scale = scales[0]
+            pages = page_extents(extent, map_item, int(scale))
+            if atlas == ATLAS_WTG and wtg_layer is not None:
+                pages = occupied_pages(pages, wtg_layer, map_item.crs()) or pages
+            return int(scale), pages
+
+        if scale != AUTO_SCALE:
+            return int(scale), [self.map_extent(extent.center(), map_item, int(scale))]
+
+        scales = self.available_scales(basemap_type, state_selected)
+        if not scales:
+            raise MapCraftError(f"No scale available for {basemap_type} in {state_selected}.")
+        scale = fitting_scale(extent, map_item, scales)
+        if scale is not None:
+            return scale, [self.map_extent(extent.center(), map_item, scale)]
+        return scales[-1], page_extents(extent, map_item, scales[-1])
+
+    def get_tile_cache(self):
+        """
+        Returns the XYZ tile cache, or None when it is disabled in the settings.
+        """
+        if self.tile_cache is None:
+            self.tile_cache = TileCache.from_settings()
+        return self.tile_cache
+
+    def seed_basemap_tiles(self, basemap_type, scale, extent, dpi=300, wait=True):
+        """
+        Makes sure the XYZ tiles of a map extent are in the tile cache.
+
+        Args:
+            extent (QgsReferencedRectangle): Map extent with its CRS.
+            dpi (int): Export resolution, the zoom level is chosen for it.
+            wait (bool): Block until the tiles are downloaded. GUI runs do not wait: a map whose tiles are not
+                cached yet uses the remote tiles, the cache is filled in the background (see TileCache.seed_extent).
+
+        Returns:
+            int or None: Zoom level to render from the cache, or None to use the remote tiles.
+        """
+        xyz_settings = XYZ_BASEMAPS.get(basemap_type)
+        if not xyz_settings or extent is None:
+            return None
+        tile_cache = self.get_tile_cache()
+        if tile_cache is None:
+            return None
+
+        xyz_conf = xyz_settings["basemap"]
+        return tile_cache.seed_extent(provider_key(xyz_conf["title"]), xyz_conf["url"], extent, scale, xyz_conf["zmax"],
+                                      dpi, wait)
+
+    def get_wms_cache(self):
+        """
+        Returns the WMS map frame cache, or None when it is disabled in the settings.
+        """
+        if self.wms_cache is None:
+            self.wms_cache = WmsCache.from_settings()
+        return self.wms_cache
+
+    def get_frame_cache(self):
+        """
+        Returns the rendered map frame cache, or None when it is disabled in the settings.
+        """
+        if self.frame_cache is None:
+            self.frame_cache = FrameCache.from_settings()
+        return self.frame_cache
+
+    def use_cached_frame(self, map_item, dpi, resources, export_formats, background=True):
+        """
+        Draws a single page map item from its pre-rendered frame instead of the basemap and vector layers.
+        Later exports with the same extent, scale, layers and styles reuse the image from the frame cache.
+        The frame layer is added outside the layer tree and released with the other resources of the run.
+
+        Only raster exports (PNG, TIFF) use the frame, PDF and SVG keep their vector content. In the background
+        (GUI) mode a missing frame is not waited for: this export draws the layers and the frame is rendered in
+        the background for the next one.
+
+        Returns:
+            QgsRasterLayer or None: The frame layer, or None if the map item keeps its own layers.
+        """
+        frame_cache = self.get_frame_cache()
+        if frame_cache is None or map_item is None:
+            return None
+        if any(export_format not in RASTER_FORMATS for export_format in export_formats):
+            return None
+        path = frame_cache.get_frame(map_item, dpi, render=not background)
+        if not path:
+            return None
+        frame_layer = QgsRasterLayer(path, "Map frame", "gdal")
+        if not frame_layer.isValid():
+            return None
+        resources.add(frame_layer, False)
+        map_item.setLayers([frame_layer])
+        map_item.refresh()
+        return frame_layer
+
+    def cache_wms_frame(self, basemap_type, state_selected, scale, extent, map_item, dpi=None):
+        """
+        Makes sure the topographic WMS image of a map frame is in the WMS cache.
+
+        Args:
+            extent (QgsReferencedRectangle): Map extent with its CRS.
+            map_item (QgsLayoutItemMap): Map item, the extent at the scale and the layout DPI give the image size.
+            dpi (int or None): Image resolution instead of the layout DPI (export quality profile).
+
+        Returns:
+            str or None: Path of the cached GeoTIFF, or None to use the remote WMS.
+        """
+        if basemap_type != "Topographic" or extent is None:
+            return None
+        scale_conf = STATE_SETTINGS.get(state_selected, {}).get("scales", {}).get(str(scale))
+        wms_cache = self.get_wms_cache()
+        if not scale_conf or wms_cache is None:
+            return None
+
+        # MV is usually 25833, others are 25832.
+        auth_id = "EPSG:25833" if state_selected == "Mecklenburg-Vorpommern" else "EPSG:25832"
+        to_state_crs = QgsCoordinateTransform(extent.crs(), QgsCoordinateReferenceSystem(auth_id),
+                                              QgsProject.instance())
+        bbox = to_state_crs.transformBoundingBox(extent)
+
+        # Printed size of the extent, a multi-page extent is larger than the map item
+        dpi = int(dpi or map_item.layout().renderContext().dpi())
+        width = int(round(extent.width() * 1000 / scale * dpi / 25.4))
+        height = int(round(extent.height() * 1000 / scale * dpi / 25.4))
+        return wms_cache.get_image(provider_key(state_selected), scale_conf["wms_url"], scale_conf["layer_name"],
+                                   auth_id, (bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()),
+                                   width, height, dpi)
+
+    def job_map_frame(self, job):
+        """
+        Computes the map extent of a job the same way generate_automated_map does, without loading anything
+        into the project.
+
+        Returns:
+            Tuple(QgsPrintLayout, QgsLayoutItemMap, QgsReferencedRectangle, int): The layout (keep it alive while
+            the map item is used), its map item, the map extent covering all pages and the scale.
+        """
+        inputs, _ = load_inputs({key: job[key] for key in ("wtg", "wtg_buffer", "site_boundary",
+                                                           "site_boundary_buffer")})
+        if "wtg" not in inputs or not inputs["wtg"].isValid():
+            raise MapCraftError(f"Could not load WTG layout '{job['wtg']}'.")
+
+        layout = self.load_layout(job["layout_size"], job["state"])
+        map_item = LayoutBinding(layout).item("Map", QgsLayoutItemRegistry.LayoutMap)
+        if not map_item:
+            raise MapCraftError("Map item with ID 'Map' not found.")
+
+        extents = [referenced_extent(layer) for layer in inputs.values() if layer.isValid()]
+        scale = job["scale"] if job["scale"] == AUTO_SCALE else int(job["scale"])
+        scale, pages = self.plan_pages(extents, map_item, scale, job["basemap_type"], job["state"], job["atlas"],
+                                       inputs["wtg"])
+        return layout, map_item, QgsReferencedRectangle(pages_extent(pages), map_item.crs()), scale
+
+    def seed_job_tiles(self, job):
+        """
+        Pre-seeds the tile cache with the XYZ tiles of a job's map extent, without building or exporting the map.
+
+        Returns:
+            int: The seeded zoom level.
+        """
+        if job["basemap_type"] not in XYZ_BASEMAPS:
+            raise MapCraftError(f"Basemap '{job['basemap_type']}' is not tiled, nothing to seed.")
+        self.check_bulk_download(job["basemap_type"])
+
+        layout, map_item, map_frame, scale = self.job_map_frame(job)
+        tile_zoom = self.seed_basemap_tiles(job["basemap_type"], scale, map_frame)
+        if tile_zoom is None:
+            raise MapCraftError("Some tiles could not be downloaded.")
+        return tile_zoom
+
+    def check_bulk_download(self, basemap_type):
+        """
+        Raises MapCraftError if the tiles of an XYZ basemap must not be downloaded ahead of an export.
+        """
+        if not bulk_download_allowed(XYZ_BASEMAPS[basemap_type]["basemap"]["url"]):
+            raise MapCraftError(f"The {basemap_type} tile usage policy does not allow bulk downloads, "
+                                f"its tiles are only fetched when a map is exported.")
+
+    def find_offline_package(self, project_name, basemap_type, state_selected, scale, layout_size, map_frame):
+        """
+        Returns the offline basemap package of a project if it exists and covers the map frame, otherwise None.
+        """
+        path = package_path(project_name, basemap_type, state_selected, scale, layout_size)
+        if package_covers(path, map_frame):
+            QgsMessageLog.logMessage(f"Using offline basemap {path}", "MapCraft", Qgis.Info)
+            return path
+        return None
+
+    def prefetch_basemap(self, job):
+        """
+        Downloads the basemap of a job's map extent at print resolution into a local GeoPackage.
+        Later exports of the project use the package instead of the remote WMS/XYZ source.
+
+        Returns:
+            str: Path of the package.
+        """
+        layout, map_item, map_frame, scale = self.job_map_frame(job)
+        basemap_type = job["basemap_type"]
+
+        if basemap_type == "Topographic":
+            geotiff = self.cache_wms_frame(basemap_type, job["state"], scale, map_frame, map_item)
+            if geotiff is None:
+                raise MapCraftError(f"Could not download the WMS of {job['state']} at scale {scale}.")
+        elif basemap_type in XYZ_BASEMAPS:
+            self.check_bulk_download(basemap_type)
+            tile_zoom = self.seed_basemap_tiles(basemap_type, scale, map_frame)
+            if tile_zoom is None:
+                raise MapCraftError("Some tiles could not be downloaded.")
+            xyz_conf = XYZ_BASEMAPS[basemap_type]["basemap"]
+            geotiff = xyz_geotiff(self.get_tile_cache(), provider_key(xyz_conf["title"]), map_frame, tile_zoom)
+        else:
+            raise MapCraftError(f"Unknown basemap type: {basemap_type}")
+
+        path = package_path(job["project_name"], basemap_type, job["state"], scale, job["layout_size"])
+        return write_package(geotiff, path)
+
+    def load_layout(self, layout_size, state_selected):
+        """
+        Creates a print layout from the .qpt template of a layout size and UTM zone.
+        Parsed templates are kept in memory and only read again when the file changed on disk.
+        """
+        layout_path = self.template_path(layout_size, state_selected)
+        utm_zone = 33 if state_selected == "Mecklenburg-Vorpommern" else 32
+        mtime = os.path.getmtime(layout_path)
+
+        cached = self.template_cache.get((layout_size, utm_zone))
+        if cached and cached[0] == layout_path and cached[1] == mtime:
+            document = cached[2]
+        else:
+            with open(layout_path, 'r') as f:
+                template_content = f.read()
+            document = QDomDocument()
+            document.setContent(template_content)
+            self.template_cache[(layout_size, utm_zone)] = (layout_path, mtime, document)
+
+        layout = QgsPrintLayout(QgsProject.instance())
+        layout.initializeDefaults()
+        # loadFromTemplate strips the item uuids from the document it gets, so it works on a deep copy
+        layout.loadFromTemplate(document.cloneNode(True).toDocument(), QgsReadWriteContext())
+        return layout
+
+    def basemap_check(self, state_selected, scale, basemap_type):
+        """
+        Returns a check of the topographic WMS that can run in a worker thread, or None if there is nothing to check.
+        The check asks the WMS cache first, which keeps the capabilities of a service that answered for a while.
+        Frames already in the WMS cache or an offline package do not need the service, so a failed check is
+        only reported.
+        """
+        if basemap_type != "Topographic":
+            return None
+        scale_conf = STATE_SETTINGS.get(state_selected, {}).get("scales", {}).get(str(scale))
+        if not scale_conf:
+            return None
+        wms_cache = self.get_wms_cache()
+        if wms_cache is not None:
+            return lambda: wms_cache.layer_available(scale_conf["wms_url"], scale_conf["layer_name"])
+        return lambda: wms_layer_available(scale_conf["wms_url"], scale_conf["layer_name"])
+
+    def acquire_basemap(self, state_selected, scale, basemap_type, tile_zoom=None, raster_path=None,
+                        profile=DEFAULT_PROFILE):
+        """
+        Returns the basemap for a map, with the resampling and opacity of the export quality profile.
+        While a batch is running, basemaps are loaded once per profile and shared between jobs.
+        """
+        if self.basemap_pool is None:
+            basemap = self.load_wms_layer(state_selected, scale, basemap_type, tile_zoom, raster_path)
+            self.apply_basemap_profile(basemap[0], profile)
+            return basemap
+
+        # Shared layers are never changed by a job, jobs with another profile get their own layer
+        if basemap_type == "Topographic":
+            key = (basemap_type, state_selected, str(scale), raster_path, profile)
+        else:
+            key = (basemap_type, tile_zoom, raster_path, profile)  # XYZ basemaps only depend on the cached zoom level
+
+        if key not in self.basemap_pool:
+            basemap = self.load_wms_layer(state_selected, scale, basemap_type, tile_zoom, raster_path)
+            if basemap[0] is None:
+                return basemap  # Do not share failures, the next job tries again
+            self.apply_basemap_profile(basemap[0], profile)
+            self.basemap_pool[key] = basemap
+        return self.basemap_pool[key]
+
+    def release_basemap_pool(self):
+        """
+        Removes the basemaps shared during a batch from the project.
+        """
+        if self.basemap_pool:
+            for wms_layer, _, _ in self.basemap_pool.values():
+                QgsProject.instance().removeMapLayer(wms_layer)
+        self.basemap_pool = None
+
+    def release_run(self, resources):
+        """
+        Releases the layers, layouts and exporters of one map once it is exported, failed or was canceled.
+        Layers the user keeps and shared batch basemaps stay in the project.
+        """
+        resources.release()
+        if self.iface is not None:
+            self.iface.mapCanvas().refresh()
+
+    def prepare_area_layer(self, layer, map_frame, scale, dpi, resources):
+        """
+        Returns a copy of an area layer clipped to the map frame and simplified to the print tolerance.
+        Regional plan areas cover whole districts, only the part on the map is drawn. Clipped features are kept
+        per source, extent, scale and DPI for later exports of the same map.
+
+        Args:
+            map_frame (QgsReferencedRectangle): Extent of all pages with its CRS.
+            resources (RunResources): Run the copy belongs to, it is added outside the layer tree.
+
+        Returns:
+            QgsVectorLayer or None: Memory layer with the style of layer, or None to draw layer as it is.
+        """
+        if layer is None or not layer.isValid() or layer.geometryType() != QgsWkbTypes.PolygonGeometry:
+            return None
+        rect = clip_rect(map_frame, map_frame.crs(), layer.crs(), scale)
+        key = (source_key(layer), layer.crs().authid(), rect.toString(3), scale, dpi)
+
+        features = self.area_cache.get(key)
+        if features is None:
+            features = clip_features(layer, rect, print_tolerance(scale, dpi))
+            if len(self.area_cache) >= AREA_CACHE_SIZE:
+                self.area_cache.pop(next(iter(self.area_cache)))  # Oldest entry
+            self.area_cache[key] = features
+
+        prepared = memory_layer(layer, features)
+        prepared.setCustomProperty("mapcraft/source", repr(key))  # Part of the frame cache key
+        return resources.add(prepared, False)
+
+    def apply_basemap_profile(self, wms_layer, profile):
+        """
+        Sets the resampling and opacity of the basemap for an export quality profile.
+        """
+        if wms_layer is None:
+            return
+        conf = EXPORT_PROFILES[profile]
+        resampler = {"bilinear": QgsBilinearRasterResampler, "cubic": QgsCubicRasterResampler}.get(conf["resampling"])
+        resample_filter = wms_layer.resampleFilter()
+        if resample_filter is not None:
+            # No resampler is nearest neighbour
+            resample_filter.setZoomedInResampler(resampler() if resampler else None)
+            resample_filter.setZoomedOutResampler(resampler() if resampler else None)
+        if conf["basemap_opacity"] is not None:
+            wms_layer.setOpacity(conf["basemap_opacity"])
+
+    def stage_wrapper(self, profiler):
+        """
+        Returns a LayoutBinding.apply wrap function that times the scale bar, legend and label handlers.
+        """
+        stages = {"scale": "scale_bar", "symbology": "legend"}
+
+        def wrap(item_id, handler):
+            return profiler.wrap(stages.get(item_id, "labels"), handler)
+        return wrap
+
+    def finish_profile(self, profiler, output_folder, status="ok"):
+        """
+        Writes the stage timings of a map to the profile log of its output folder and shows the optional summary.
+        """
+        summary = profiler.write(output_folder, status)
+        if summary:
+            self.push_message("info", "MapCraft timing", summary)
+
+    def start_export_task(self, layout, paths, on_finished, profile=DEFAULT_PROFILE, resources=None):
+        """
+        Hands the export of a prepared layout to all formats of paths over to the QGIS task manager, which renders
+        a copy of the layout in the background (see MapExportTask). on_finished(task, success) runs on the main
+        thread when the task ends.
+        """
+        def task_finished(task, success):
+            if task in self.export_tasks:
+                self.export_tasks.remove(task)
+            on_finished(task, success)
+
+        task = MapExportTask(layout, paths, task_finished, profile, resources)
+        self.export_tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+        return task
+
     def run_map_generation(self):
         mode = self.mode_combo.currentText()
         if mode == "Automated":
@@ -773,91 +1461,226 @@ class MapCraftPlugin:
         else:
             self.run_manual_map()
 
+    def collect_automated_job(self):
+        """
+        Reads the automated map inputs from the dialog into a job dict (same keys as a batch manifest).
+        """
+        return {
+            "wtg": self.wtg_path.text(),
+            "wtg_buffer": self.wtg_buff_path.text(),
+            "wtg_buffer_size": self.wtg_buff_size_input.text(),
+            "site_boundary": self.sibdry_path.text(),
+            "site_boundary_buffer": self.sibdry_buff_path.text(),
+            "site_boundary_buffer_size": self.sibdry_buff_size_input.text(),
+            "priority_area": self.priory_area.text(),
+            "potential_area": self.potential_area.text(),
+            "project_name": self.project_name_input.text(),
+            "map_title": self.Map_title_input.text(),
+            "layout_size": self.layout_size_combo.currentText(),
+            "basemap_type": self.basemap_combo.currentText(),
+            "state": self.state_combo.currentText(),
+            "scale": self.selected_scale(),
+            "atlas": self.atlas_combo.currentData(),
+            "export_format": self.selected_formats(),
+            "export_profile": self.profile_combo.currentData(),
+            "output_folder": self.pdf_path.text(),
+            "keep_layers": self.keepLayersCheckBox.isChecked(),
+            "force": self.forceExportCheckBox.isChecked(),
+        }
+
+    def selected_formats(self):
+        """
+        Returns the checked export formats, e.g. ["PDF", "PNG"].
+        """
+        return [export_format for export_format, checkbox in self.format_checkboxes.items() if checkbox.isChecked()]
+
+    def selected_scale(self):
+        """
+        Returns the scale chosen in the dialog as int, or AUTO_SCALE.
+        """
+        if self.scale_combo.currentText() == "Auto":
+            return AUTO_SCALE
+        return int(self.scale_combo.currentText())
+
     def run_automated_map(self):
-        Layout = self.wtg_path.text()
-        Layout_buff = self.wtg_buff_path.text()
-        layout_buff_size = self.wtg_buff_size_input.text()
-        Site_Bdry = self.sibdry_path.text()
-        Site_Bdry_buff = self.sibdry_buff_path.text()
-        Site_Bdry_buff_size = self.sibdry_buff_size_input.text()
-        wind_priory_area = self.priory_area.text()
-        wind_potential_area = self.potential_area.text()
-        project_name = self.project_name_input.text()
-        Map_title = self.Map_title_input.text()
-        layout_size = self.layout_size_combo.currentText()
-        basemap_type = self.basemap_combo.currentText()
-        state_selected = self.state_combo.currentText()
-        scale = int(self.scale_combo.currentText())
-        export_format = self.format_combo.currentText()
-        output_folder = self.pdf_path.text()
+        try:
+            self.generate_automated_map(self.collect_automated_job(), background=True)
+        except MapCraftError as e:
+            print("MapCraft Plugin", str(e))
+
+    def run_batch_from_manifest(self):
+        """
+        Runs every job of a CSV/JSON manifest and writes a report next to it. The maps are exported one after the
+        other by background export tasks, the batch can be followed and canceled in the task manager.
+        """
+        if self.batch_task is not None:
+            self.push_message("warning", "MapCraft Plugin", "A batch is already running.")
+            return
+
+        manifest_path, _ = QFileDialog.getOpenFileName(None, "Select job manifest", "",
+                                                       "Job manifests (*.csv *.json)")
+        if not manifest_path:
+            return
+
+        try:
+            jobs = read_manifest(manifest_path)
+        except (OSError, ValueError) as e:
+            self.push_message("critical", "MapCraft Plugin", f"Could not read manifest: {e}")
+            return
+
+        report_path = default_report_path(manifest_path)
+
+        def batch_finished(results):
+            self.batch_task = None
+            failed = sum(1 for result in results if result["status"] != "success")
+            level = "critical" if failed else "success"
+            self.push_message(level, "MapCraft Plugin",
+                              f"{len(results) - failed} of {len(results)} maps exported. Report: {report_path}")
+
+        self.batch_task = run_batch_async(self, jobs, report_path, batch_finished)
+
+    def generate_automated_map(self, job, background=False, on_exported=None):
+        """
+        Builds and exports one map from a job dict, without touching the dialog widgets.
+
+        Args:
+            job (dict): Inputs as returned by collect_automated_job() or read from a batch manifest.
+            background (bool): Export in a QgsTask (GUI) instead of blocking until the file is written.
+            on_exported (callable): Optional, with background: called with (success, error) on the main thread
+                once the export task ended, or right away if the map is up to date.
+
+        Returns:
+            list[str]: Paths of the exported files, one per format (the first page of paged images).
+
+        Raises:
+            MapCraftError: If a required input is missing or the export fails.
+        """
+        profiler = StageProfiler.from_settings("automated", job["project_name"])
+        # Inputs go into a private layer store unless the user keeps them in the project
+        resources = RunResources(working_layers_enabled() and not job["keep_layers"])
+        try:
+            return self.build_automated_map(job, background, profiler, resources, on_exported)
+        except Exception:
+            self.release_run(resources)
+            self.finish_profile(profiler, job["output_folder"], "failed")
+            raise
+
+    def build_automated_map(self, job, background, profiler, resources, on_exported=None):
+        """
+        Pipeline of generate_automated_map, timed stage by stage with profiler (see StageProfiler).
+        Everything it creates is tracked by resources and released when the export ends.
+        """
+        Layout = job["wtg"]
+        Layout_buff = job["wtg_buffer"]
+        layout_buff_size = job["wtg_buffer_size"]
+        Site_Bdry = job["site_boundary"]
+        Site_Bdry_buff = job["site_boundary_buffer"]
+        Site_Bdry_buff_size = job["site_boundary_buffer_size"]
+        wind_priory_area = job["priority_area"]
+        wind_potential_area = job["potential_area"]
+        project_name = job["project_name"]
+        Map_title = job["map_title"]
+        layout_size = job["layout_size"]
+        basemap_type = job["basemap_type"]
+        state_selected = job["state"]
+        scale = job["scale"] if job["scale"] == AUTO_SCALE else int(job["scale"])
+        atlas = job["atlas"]
+        profile = job["export_profile"]
+        dpi = EXPORT_PROFILES[profile]["dpi"]
+        output_folder = job["output_folder"]
+        keep_layers = job["keep_layers"]
 
         today_name = datetime.today().strftime("%Y%m%d")
         pdf_filename = f"{today_name}_Windpark_{project_name}_{layout_size}"
         filename_base = os.path.join(output_folder, pdf_filename)
 
-        if export_format == "PDF":
-            output_path = os.path.join(self.pdf_path.text(), f"{filename_base}.pdf")
-        else:
-            output_path = os.path.join(self.pdf_path.text(), f"{filename_base}.png")
-
         # Check if one requested parameter is missing
         if not Layout or not project_name or not output_folder or not Map_title:
-            print("Please complete all fields before running.")
-            return
+            raise MapCraftError("Please complete all fields before running.")
+
+        # Every format is exported from the same prepared layout
+        try:
+            export_formats = parse_formats(job["export_format"])
+        except ValueError as e:
+            raise MapCraftError(f"{e}. Please select at least one of PDF, PNG, SVG or TIFF.")
+        format_text = " + ".join(export_formats)
+        paths = output_paths(filename_base, export_formats)
 
         # Check if WTG buffer SHP is selected but no buffer size entered
         if Layout_buff and not layout_buff_size.strip():
-            print("Missing Input", "Please enter the WTG buffer size.")
-            return
+            raise MapCraftError("Please enter the WTG buffer size.")
 
         # Check if Site boundary buffer SHP is selected but no buffer size entered
         if Site_Bdry_buff and not Site_Bdry_buff_size.strip():
-            print("Missing Input", "Please enter the site boundary buffer size.")
-            return
+            raise MapCraftError("Please enter the site boundary buffer size.")
 
-        if state_selected == "Mecklenburg-Vorpommern":
-            template_name = f"Übersichskarte_{layout_size}_UTM33.qpt"
-        else:
-            template_name = f"Übersichskarte_{layout_size}.qpt"
-
-        layout_path = os.path.join(self.plugin_dir, template_name)
         style_path = os.path.join(self.plugin_dir, "WEA.qml")
 
+        # Skip the whole run if inputs, fields, template and basemap are the same as for the files on disk.
+        # Runs that keep their layers or are forced always export, the user expects the layers in the project.
+        state_key = os.path.basename(filename_base)
+        export_state = ExportState(output_folder)
+        fingerprint = self.export_fingerprint(job, style_path)
+        if incremental_enabled() and not keep_layers and not job.get("force"):
+            previous_paths = export_state.up_to_date(state_key, fingerprint)
+            if previous_paths:
+                self.push_message("info", "MapCraft Plugin",
+                                  f"{project_name} did not change since the last export, the files are up to date.")
+                self.release_run(resources)
+                self.finish_profile(profiler, output_folder, "unchanged")
+                if background and on_exported:
+                    on_exported(True, "")
+                return previous_paths
+            QgsMessageLog.logMessage(f"{project_name} changed since the last export: "
+                                     f"{', '.join(export_state.changed_parts(state_key, fingerprint))}",
+                                     "MapCraft", Qgis.Info)
+
         map_layers = []
         shp_layers_ref = []  # Create a list to be used a REF
 
+        # Open all SHPs and check the basemap service at the same time, each open can take seconds on network shares
+        profiler.start("inputs")
+        inputs, basemap_available = load_inputs({
+            "wtg": Layout,
+            "wtg_buffer": Layout_buff,
+            "site_boundary": Site_Bdry,
+            "site_boundary_buffer": Site_Bdry_buff,
+            "potential_area": wind_potential_area,
+            "priority_area": wind_priory_area,
+        }, self.basemap_check(state_selected, scale, basemap_type))
+        if basemap_available is False:
+            self.push_message("warning", "MapCraft Plugin",
+                              f"Topographic WMS for {state_selected} does not answer, only cached images can be used.")
+
         # Load WTG SHP
         layer_name = os.path.basename(Layout) # This is to get the SHP name in the ref
-        WTG_layer = QgsVectorLayer(Layout, layer_name, "ogr")
+        WTG_layer = inputs["wtg"]
         if WTG_layer.isValid():
-            # Remove any existing layer with the same data source
-            for layer in QgsProject.instance().mapLayers().values():
-                if isinstance(layer, QgsVectorLayer) and layer.source() == WTG_layer.source():
-                    QgsProject.instance().removeMapLayer(layer.id())
+            # Remove any existing layer with the same data source (private working layers cannot clash)
+            if not resources.private:
+                for layer in QgsProject.instance().mapLayers().values():
+                    if isinstance(layer, QgsVectorLayer) and layer.source() == WTG_layer.source():
+                        QgsProject.instance().removeMapLayer(layer.id())
 
 
             # Load style and add to project
             WTG_layer.loadNamedStyle(style_path)
             WTG_layer.triggerRepaint()
-            QgsProject.instance().addMapLayer(WTG_layer)
+            resources.add(WTG_layer, keep=keep_layers)
             shp_layers_ref.append(layer_name)
             map_layers.append(WTG_layer)
 
 
-            # Get the first value from the 'LAYOUT' field
-            layout_value = None
-            layout_field_index = WTG_layer.fields().indexOf('LAYOUT')
-            if layout_field_index != -1:
-                for feature in WTG_layer.getFeatures():
-                    layout_value = feature['LAYOUT']
-                    if layout_value:
-                        break
+            # Get the first value from the 'LAYOUT' field, together with the WTG extent
+            layout_value, wtg_extent = scan_wtg_layer(WTG_layer, 'LAYOUT')
+        else:
+            raise MapCraftError(f"Could not load WTG layout '{Layout}'.")
 
         # Load WTG Buffer SHP
         WTG_buff_layer = None
         if Layout_buff:
             layer_name_1 = os.path.basename(Layout_buff)  # Get the SHP name
-            WTG_buff_layer = QgsVectorLayer(Layout_buff, layer_name_1, "ogr")
+            WTG_buff_layer = inputs["wtg_buffer"]
 
             if WTG_buff_layer.isValid():
                 # Create a transparent fill with red outline
@@ -870,7 +1693,7 @@ class MapCraftPlugin:
 
                 WTG_buff_layer.setRenderer(QgsSingleSymbolRenderer(symbol))
                 WTG_buff_layer.triggerRepaint()
-                QgsProject.instance().addMapLayer(WTG_buff_layer)
+                resources.add(WTG_buff_layer, keep=keep_layers)
                 shp_layers_ref.append(layer_name_1)
                 map_layers.append(WTG_buff_layer)
 
@@ -878,7 +1701,7 @@ class MapCraftPlugin:
         Site_Bdry_layer = None
         if Site_Bdry:
             layer_name_2 = os.path.basename(Site_Bdry)  # This is to get the SHP name in the ref
-            Site_Bdry_layer = QgsVectorLayer(Site_Bdry, layer_name_2, "ogr")
+            Site_Bdry_layer = inputs["site_boundary"]
             if Site_Bdry_layer.isValid():
                 # Create a transparent fill with red outline
                 symbol = QgsFillSymbol.createSimple({
@@ -888,7 +1711,7 @@ class MapCraftPlugin:
                 })
                 Site_Bdry_layer.setRenderer(QgsSingleSymbolRenderer(symbol))
                 Site_Bdry_layer.triggerRepaint()
-                QgsProject.instance().addMapLayer(Site_Bdry_layer)
+                resources.add(Site_Bdry_layer, keep=keep_layers)
                 shp_layers_ref.append(layer_name_2)
                 map_layers.append(Site_Bdry_layer)
 
@@ -896,7 +1719,7 @@ class MapCraftPlugin:
         Site_Bdry_buff_layer = None
         if Site_Bdry_buff:
             layer_name_3 = os.path.basename(Site_Bdry_buff)  # Get the SHP name
-            Site_Bdry_buff_layer = QgsVectorLayer(Site_Bdry_buff, layer_name_3, "ogr")
+            Site_Bdry_buff_layer = inputs["site_boundary_buffer"]
 
             if Site_Bdry_buff_layer.isValid():
                 # Create the bottom stroke: thick, light red, semi-transparent
@@ -922,7 +1745,7 @@ class MapCraftPlugin:
                 Site_Bdry_buff_layer.triggerRepaint()
 
                 # Add the layer to the project
-                QgsProject.instance().addMapLayer(Site_Bdry_buff_layer)
+                resources.add(Site_Bdry_buff_layer, keep=keep_layers)
                 shp_layers_ref.append(layer_name_3)
                 map_layers.append(Site_Bdry_buff_layer)
 
@@ -930,7 +1753,7 @@ class MapCraftPlugin:
         potential_area_layer = None
         if wind_potential_area:
             layer_name_5 = os.path.basename(wind_potential_area)
-            potential_area_layer = QgsVectorLayer(wind_potential_area, layer_name_5, "ogr")
+            potential_area_layer = inputs["potential_area"]
 
             if potential_area_layer.isValid():
                 # --- Fill style with diagonal lines ---
@@ -959,7 +1782,7 @@ class MapCraftPlugin:
                 potential_area_layer.triggerRepaint()
 
                 # Add the layer to the project
-                QgsProject.instance().addMapLayer(potential_area_layer)
+                resources.add(potential_area_layer, keep=keep_layers)
                 shp_layers_ref.append(layer_name_5)
                 map_layers.append(potential_area_layer)
 
@@ -967,7 +1790,7 @@ class MapCraftPlugin:
         priority_area_layer = None
         if wind_priory_area:
             layer_name_4 = os.path.basename(wind_priory_area)  # Get the SHP name
-            priority_area_layer = QgsVectorLayer(wind_priory_area, layer_name_4, "ogr")
+            priority_area_layer = inputs["priority_area"]
 
             if priority_area_layer.isValid():
                 # Create the bottom stroke: thick, light red, semi-transparent
@@ -993,7 +1816,7 @@ class MapCraftPlugin:
                 priority_area_layer.triggerRepaint()
 
                 # Add the layer to the project
-                QgsProject.instance().addMapLayer(priority_area_layer)
+                resources.add(priority_area_layer, keep=keep_layers)
                 shp_layers_ref.append(layer_name_4)
                 map_layers.append(priority_area_layer)
 
@@ -1001,8 +1824,41 @@ class MapCraftPlugin:
         # print(f"UI Scale Selected: {scale}")
         # print(f"UI Basemap Type: '{basemap_type}'")
 
-        # Load the WMS sever
-        wms_layer, conf_dict, scale_conf = self.load_wms_layer(state_selected, scale, basemap_type)
+        profiler.stop("inputs")
+
+        # Load Layout
+        profiler.start("template")
+        layout = resources.track_layout(self.load_layout(layout_size, state_selected))
+
+        # Map Item
+        binding = LayoutBinding(layout)
+        map_item = binding.item("Map", QgsLayoutItemRegistry.LayoutMap)
+        profiler.stop("template")
+
+        # Load the WMS sever (XYZ tiles and WMS images of the map extent are served from the caches)
+        profiler.start("basemap")
+        tile_zoom = None
+        raster_path = None
+        pages = []
+        if map_item:
+            # Frame the WTGs together with the site boundary and the buffers, the basemap covers all pages
+            extents = [QgsReferencedRectangle(wtg_extent, WTG_layer.crs())]
+            extents += [referenced_extent(layer) for layer in (WTG_buff_layer, Site_Bdry_layer, Site_Bdry_buff_layer)
+                        if layer is not None and layer.isValid()]
+            scale, pages = self.plan_pages(extents, map_item, scale, basemap_type, state_selected, atlas, WTG_layer)
+            map_frame = QgsReferencedRectangle(pages_extent(pages), map_item.crs())
+            raster_path = self.find_offline_package(project_name, basemap_type, state_selected, scale, layout_size,
+                                                    map_frame)
+            if raster_path is None:
+                tile_zoom = self.seed_basemap_tiles(basemap_type, scale, map_frame, dpi, wait=not background)
+                raster_path = self.cache_wms_frame(basemap_type, state_selected, scale, map_frame, map_item, dpi)
+        elif scale == AUTO_SCALE:
+            raise MapCraftError("Map item with ID 'Map' not found, the scale cannot be chosen.")
+        wms_layer, conf_dict, scale_conf = self.acquire_basemap(state_selected, scale, basemap_type, tile_zoom,
+                                                                raster_path, profile)
+        # Shared batch basemaps are removed at the end of the batch
+        resources.track(wms_layer, keep=self.basemap_pool is not None, temporary=True)
+        profiler.stop("basemap")
         # print(f"Returned conf_dict: {conf_dict}")
         # print(f"Returned wms_layer valid: {wms_layer.isValid() if wms_layer else 'None'}")
         #
@@ -1013,212 +1869,68 @@ class MapCraftPlugin:
         # print("---------------------")
         map_layers.append(wms_layer)
 
-
-
-        # Load Layout
-        with open(layout_path, 'r') as f:
-            template_content = f.read()
-        document = QDomDocument()
-        document.setContent(template_content)
-
-        layout = QgsPrintLayout(QgsProject.instance())
-        layout.initializeDefaults()
-        layout.loadFromTemplate(document, QgsReadWriteContext())
-
-        # Map Item
-        map_item = next((item for item in layout.items() if isinstance(item, QgsLayoutItemMap) and item.id() == "Map"),
-                        None)
+        # Draw only the part of the regional plan areas that is on the map, simplified for the scale and DPI
+        if map_item:
+            profiler.start("areas")
+            for area_layer in (potential_area_layer, priority_area_layer):
+                prepared = self.prepare_area_layer(area_layer, map_frame, scale, dpi, resources)
+                if prepared is not None:
+                    map_layers[map_layers.index(area_layer)] = prepared
+
+            # Private mode renders the other inputs from memory as well, only their features on the map are read
+            if resources.private:
+                for input_layer in (WTG_layer, WTG_buff_layer, Site_Bdry_layer, Site_Bdry_buff_layer):
+                    if input_layer is not None and input_layer in map_layers:
+                        map_layers[map_layers.index(input_layer)] = resources.copy(input_layer, map_frame, scale)
+            profiler.stop("areas")
 
         if map_item:
             map_item.setLayers(map_layers) # Make sure that only the loaded layers are visible on the PDF map.
             map_item.setScale(scale)
-            map_width_m = (map_item.rect().width() * scale) / 1000
-            map_height_m = (map_item.rect().height() * scale) / 1000
-            center = WTG_layer.extent().center()
-            extent = QgsRectangle(center.x() - map_width_m / 2, center.y() - map_height_m / 2,
-                                  center.x() + map_width_m / 2, center.y() + map_height_m / 2)
-            map_item.setExtent(extent)
+            map_item.setExtent(pages[0])
             map_item.refresh()
 
-            # === SCALE BAR SETUP ===
-            scale_bar_item = layout.itemById('scale')
-            if isinstance(scale_bar_item, QgsLayoutItemScaleBar) and map_item:
-                scale_bar_item.setStyle('Line Ticks Up')
-                scale_bar_item.setUnits(QgsUnitTypes.DistanceKilometers)
-                scale_bar_item.setNumberOfSegmentsLeft(0)
-                scale_bar_item.setLinkedMap(map_item)
-
-                if layout_size == "A4":
+            # Several pages are printed as an atlas, template, legend and basemap are shared by all pages
+            if len(pages) > 1:
+                self.push_message("info", "MapCraft Plugin", f"Printing {project_name} on {len(pages)} pages "
+                                                             f"at 1:{scale}.")
+                setup_page_atlas(layout, map_item, pages, os.path.basename(filename_base))
+                paths = output_paths(filename_base, export_formats, paged=True)  # Images are written per page
+            else:
+                # Basemap and vector layers of a single page come from the frame cache
+                profiler.start("frame")
+                self.use_cached_frame(map_item, dpi, resources, export_formats, background)
+                profiler.stop("frame")
 
-                    if scale == 10000:
-                        real_world_km = 0.25
-                        segments = 2
-
-                    elif scale == 15000:
-                        real_world_km = 0.5
-                        segments = 2
-
-                    elif scale == 25000:
-                        real_world_km = 1
-                        segments = 2
-
-                    elif scale == 50000:
-                        real_world_km = 2
-                        segments = 2
-
-                    units_per_segment = real_world_km / segments
-
-                    # Apply to scale bar
-                    scale_bar_item.setNumberOfSegments(segments)
-                    scale_bar_item.setUnitsPerSegment(units_per_segment)
-
-                    if scale == 10000:
-                        # Adjust scale bar position
-                        current_pos = scale_bar_item.pos()
-                        adjusted_x = current_pos.x() + 2  # Move x mm to the left
-                        adjusted_y = current_pos.y()  # Keep Y position unchanged
-                        scale_bar_item.attemptMove(
-                            QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                    elif scale == 15000:
-                        # Adjust scale bar position
-                        current_pos = scale_bar_item.pos()
-                        adjusted_x = current_pos.x() - 3  # Move x mm to the left
-                        adjusted_y = current_pos.y()  # Keep Y position unchanged
-                        scale_bar_item.attemptMove(
-                            QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                    elif scale == 25000 or scale == 50000:
-                        # Adjust scale bar position
-                        current_pos = scale_bar_item.pos()
-                        adjusted_x = current_pos.x() - 5  # Move x mm to the left
-                        adjusted_y = current_pos.y()  # Keep Y position unchanged
-                        scale_bar_item.attemptMove(
-                            QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                else:  # A3 or larger
-
-                    if scale == 10000:
-                        real_world_km = 0.5
-                        segments = 2
-
-                    elif scale == 15000:
-                        real_world_km = 0.5
-                        segments = 2
-
-                    elif scale == 25000:
-                        real_world_km = 1.0
-                        segments = 2
-
-                    elif scale == 50000:
-                        real_world_km = 2.0
-                        segments = 2
-
-                    units_per_segment = real_world_km / segments
-
-                    # Apply to scale bar
-                    scale_bar_item.setNumberOfSegments(segments)
-                    scale_bar_item.setUnitsPerSegment(units_per_segment)
-
-                    if scale == 10000:
-                        # Adjust scale bar position
-                        current_pos = scale_bar_item.pos()
-                        adjusted_x = current_pos.x() - 5  # Move x mm to the left
-                        adjusted_y = current_pos.y()  # Keep Y position unchanged
-                        scale_bar_item.attemptMove(
-                            QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                    elif scale == 15000:
-                        # Adjust scale bar position
-                        current_pos = scale_bar_item.pos()
-                        adjusted_x = current_pos.x() + 5  # Move x mm to the right
-                        adjusted_y = current_pos.y()  # Keep Y position unchanged
-                        scale_bar_item.attemptMove(
-                            QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                    elif scale == 25000 or scale == 50000:
-                        # No position adjustment defined
-                        pass
-
-                # Get the width of the scale bar in layout units (mm)
-                scale_bar_width_mm = scale_bar_item.rect().width()
+            # === SCALE BAR SETUP ===
+            binding.register('scale', lambda item: self.setup_scale_bar(item, map_item, layout_size, scale),
+                             QgsLayoutItemRegistry.LayoutScaleBar)
 
             # === LEGEND SETUP ===
-            legend_item = layout.itemById("symbology")  # Make sure your layout legend ID is 'symbology'
-            if legend_item and map_item:
-                legend_item.setLinkedMap(map_item)
-
-                # Disable auto-update to manually control legend entries
-                legend_item.setAutoUpdateModel(False)
-
-                # Access the legend model and clear all current entries
-                legend_model = legend_item.model()
-                root_group = legend_model.rootGroup()
-                root_group.removeAllChildren()
-
-                # Add WTG layer manually
-                root_group.addLayer(WTG_layer)
-
-                # Rename the legend label for the SHP WTG_layer
-                for child in root_group.findLayers():
-                    if child.layer() == WTG_layer:
-                        if layout_value is not None:
-                            child.setName(f"WEA - Neuplanung ({layout_value})")
-                        else:
-                            child.setName("WEA - Neuplanung")
-
-                # Add optional layer if available and rename accordingly
-                if WTG_buff_layer:
-                    root_group.addLayer(WTG_buff_layer)
-                    for child in root_group.findLayers():
-                        if child.layer() == WTG_buff_layer:
-                            name = "Rotorradius"
-                            if layout_buff_size:
-                                name = f"{name} ({layout_buff_size} m)"
-                            child.setName(name)
-
-                if Site_Bdry_layer:
-                    root_group.addLayer(Site_Bdry_layer)
-                    for child in root_group.findLayers():
-                        if child.layer() == Site_Bdry_layer:
-                            child.setName("Projektfläche")
-
-                if Site_Bdry_buff_layer:
-                    root_group.addLayer(Site_Bdry_buff_layer)
-                    for child in root_group.findLayers():
-                        if child.layer() == Site_Bdry_buff_layer:
-                            name = "Abstandsfläche"
-                            if Site_Bdry_buff_size:
-                                name = f"{name} ({Site_Bdry_buff_size} m)"
-                            child.setName(name)
-
-                if priority_area_layer:
-                    root_group.addLayer(priority_area_layer)
-                    for child in root_group.findLayers():
-                        if child.layer() == priority_area_layer:
-                            child.setName("Windvorranggebiet")
-
-                if potential_area_layer:
-                    root_group.addLayer(potential_area_layer)
-                    for child in root_group.findLayers():
-                        if child.layer() == potential_area_layer:
-                            child.setName("Potenzialfläche")
-
+            legend_entries = [
+                (WTG_layer, f"WEA - Neuplanung ({layout_value})" if layout_value is not None else "WEA - Neuplanung"),
+                (WTG_buff_layer, f"Rotorradius ({layout_buff_size} m)" if layout_buff_size else "Rotorradius"),
+                (Site_Bdry_layer, "Projektfläche"),
+                (Site_Bdry_buff_layer,
+                 f"Abstandsfläche ({Site_Bdry_buff_size} m)" if Site_Bdry_buff_size else "Abstandsfläche"),
+                (priority_area_layer, "Windvorranggebiet"),
+                (potential_area_layer, "Potenzialfläche"),
+            ]
+
+            def setup_legend(legend_item):
                 # Set font size for legend labels if layout is A4
+                fonts = None
                 if layout_size == "A4":
-                    label_style = legend_item.style(QgsLegendStyle.SymbolLabel)
-                    label_font = label_style.font()
+                    label_font = legend_item.style(QgsLegendStyle.SymbolLabel).font()
                     label_font.setPointSize(7)
-                    label_style.setFont(label_font)
-                    legend_item.setStyle(QgsLegendStyle.SymbolLabel, label_style)
+                    fonts = {QgsLegendStyle.SymbolLabel: label_font}
+                build_legend(legend_item, map_item, legend_entries, fonts)
 
-                legend_item.refresh()
+            binding.register("symbology", setup_legend)  # Make sure your layout legend ID is 'symbology'
 
         # Dynamic Labels
         copyright_text = ""
         projection = WTG_layer.crs().description()
-        today = datetime.today().strftime("%d/%m/%y")
-        username = getpass.getuser()
         ref_text = " | ".join(shp_layers_ref)
         if basemap_type == "Topographic" and conf_dict:
             copyright_text = conf_dict.get("copyright", "")
@@ -1227,416 +1939,187 @@ class MapCraftPlugin:
         elif basemap_type == "OpenStreetMap" and conf_dict:
             copyright_text = conf_dict.get("copyright", "")
 
-        dpi_ = layout.renderContext().dpi()
-        for item in layout.items():
-            if item.type() == QgsLayoutItemRegistry.LayoutLabel:
-
-                if item.id() == 'label_proj':
-                    full_name = f"CRS: {projection}"
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(10)
-                    elif layout_size == "A4":
-                        font.setPointSize(7)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-                elif item.id() == 'label_druck':
-                    if layout_size == "A3":
-                        full_name = f"Druck: A3"
-                        font = item.font()
-                        font = item.font()
-                        font.setPointSize(10)
-                        item.setFont(font)
-                        item.setText(full_name)
-                    elif layout_size == "A4":
-                        full_name = f"Druck: A4"
-                        font = item.font()
-                        font = item.font()
-                        font.setPointSize(7)
-                        item.setFont(font)
-                        item.setText(full_name)
-
-
-                elif item.id() == 'label_Maßstab':
-                    full_name = f"Maßstab:"
-                    font = item.font()
-                    if layout_size == "A3":
-                        font.setPointSize(10)
-                    elif layout_size == "A4":
-                        font.setPointSize(7)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-
-                elif item.id() == 'label_creator':
-                    full_name = f"Karte erzeugt am {today} von {username}"
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(10)
-                    elif layout_size == "A4":
-                        font.setPointSize(7)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-                elif item.id() == 'label_title':
-                    item.setText(f"{Map_title}")
-
-                elif item.id() == 'label_Windpark':
-                    full_name = f"Windpark {project_name}"
-                    font = item.font()
-                    font.setBold(True)
-                    if layout_size == "A3":
-                        font.setPointSize(13)
-                    elif layout_size == "A4":
-                        font.setPointSize(10)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-                    # if the name is too long, move the box up north
-                    print(len(project_name))
-                    if layout_size == "A3":
-                        print("Layout A3")
-                        if len(project_name) > 21:
-                            current_pos = item.pos()
-                            adjusted_x = current_pos.x()  # Move x mm to the right
-                            adjusted_y = current_pos.y() -5 # Keep Y position unchanged
-                            item.attemptMove(
-                                QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-                    elif layout_size == "A4":
-                        print("Layout A4")
-                        if len(project_name) > 15:
-                            current_pos = item.pos()
-                            adjusted_x = current_pos.x()  # Move x mm to the right
-                            adjusted_y = current_pos.y() -3  # Keep Y position unchanged
-                            item.attemptMove(
-                                QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                elif item.id() == 'label_Vattenfall':
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(5)
-                    elif layout_size == "A4":
-                        font.setPointSize(3)
-                    item.setFont(font)
-                    item.setText("(c) Vattenfall Europe Windkraft GmbH 2026")
-
-                elif item.id() == 'label_address':
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(5)
-                    elif layout_size == "A4":
-                        font.setPointSizeF(3.5)
-                    item.setFont(font)
-                    item.setText("Vattenfall Europe Windkraft GmbH, Amerigo-Vespucci-Platz 2 20457 Hamburg. Tel: +49 (0) 40 790 222 525")
-
-
-                elif item.id() == 'label_ref':
-                        ref_label_text = f"Ref: {ref_text}"
-                        max_width = item.rect().width()
-                        max_width_px = max_width * dpi_ / 25.4
-                        if layout_size == "A3":
-                            self.adjust_font_size_to_fit(item, ref_label_text, max_width_px, min_font_size=2.5,
-                                                         default_font_size=5)
-                        else:
-                            self.adjust_font_size_to_fit(item, ref_label_text, max_width_px, min_font_size=2,
-                                                         default_font_size=4)
-
-                elif item.id() == 'label_CR':
-                    label_CR_text = f"Hintergrund: (c){copyright_text}"
-                    # new_font = QFont("Arial")
-                    # item.setFont(new_font)
-                    max_width = item.rect().width()
-                    max_width_px = max_width * dpi_ / 25.4
-                    if layout_size == "A3":
-                        self.adjust_font_size_to_fit(item, label_CR_text, max_width_px, min_font_size=2.5,
-                                                     default_font_size=4)
-                    else:
-                        self.adjust_font_size_to_fit(item, label_CR_text, max_width_px, min_font_size=2.5,
-                                                     default_font_size=3)
-
-        # Export based on selected format
-        exporter = QgsLayoutExporter(layout)
-
-        if export_format == "PDF":
-            pdf_settings = QgsLayoutExporter.PdfExportSettings()
-            result = exporter.exportToPdf(output_path, pdf_settings)
-            if result == QgsLayoutExporter.Success:
-                self.iface.messageBar().pushSuccess('Success', 'PDF exported successfully!')
-            else:
-                self.iface.messageBar().pushCritical('Error', 'PDF export failed.')
-
-        elif export_format == "PNG":
-            image_settings = QgsLayoutExporter.ImageExportSettings()
-            image_settings.dpi = 300  # ✅ Set high resolution
-            result = exporter.exportToImage(output_path, image_settings)
-            if result == QgsLayoutExporter.Success:
-                self.iface.messageBar().pushSuccess('Success', 'PNG exported successfully!')
-            else:
-                self.iface.messageBar().pushCritical('Error', 'PNG export failed.')
-
-        # ✅ Remove WMS layers from canvas
-        QgsProject.instance().removeMapLayer(wms_layer)
-
-        # Conditionally remove other layers
-        if not self.keepLayersCheckBox.isChecked():
-            QgsProject.instance().removeMapLayer(WTG_layer)
-
-            if WTG_buff_layer:
-                QgsProject.instance().removeMapLayer(WTG_buff_layer)
-            if Site_Bdry_layer:
-                QgsProject.instance().removeMapLayer(Site_Bdry_layer)
-            if Site_Bdry_buff_layer:
-                QgsProject.instance().removeMapLayer(Site_Bdry_buff_layer)
-            if priority_area_layer:
-                QgsProject.instance().removeMapLayer(priority_area_layer)
-            if potential_area_layer:
-                QgsProject.instance().removeMapLayer(potential_area_layer)
-
-
-        self.iface.mapCanvas().refresh()
+        self.register_label_handlers(binding, layout_size, project_name, Map_title, projection, ref_text,
+                                     copyright_text)
+
+        # Fill all template items in one pass
+        binding.apply(self.stage_wrapper(profiler))
+
+        # Every page file of a paged export is recorded, so a missing page is exported again
+        exported_files = written_files(paths, len(pages) if len(pages) > 1 else 0)
+
+        if background:
+            # Export in the background, layers are released once the task is done
+            def export_finished(task, success):
+                if success:
+                    export_state.record(state_key, fingerprint, exported_files)
+                    self.push_message("success", 'Success', f'{format_text} exported successfully!')
+                elif task.isCanceled():
+                    self.push_message("info", 'Canceled', f'{format_text} export canceled.')
+                else:
+                    self.push_message("critical", 'Error', f'{format_text} export failed.')
+                self.release_run(resources)
+                profiler.stop("export")
+                self.finish_profile(profiler, output_folder, "ok" if success else "failed")
+                if on_exported:
+                    error = "" if success else "Export canceled." if task.isCanceled() else "Export failed."
+                    on_exported(success, error)
+
+            profiler.start("export")
+            self.start_export_task(layout, paths, export_finished, profile, resources)
+            return exported_files
+
+        profiler.start("export")
+        try:
+            results = export_all(layout, paths, profile, resources=resources)
+        finally:
+            self.release_run(resources)
+        profiler.stop("export")
+        failed = [export_format for export_format in paths if results.get(export_format) != QgsLayoutExporter.Success]
+        if failed:
+            raise MapCraftError(f'{" + ".join(failed)} export failed.')
+        export_state.record(state_key, fingerprint, exported_files)
+        self.finish_profile(profiler, output_folder)
+        return exported_files
 
     def run_manual_map(self):
+        """
+        Builds a map of the visible project layers and hands it to an export task. Whatever the run created is
+        released right away if it stops before the export task takes over.
+        """
+        profiler = StageProfiler.from_settings("manual", self.project_name_input.text())
+        resources = RunResources()
+        task = None
+        try:
+            task = self.build_manual_map(resources, profiler)
+        finally:
+            if task is None:
+                self.release_run(resources)
+                profiler.close()
+
+    def build_manual_map(self, resources, profiler):
+        """
+        Pipeline of run_manual_map, timed stage by stage with profiler. Returns the export task, or None if the
+        map could not be built.
+        """
         # Basic validation
         project_name = self.project_name_input.text()
         Map_title = self.Map_title_input.text()
         layout_size = self.layout_size_combo.currentText()
         state_selected = self.state_combo.currentText()
         basemap_type = self.basemap_combo.currentText()
-        scale = int(self.scale_combo.currentText())
-        export_format = self.format_combo.currentText()
+        scale = self.selected_scale()
+        atlas = self.atlas_combo.currentData()
+        export_formats = self.selected_formats()
+        format_text = " + ".join(export_formats)
+        profile = self.profile_combo.currentData()
+        dpi = EXPORT_PROFILES[profile]["dpi"]
         output_folder = self.pdf_path.text()
 
         today_name = datetime.today().strftime("%Y%m%d")
         pdf_filename = f"{today_name}_Windpark_{project_name}_{layout_size}"
         filename_base = os.path.join(output_folder, pdf_filename)
-
-        if export_format == "PDF":
-            output_path = os.path.join(self.pdf_path.text(), f"{filename_base}.pdf")
-        else:
-            output_path = os.path.join(self.pdf_path.text(), f"{filename_base}.png")
-
-
-        if state_selected == "Mecklenburg-Vorpommern":
-            template_name = f"Übersichskarte_{layout_size}_UTM33.qpt"
-        else:
-            template_name = f"Übersichskarte_{layout_size}.qpt"
-
-        layout_path = os.path.join(self.plugin_dir, template_name)
+        if not export_formats:
+            self.iface.messageBar().pushCritical("Error", "Please select at least one export format.")
+            return
+        paths = output_paths(filename_base, export_formats)
 
         # Load template
-        with open(layout_path, 'r') as f:
-            template_content = f.read()
-        document = QDomDocument()
-        document.setContent(template_content)
-        layout = QgsPrintLayout(QgsProject.instance())
-        layout.initializeDefaults()
-        layout.loadFromTemplate(document, QgsReadWriteContext())
-        
+        profiler.start("template")
+        layout = resources.track_layout(self.load_layout(layout_size, state_selected))
+        profiler.stop("template")
 
-        root = QgsProject.instance().layerTreeRoot()
+        # Visible layers, taken before the basemap is added to the project
+        profiler.start("inputs")
+        layer_tree = self.get_visible_layers_in_tree()
+        profiler.stop("inputs")
 
         # Select the first active layer to set it as a center
-        def find_first_visible_layer(children):
-            for child in children:
-                if isinstance(child, QgsLayerTreeLayer) and child.isVisible():
-                    layer = child.layer()
-                    print(f"First visible layer: {layer.name()}")
-                    return layer
-                elif isinstance(child, QgsLayerTreeGroup):
-                    result = find_first_visible_layer(child.children())
-                    if result:
-                        return result
-            return None
-
-        layer = find_first_visible_layer(root.children())
-
-
-        wms_layer, conf_dict, scale_conf = self.load_wms_layer(state_selected, scale, basemap_type)
+        layer = layer_tree.first_visible_layer
+        if layer is None:
+            self.iface.messageBar().pushCritical("Error", "No visible layer to center the map on.")
+            return
+        print(f"First visible layer: {layer.name()}")
 
         # Map item
-        map_item = next((item for item in layout.items() if isinstance(item, QgsLayoutItemMap) and item.id() == "Map"),
-                        None)
+        binding = LayoutBinding(layout)
+        map_item = binding.item("Map", QgsLayoutItemRegistry.LayoutMap)
 
         if not map_item:
             self.iface.messageBar().pushCritical("Error", "Map item with ID 'Map' not found.")
             return
 
-        # Set scale and extent
+        # Set scale and extent, the first visible layer is framed
+        try:
+            scale, pages = self.plan_pages([referenced_extent(layer)], map_item, scale, basemap_type, state_selected,
+                                           atlas, layer if isinstance(layer, QgsVectorLayer) else None)
+        except MapCraftError as e:
+            self.iface.messageBar().pushCritical("Error", str(e))
+            return
         map_item.setScale(scale)
-        map_width_m = (map_item.rect().width() * scale) / 1000
-        map_height_m = (map_item.rect().height() * scale) / 1000
-        center = layer.extent().center()
-        extent = QgsRectangle(center.x() - map_width_m / 2, center.y() - map_height_m / 2,
-                              center.x() + map_width_m / 2, center.y() + map_height_m / 2)
-        map_item.setExtent(extent)
-
-        # Get only visible layers (including the WMS layer if visible)
-        visible_layers, shp_layers_ref = self.get_visible_layers_in_tree()
-
-
+        map_item.setExtent(pages[0])
+        if len(pages) > 1:
+            print("MapCraft Plugin", f"Printing {layer.name()} on {len(pages)} pages at 1:{scale}.")
+            setup_page_atlas(layout, map_item, pages, os.path.basename(filename_base))
+            paths = output_paths(filename_base, export_formats, paged=True)  # Images are written per page
+
+        profiler.start("basemap")
+        map_frame = QgsReferencedRectangle(pages_extent(pages), map_item.crs())
+        tile_zoom = None
+        raster_path = self.find_offline_package(project_name, basemap_type, state_selected, scale, layout_size,
+                                                map_frame)
+        if raster_path is None:
+            tile_zoom = self.seed_basemap_tiles(basemap_type, scale, map_frame, dpi, wait=False)
+            raster_path = self.cache_wms_frame(basemap_type, state_selected, scale, map_frame, map_item, dpi)
+        wms_layer, conf_dict, scale_conf = self.load_wms_layer(state_selected, scale, basemap_type, tile_zoom,
+                                                               raster_path)
+        resources.track(wms_layer)
+        self.apply_basemap_profile(wms_layer, profile)
+        profiler.stop("basemap")
+
+        # Only visible vector layers are drawn, the basemap was not part of the snapshot
+        shp_layers_ref = layer_tree.reference_names
         print("Number of layers in REF: ", len(shp_layers_ref))
 
         # Layer ordering: WMS/raster layers at the bottom
-        vector_layers = [l for l in visible_layers if isinstance(l, QgsVectorLayer)]
+        vector_layers = layer_tree.legend_layers
         final_order = vector_layers + [wms_layer] # This part does the trick to send wms to the bottom
 
 
         map_item.setLayers(final_order)
         map_item.refresh()
 
-        # === SCALE BAR SETUP ===
-        scale_bar_item = layout.itemById('scale')
-        if isinstance(scale_bar_item, QgsLayoutItemScaleBar) and map_item:
-            scale_bar_item.setStyle('Line Ticks Up')
-            scale_bar_item.setUnits(QgsUnitTypes.DistanceKilometers)
-            scale_bar_item.setNumberOfSegmentsLeft(0)
-            scale_bar_item.setLinkedMap(map_item)
-
-            if layout_size == "A4":
+        # Basemap and vector layers of a single page come from the frame cache
+        if len(pages) == 1:
+            profiler.start("frame")
+            self.use_cached_frame(map_item, dpi, resources, export_formats)
+            profiler.stop("frame")
 
-                if scale == 10000:
-                    real_world_km = 0.25
-                    segments = 2
-
-                elif scale == 15000:
-                    real_world_km = 0.5
-                    segments = 2
-
-                elif scale == 25000:
-                    real_world_km = 1
-                    segments = 2
-
-                elif scale == 50000:
-                    real_world_km = 2
-                    segments = 2
-
-                units_per_segment = real_world_km / segments
-
-                # Apply to scale bar
-                scale_bar_item.setNumberOfSegments(segments)
-                scale_bar_item.setUnitsPerSegment(units_per_segment)
-
-                if scale == 10000:
-                    # Adjust scale bar position
-                    current_pos = scale_bar_item.pos()
-                    adjusted_x = current_pos.x() + 2  # Move x mm to the left
-                    adjusted_y = current_pos.y()  # Keep Y position unchanged
-                    scale_bar_item.attemptMove(
-                        QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                elif scale == 15000:
-                    # Adjust scale bar position
-                    current_pos = scale_bar_item.pos()
-                    adjusted_x = current_pos.x() - 3  # Move x mm to the left
-                    adjusted_y = current_pos.y()  # Keep Y position unchanged
-                    scale_bar_item.attemptMove(
-                        QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                elif scale == 25000 or scale == 50000:
-                    # Adjust scale bar position
-                    current_pos = scale_bar_item.pos()
-                    adjusted_x = current_pos.x() - 5  # Move x mm to the left
-                    adjusted_y = current_pos.y()  # Keep Y position unchanged
-                    scale_bar_item.attemptMove(
-                        QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-            else:  # A3 or larger
-
-                if scale == 10000:
-                    real_world_km = 0.5
-                    segments = 2
-
-                elif scale == 15000:
-                    real_world_km = 0.5
-                    segments = 2
-
-                elif scale == 25000:
-                    real_world_km = 1.0
-                    segments = 2
-
-                elif scale == 50000:
-                    real_world_km = 2.0
-                    segments = 2
-
-                units_per_segment = real_world_km / segments
-
-                # Apply to scale bar
-                scale_bar_item.setNumberOfSegments(segments)
-                scale_bar_item.setUnitsPerSegment(units_per_segment)
-
-                if scale == 10000:
-                    # Adjust scale bar position
-                    current_pos = scale_bar_item.pos()
-                    adjusted_x = current_pos.x() - 5  # Move x mm to the left
-                    adjusted_y = current_pos.y()  # Keep Y position unchanged
-                    scale_bar_item.attemptMove(
-                        QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                elif scale == 15000:
-                    # Adjust scale bar position
-                    current_pos = scale_bar_item.pos()
-                    adjusted_x = current_pos.x() + 5  # Move x mm to the right
-                    adjusted_y = current_pos.y()  # Keep Y position unchanged
-                    scale_bar_item.attemptMove(
-                        QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-                elif scale == 25000 or scale == 50000:
-                    # No position adjustment defined
-                    pass
-
-            # Get the width of the scale bar in layout units (mm)
-            #scale_bar_width_mm = scale_bar_item.rect().width()
+        # === SCALE BAR SETUP ===
+        binding.register('scale', lambda item: self.setup_scale_bar(item, map_item, layout_size, scale),
+                         QgsLayoutItemRegistry.LayoutScaleBar)
 
         # Legend setup
-        legend_item = layout.itemById("symbology")
-        if legend_item and map_item:
-            legend_item.setLinkedMap(map_item)
-            legend_item.setAutoUpdateModel(False)
-
+        def setup_legend(legend_item):
+            fonts = None
             if layout_size == "A4":
                 font = QFont()
                 font.setPointSize(7)
-                legend_item.setStyleFont(QgsLegendStyle.Title, font)
-                legend_item.setStyleFont(QgsLegendStyle.Group, font)
-                legend_item.setStyleFont(QgsLegendStyle.Subgroup, font)
-                legend_item.setStyleFont(QgsLegendStyle.SymbolLabel, font)
-
-            legend_model = legend_item.model()
-            root_group = legend_model.rootGroup()
-            root_group.removeAllChildren()
+                fonts = {style: font for style in (QgsLegendStyle.Title, QgsLegendStyle.Group,
+                                                   QgsLegendStyle.Subgroup, QgsLegendStyle.SymbolLabel)}
 
-            # Access the current layer tree
-            layer_tree = QgsProject.instance().layerTreeRoot()
-
-            # Add only visible vector layers (skip WMS/raster/invisible)
-            # Recursively add all visible vector layers (even inside groups)
-            def add_visible_vector_layers(node):
-                if isinstance(node, QgsLayerTreeLayer):
-                    if node.isVisible() and isinstance(node.layer(), QgsVectorLayer):
-                        root_group.addLayer(node.layer())
-                elif isinstance(node, QgsLayerTreeGroup):
-                    for child in node.children():
-                        add_visible_vector_layers(child)
-
-
-            add_visible_vector_layers(layer_tree)
-
-            legend_item.refresh()
+            # Add only visible vector layers (skip WMS/raster/invisible), including the ones inside groups
+            legend_entries = [(legend_layer, None) for legend_layer in layer_tree.legend_layers]
+            build_legend(legend_item, map_item, legend_entries, fonts)
 
             ## Adjust font size based on number of legend entries
             #legend_item.attemptResize(QgsLayoutSize(55, 100))
             #self.adjust_legend_font_size(legend_item)
 
+        binding.register("symbology", setup_legend)
 
         # Dynamic labels
         copyright_text = ""
-        username = getpass.getuser()
-        today = datetime.today().strftime("%d/%m/%y")
         projection = layer.crs().description()
         ref_text = " | ".join(shp_layers_ref)
         if basemap_type == "Topographic" and conf_dict:
@@ -1646,161 +2129,24 @@ class MapCraftPlugin:
         elif basemap_type == "OpenStreetMap" and conf_dict:
             copyright_text = conf_dict.get("copyright", "")
 
-        dpi_ = layout.renderContext().dpi()
-        for item in layout.items():
-            if item.type() == QgsLayoutItemRegistry.LayoutLabel:
-
-                if item.id() == 'label_proj':
-                    full_name = f"CRS: {projection}"
-                    font = item.font()
+        self.register_label_handlers(binding, layout_size, project_name, Map_title, projection, ref_text,
+                                     copyright_text)
 
-                    if layout_size == "A3":
-                        font.setPointSize(10)
-                    elif layout_size == "A4":
-                        font.setPointSize(7)
-                    item.setFont(font)
-                    item.setText(full_name)
+        # Fill all template items in one pass
+        binding.apply(self.stage_wrapper(profiler))
 
-                elif item.id() == 'label_druck':
-                    if layout_size == "A3":
-                        full_name = f"Druck: A3"
-                        font = item.font()
-                        font = item.font()
-                        font.setPointSize(10)
-                        item.setFont(font)
-                        item.setText(full_name)
-                    elif layout_size == "A4":
-                        full_name = f"Druck: A4"
-                        font = item.font()
-                        font = item.font()
-                        font.setPointSize(7)
-                        item.setFont(font)
-                        item.setText(full_name)
-
-                elif item.id() == 'label_Maßstab':
-                    full_name = f"Maßstab:"
-                    font = item.font()
-                    if layout_size == "A3":
-                        font.setPointSize(10)
-                    elif layout_size == "A4":
-                        font.setPointSize(7)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-                elif item.id() == 'label_creator':
-                    full_name = f"Karte erzeugt am {today} von {username}"
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(10)
-                    elif layout_size == "A4":
-                        font.setPointSize(7)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-                elif item.id() == 'label_title':
-                    item.setText(f"{Map_title}")
-
-                elif item.id() == 'label_Windpark':
-                    full_name = f"Windpark {project_name}"
-                    font = item.font()
-                    font.setBold(True)
-                    if layout_size == "A3":
-                        font.setPointSize(13)
-                    elif layout_size == "A4":
-                        font.setPointSize(10)
-                    item.setFont(font)
-                    item.setText(full_name)
-
-                    # if the name is too long, move the box up north
-                    print(len(project_name))
-                    if layout_size == "A3":
-                        print("Layout A3")
-                        if len(project_name) > 21:
-                            current_pos = item.pos()
-                            adjusted_x = current_pos.x()  # Move x mm to the right
-                            adjusted_y = current_pos.y() -5 # Keep Y position unchanged
-                            item.attemptMove(
-                                QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-                    elif layout_size == "A4":
-                        print("Layout A4")
-                        if len(project_name) > 15:
-                            current_pos = item.pos()
-                            adjusted_x = current_pos.x()  # Move x mm to the right
-                            adjusted_y = current_pos.y() -3  # Keep Y position unchanged
-                            item.attemptMove(
-                                QgsLayoutPoint(adjusted_x, adjusted_y, QgsUnitTypes.LayoutMillimeters))
-
-
-                elif item.id() == 'label_Vattenfall':
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(5)
-                    elif layout_size == "A4":
-                        font.setPointSize(3)
-                    item.setFont(font)
-                    item.setText("(c) Vattenfall Europe Windkraft GmbH 2026")
-
-                elif item.id() == 'label_address':
-                    font = item.font()
-
-                    if layout_size == "A3":
-                        font.setPointSize(5)
-                    elif layout_size == "A4":
-                        font.setPointSizeF(3.5)
-                    item.setFont(font)
-                    item.setText("Vattenfall Europe Windkraft GmbH, Amerigo-Vespucci-Platz 2 20457 Hamburg. Tel: +49 (0) 40 790 222 525")
-
-
-                elif item.id() == 'label_ref':
-                    ref_label_text = f"Ref: {ref_text}"
-                    max_width = item.rect().width()
-                    max_width_px = max_width * dpi_ / 25.4
-                    if layout_size == "A3":
-                        self.adjust_font_size_to_fit(item, ref_label_text, max_width_px, min_font_size=2.5,
-                                                     default_font_size=5)
-                    else:
-                        self.adjust_font_size_to_fit(item, ref_label_text, max_width_px, min_font_size=2,
-                                                     default_font_size=4)
-
-                elif item.id() == 'label_CR':
-                    label_CR_text = f"Hintergrund: (c){copyright_text}"
-                    # new_font = QFont("Arial")
-                    # item.setFont(new_font)
-                    max_width = item.rect().width()
-                    max_width_px = max_width * dpi_ / 25.4
-                    if layout_size == "A3":
-                        self.adjust_font_size_to_fit(item, label_CR_text, max_width_px, min_font_size=2.5,
-                                                     default_font_size=4)
-                    else:
-                        self.adjust_font_size_to_fit(item, label_CR_text, max_width_px, min_font_size=2.5,
-                                                     default_font_size=3)
-
-        # Export based on selected format
-        exporter = QgsLayoutExporter(layout)
-
-        if export_format == "PDF":
-            pdf_settings = QgsLayoutExporter.PdfExportSettings()
-            result = exporter.exportToPdf(output_path, pdf_settings)
-            if result == QgsLayoutExporter.Success:
-                print('Success', 'PDF exported successfully!')
-            else:
-                print('Error', 'PDF export failed.')
-
-        elif export_format == "PNG":
-            image_settings = QgsLayoutExporter.ImageExportSettings()
-            image_settings.dpi = 300  # ✅ Set high resolution
-            result = exporter.exportToImage(output_path, image_settings)
-            if result == QgsLayoutExporter.Success:
-                print('Success', 'PNG exported successfully!')
+        # Export in the background, the basemap and frame layers are released once the task is done
+        def export_finished(task, success):
+            if success:
+                print('Success', f'{format_text} exported successfully!')
+            elif task.isCanceled():
+                print('Canceled', f'{format_text} export canceled.')
             else:
-                print('Error', 'PNG export failed.')
-
-        #  Remove WMS layers from canvas
-        QgsProject.instance().removeMapLayer(wms_layer)
-        iface.mapCanvas().refresh()
-
-
+                print('Error', f'{format_text} export failed.')
 
+            self.release_run(resources)
+            profiler.stop("export")
+            self.finish_profile(profiler, output_folder, "ok" if success else "failed")
 
+        profiler.start("export")
+        return self.start_export_task(layout, paths, export_finished, profile, resources)
@@ -0,0 +1,98 @@
+import os
+import re
+from osgeo import gdal
+from qgis.core import QgsRasterLayer, QgsCoordinateTransform, QgsCoordinateReferenceSystem, QgsProject
+from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtGui import QImage, QPainter
+from .cache import cache_root
+from .tile_cache import tiles_for_bounds
+from .wms_cache import georeference
+
+# Half the width of the Web Mercator world in metres
+MERCATOR_HALF_WORLD = 20037508.342789244
+
+
+def package_path(project_name, basemap_type, state_selected, scale, layout_size):
+    """
+    Returns the offline basemap package of a project, e.g. .../offline/winterlingen/topographic_hessen_25000_A3.gpkg
+    """
+    def slug(text):
+        return re.sub(r"[^a-z0-9]+", "_", str(text).lower()).strip("_")
+
+    name = f"{slug(basemap_type)}_{slug(state_selected)}_{scale}_{layout_size}.gpkg"
+    return os.path.join(cache_root(), "offline", slug(project_name), name)
+
+
+def package_covers(path, extent):
+    """
+    Returns True if the package at path exists and covers extent (QgsReferencedRectangle).
+    """
+    if not os.path.exists(path):
+        return False
+    layer = QgsRasterLayer(path, "offline basemap", "gdal")
+    if not layer.isValid():
+        return False
+    to_layer_crs = QgsCoordinateTransform(extent.crs(), layer.crs(), QgsProject.instance())
+    return layer.extent().contains(to_layer_crs.transformBoundingBox(extent))
+
+
+def write_package(geotiff, path):
+    """
+    Writes a GeoPackage raster from a GeoTIFF file path or GeoTIFF bytes.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    source = geotiff
+    if isinstance(geotiff, bytes):
+        source = f"/vsimem/mapcraft_package_{os.getpid()}.tif"
+        gdal.FileFromMemBuffer(source, geotiff)
+
+    tmp_path = f"{path}.tmp.gpkg"
+    try:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        result = gdal.Translate(tmp_path, source, format="GPKG", creationOptions=["TILE_FORMAT=PNG_JPEG"])
+        if result is None:
+            raise RuntimeError(f"GDAL could not write {path}")
+        result = None  # Close the dataset before moving it
+        os.replace(tmp_path, path)
+    finally:
+        if isinstance(geotiff, bytes):
+            gdal.Unlink(source)
+    return path
+
+
+def xyz_geotiff(tile_cache, provider, extent, zoom):
+    """
+    Stitches the cached tiles of extent (QgsReferencedRectangle) at a zoom level into GeoTIFF bytes (EPSG:3857).
+    The tiles must already be seeded.
+    """
+    to_wgs84 = QgsCoordinateTransform(extent.crs(), QgsCoordinateReferenceSystem("EPSG:4326"), QgsProject.instance())
+    wgs84 = to_wgs84.transformBoundingBox(extent)
+    tiles = tiles_for_bounds((wgs84.xMinimum(), wgs84.yMinimum(), wgs84.xMaximum(), wgs84.yMaximum()), zoom)
+    xs = [x for x, _ in tiles]
+    ys = [y for _, y in tiles]
+    x_min, x_max, y_min, y_max = min(xs), max(xs), min(ys), max(ys)
+
+    tile_size = None
+    image = None
+    painter = None
+    try:
+        for x, y in tiles:
+            path = tile_cache.disk_cache.get(provider, f"{zoom}/{x}/{y}")
+            tile = QImage(path) if path else QImage()
+            if tile.isNull():
+                raise RuntimeError(f"Tile {zoom}/{x}/{y} of {provider} is not in the cache")
+            if image is None:
+                tile_size = tile.width()
+                image = QImage((x_max - x_min + 1) * tile_size, (y_max - y_min + 1) * tile_size, QImage.Format_ARGB32)
+                image.fill(Qt.transparent)
+                painter = QPainter(image)
+            painter.drawImage((x - x_min) * tile_size, (y - y_min) * tile_size, tile)
+    finally:
+        if painter:
+            painter.end()
+
+    span = 2 * MERCATOR_HALF_WORLD / 2 ** zoom
+    bbox = (-MERCATOR_HALF_WORLD + x_min * span, MERCATOR_HALF_WORLD - (y_max + 1) * span,
+            -MERCATOR_HALF_WORLD + (x_max + 1) * span, MERCATOR_HALF_WORLD - y_min * span)
+    return georeference(image, bbox, "EPSG:3857")
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from qgis.core import QgsSettings
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Log written into the output folder of every map
+PROFILE_LOG = "mapcraft_profile.jsonl"
+
+# Profiler of the map being built on each thread, see current_profiler()
+_active = threading.local()
+
+
+def peak_memory_mb():
+    """
+    Returns the peak memory (resident set size) of the process in MB, or None if it cannot be measured.
+    """
+    if resource is not None:
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        divisor = 1024 ** 2 if sys.platform == "darwin" else 1024
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1024 ** 2, 1)  # peak_wset only exists on Windows
+    return None
+
+
+def request_kind(url):
+    """
+    Classifies a request URL as "wms", "tile" or "other" for the request counts.
+    """
+    lower_url = url.lower()
+    if "service=wms" in lower_url or "request=getmap" in lower_url:
+        return "wms"
+    if any(part in lower_url for part in ("/tile", "{z}", "tile.openstreetmap", "arcgisonline")):
+        return "tile"
+    return "other"
+
+
+def current_profiler():
+    """
+    Returns the open StageProfiler of the map being built on this thread, or None.
+    """
+    return getattr(_active, "profiler", None)
+
+
+class StageProfiler:
+    """
+    Records wall time, network requests and peak memory of the stages of one map export.
+
+    Network requests are counted where MapCraft downloads (cache.fetch_url, called by the WMS and tile caches),
+    so requests of download threads and headless runs are included. The caches take the profiler of the
+    thread building the map (current_profiler()) and hand it to their download threads, which credits each
+    request to the stages of its own map. Requests QGIS makes itself for live layers are not counted.
+    A disabled profiler still measures, but write() does not log anything.
+    """
+
+    def __init__(self, mode, project_name, enabled=True):
+        self.enabled = enabled
+        self.written = False
+        self.run_id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.project_name = project_name
+        self.started = time.perf_counter()
+        self.stages = {}  # name -> record, in the order the stages first ran
+        self.running = {}  # name -> (start time, request counts at start)
+        self.requests = {"wms": 0, "tile": 0, "other": 0}
+        self.endpoints = {}  # host -> {"requests": int, "seconds": float}
+        self._lock = threading.Lock()  # Requests are recorded from download threads
+        _active.profiler = self
+
+    @classmethod
+    def from_settings(cls, mode, project_name):
+        """
+        Creates a profiler that logs unless profiling is disabled (setting MapCraft/profiling/enabled).
+        """
+        return cls(mode, project_name, QgsSettings().value("MapCraft/profiling/enabled", True, type=bool))
+
+    def record_request(self, url, seconds):
+        """
+        Counts one finished download of url that took seconds, from any thread.
+        """
+        host = urlparse(url).netloc or "local"
+        with self._lock:
+            self.requests[request_kind(url)] += 1
+            endpoint = self.endpoints.setdefault(host, {"requests": 0, "seconds": 0.0})
+            endpoint["requests"] += 1
+            endpoint["seconds"] += seconds
+
+    def start(self, name):
+        with self._lock:
+            requests = dict(self.requests)
+        self.running[name] = (time.perf_counter(), requests)
+
+    def stop(self, name):
+        """
+        Ends a stage. Stages that run several times (e.g. one label handler per label) are added up.
+        """
+        if name not in self.running:
+            return
+        start, requests_before = self.running.pop(name)
+        with self._lock:
+            requests = dict(self.requests)
+        record = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "wms_requests": 0, "tile_requests": 0})
+        record["seconds"] += time.perf_counter() - start
+        record["calls"] += 1
+        record["wms_requests"] += requests["wms"] - requests_before["wms"]
+        record["tile_requests"] += requests["tile"] - requests_before["tile"]
+        record["peak_memory_mb"] = peak_memory_mb()
+
+    def wrap(self, name, handler):
+        """
+        Returns handler timed as stage name.
+        """
+        def timed(*args, **kwargs):
+            self.start(name)
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self.stop(name)
+        return timed
+
+    def close(self):
+        """
+        Stops crediting new downloads of this thread to the profiler. Can be called more than once.
+        """
+        if current_profiler() is self:
+            _active.profiler = None
+
+    def summary(self):
+        """
+        Returns a one line summary, e.g. "12.3 s: inputs 0.4 s, basemap 8.1 s (3 WMS / 0 tile requests), export 3.2 s".
+        """
+        parts = []
+        for name, record in self.stages.items():
+            part = f"{name} {record['seconds']:.1f} s"
+            requests = record["wms_requests"] + record["tile_requests"]
+            if requests:
+                part += f" ({record['wms_requests']} WMS / {record['tile_requests']} tile requests)"
+            parts.append(part)
+        return f"{time.perf_counter() - self.started:.1f} s: " + ", ".join(parts)
+
+    def write(self, output_folder, status="ok"):
+        """
+        Appends one JSON line per stage and one for the whole run to mapcraft_profile.jsonl in output_folder.
+        Only the first call of a run writes.
+
+        Returns:
+            str or None: The summary for the message bar if MapCraft/profiling/summary is set.
+        """
+        self.close()
+        if self.written or not self.enabled or not output_folder or not os.path.isdir(output_folder):
+            return None
+        self.written = True
+
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        base = {"run": self.run_id, "time": timestamp, "mode": self.mode, "project": self.project_name}
+        lines = [dict(base, stage=name, **record) for name, record in self.stages.items()]
+        lines.append(dict(base, stage="total", status=status,
+                          seconds=time.perf_counter() - self.started,
+                          wms_requests=self.requests["wms"], tile_requests=self.requests["tile"],
+                          other_requests=self.requests["other"], peak_memory_mb=peak_memory_mb(),
+                          endpoints=self.endpoints))
+
+        try:
+            with open(os.path.join(output_folder, PROFILE_LOG), 'a', encoding="utf-8") as f:
+                f.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+        except OSError as e:
+            print("MapCraft Plugin", f"Could not write the profile log: {e}")
+
+        if QgsSettings().value("MapCraft/profiling/summary", False, type=bool):
+            return self.summary()
+        return None
@@ -0,0 +1,27 @@
+import os
+import sys
+import types
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Make the plugin folder importable as the MapCraft package whatever the checkout is called. Modules that only
+# import QGIS inside their functions (e.g. benchmark) can then be tested without QGIS.
+if "MapCraft" not in sys.modules:
+    package = types.ModuleType("MapCraft")
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules["MapCraft"] = package
+
+
+@pytest.fixture(scope="session")
+def qgis_app(tmp_path_factory):
+    """
+    A QgsApplication without GUI on a temporary profile, for tests of modules that need QGIS (skipped without).
+    """
+    qgis_core = pytest.importorskip("qgis.core")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = qgis_core.QgsApplication([], False, str(tmp_path_factory.mktemp("qgis_profile")))
+    app.initQgis()
+    yield app
+    app.exitQgis()
@@ -0,0 +1,141 @@
+import json
+import struct
+import zlib
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+import pytest
+
+from MapCraft import benchmark
+
+
+@pytest.fixture
+def server():
+    stand_in = benchmark.StandInServer().start()
+    yield stand_in
+    stand_in.shutdown()
+    stand_in.server_close()
+
+
+def fetch(url):
+    with urlopen(url, timeout=10) as response:
+        return response.headers["Content-Type"], response.read()
+
+
+def png_size(data):
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    return struct.unpack(">II", data[16:24])
+
+
+def test_png_image_is_valid_png():
+    data = benchmark.png_image(3, 2, (1, 2, 3))
+    assert png_size(data) == (3, 2)
+
+    # IHDR chunk: length, type, header, CRC of type and header
+    length = struct.unpack(">I", data[8:12])[0]
+    chunk = data[12:16 + length]
+    assert struct.unpack(">I", data[16 + length:20 + length])[0] == zlib.crc32(chunk) & 0xffffffff
+
+    idat_start = data.index(b"IDAT")
+    idat_length = struct.unpack(">I", data[idat_start - 4:idat_start])[0]
+    pixels = zlib.decompress(data[idat_start + 4:idat_start + 4 + idat_length])
+    assert pixels == (b"\x00" + bytes((1, 2, 3)) * 3) * 2
+
+
+def test_capabilities_offer_stand_in_layer():
+    xml = benchmark.capabilities_xml("http://127.0.0.1:1").decode("utf-8")
+    assert f"<Name>{benchmark.STAND_IN_LAYER}</Name>" in xml
+    assert 'xlink:href="http://127.0.0.1:1/wms?"' in xml
+    assert "<CRS>EPSG:25832</CRS>" in xml and "<CRS>EPSG:25833</CRS>" in xml
+
+
+def test_server_answers_getcapabilities(server):
+    content_type, body = fetch(f"{server.base_url}/wms?service=WMS&request=GetCapabilities")
+    assert content_type == "text/xml"
+    assert f"<Name>{benchmark.STAND_IN_LAYER}</Name>".encode("utf-8") in body
+
+
+def test_server_answers_getmap_in_requested_size(server):
+    content_type, body = fetch(f"{server.base_url}/wms?SERVICE=WMS&REQUEST=GetMap&WIDTH=40&HEIGHT=30")
+    assert content_type == "image/png"
+    assert png_size(body) == (40, 30)
+
+
+def test_server_answers_tiles(server):
+    content_type, body = fetch(f"{server.base_url}/xyz/12/2138/1420.png")
+    assert content_type == "image/png"
+    assert png_size(body) == (256, 256)
+
+
+def test_server_counts_requests_and_rejects_unknown_paths(server):
+    fetch(f"{server.base_url}/xyz/0/0/0.png")
+    with pytest.raises(HTTPError) as error:
+        fetch(f"{server.base_url}/unknown")
+    assert error.value.code == 404
+    assert server.requests == 2
+
+
+def test_server_reuses_images(server):
+    assert server.image(8, 8) is server.image(8, 8)
+
+
+def test_use_stand_in_points_basemaps_at_server():
+    main_module = type("Main", (), {})()
+    main_module.STATE_SETTINGS = {"Hessen": {"scales": {"25000": {"wms_url": "https://x", "layer_name": "dtk"}}}}
+    main_module.XYZ_BASEMAPS = {"OpenStreetMap": {"basemap": {"url": "https://tile"}}}
+    benchmark.use_stand_in(main_module, "http://127.0.0.1:1")
+
+    scale_conf = main_module.STATE_SETTINGS["Hessen"]["scales"]["25000"]
+    assert scale_conf == {"wms_url": "http://127.0.0.1:1/wms?", "layer_name": benchmark.STAND_IN_LAYER}
+    assert main_module.XYZ_BASEMAPS["OpenStreetMap"]["basemap"]["url"] == "http://127.0.0.1:1/xyz/{z}/{x}/{y}.png"
+
+
+def test_last_run_stages_reads_only_last_run(tmp_path):
+    log = tmp_path / "mapcraft_profile.jsonl"
+    lines = [
+        {"run": "a", "stage": "inputs", "seconds": 1.0},
+        {"run": "a", "stage": "total", "seconds": 2.0},
+        {"run": "b", "stage": "inputs", "seconds": 0.123456},
+        {"run": "b", "stage": "total", "seconds": 0.5},
+    ]
+    log.write_text("".join(json.dumps(line) + "\n" for line in lines) + "\n", encoding="utf-8")
+    assert benchmark.last_run_stages(str(log)) == {"inputs": 0.1235, "total": 0.5}
+
+
+def test_last_run_stages_without_log(tmp_path):
+    assert benchmark.last_run_stages(str(tmp_path / "missing.jsonl")) == {}
+    (tmp_path / "empty.jsonl").write_text("", encoding="utf-8")
+    assert benchmark.last_run_stages(str(tmp_path / "empty.jsonl")) == {}
+
+
+def test_median_seconds_skips_failed_runs():
+    case = {"runs": [
+        {"seconds": 9.0, "status": "success", "cold": True},
+        {"seconds": 1.0, "status": "success", "cold": False},
+        {"seconds": 3.0, "status": "success", "cold": False},
+        {"seconds": 0.1, "status": "failed", "cold": False},
+    ]}
+    assert benchmark.median_seconds(case, cold=True) == 9.0
+    assert benchmark.median_seconds(case, cold=False) == 2.0
+    assert benchmark.median_seconds({"runs": []}, cold=False) is None
+
+
+def test_compare_prints_ratio_of_common_cases(tmp_path, capsys):
+    def results(name, warm_seconds):
+        return {"cases": [{"case": name, "runs": [
+            {"seconds": 10.0, "status": "success", "cold": True},
+            {"seconds": warm_seconds, "status": "success", "cold": False},
+        ]}]}
+
+    old_path, new_path = tmp_path / "old.json", tmp_path / "new.json"
+    old_path.write_text(json.dumps(results("10_simple_A3_25000_Topographic", 4.0)), encoding="utf-8")
+    new_path.write_text(json.dumps(results("10_simple_A3_25000_Topographic", 2.0)), encoding="utf-8")
+    benchmark.compare(str(old_path), str(new_path))
+
+    row = capsys.readouterr().out.splitlines()[1].split()
+    assert row == ["10_simple_A3_25000_Topographic", "10.00", "10.00", "4.00", "2.00", "0.50"]
+
+
+def test_plugin_version_reads_metadata():
+    version, commit = benchmark.plugin_version()
+    assert version != "unknown"
@@ -0,0 +1,82 @@
+from urllib.parse import urlparse, parse_qsl
+
+import pytest
+
+from MapCraft import benchmark
+
+pytest.importorskip("qgis.core")
+gdal = pytest.importorskip("osgeo.gdal")
+
+from MapCraft.cache import DiskCache  # noqa: E402
+from MapCraft.wms_cache import WmsCache, MAX_REQUEST_PIXELS  # noqa: E402
+
+BBOX = (510000.0, 5400000.0, 516000.0, 5405000.0)
+
+
+@pytest.fixture
+def server():
+    stand_in = benchmark.StandInServer().start()
+    yield stand_in
+    stand_in.shutdown()
+    stand_in.server_close()
+
+
+@pytest.fixture
+def wms_cache(qgis_app, tmp_path):
+    return WmsCache(DiskCache(str(tmp_path / "wms")))
+
+
+def get_image(wms_cache, server, namespace, width=600, height=500):
+    return wms_cache.get_image(namespace, f"{server.base_url}/wms?", benchmark.STAND_IN_LAYER, "EPSG:25832",
+                               BBOX, width, height, 300)
+
+
+def raster_size(path):
+    dataset = gdal.Open(path)
+    try:
+        return dataset.RasterXSize, dataset.RasterYSize
+    finally:
+        dataset = None
+
+
+def test_miss_then_hit_without_request(wms_cache, server):
+    path = get_image(wms_cache, server, "hessen")
+    assert path is not None
+    assert server.requests == 1
+    assert raster_size(path) == (600, 500)
+
+    assert get_image(wms_cache, server, "hessen") == path
+    assert server.requests == 1
+
+
+def test_large_images_are_split(wms_cache, server):
+    width, height = MAX_REQUEST_PIXELS + 952, MAX_REQUEST_PIXELS + 452
+    path = get_image(wms_cache, server, "hessen", width, height)
+    assert path is not None
+    assert raster_size(path) == (width, height)
+
+    sizes = sorted((int(params["WIDTH"]), int(params["HEIGHT"]))
+                   for params in ({key.upper(): value for key, value in parse_qsl(urlparse(request).query)}
+                                  for request in server.paths))
+    assert sizes == [(952, 452), (952, MAX_REQUEST_PIXELS), (MAX_REQUEST_PIXELS, 452),
+                     (MAX_REQUEST_PIXELS, MAX_REQUEST_PIXELS)]
+
+
+def test_invalidate_one_state(wms_cache, server):
+    get_image(wms_cache, server, "hessen")
+    get_image(wms_cache, server, "baden_wurttemberg")
+    assert server.requests == 2
+
+    wms_cache.invalidate("hessen")
+    assert get_image(wms_cache, server, "baden_wurttemberg") is not None
+    assert server.requests == 2
+    assert get_image(wms_cache, server, "hessen") is not None
+    assert server.requests == 3
+
+
+def test_layer_available_reuses_capabilities(wms_cache, server):
+    wms_url = f"{server.base_url}/wms?"
+    assert wms_cache.layer_available(wms_url, benchmark.STAND_IN_LAYER)
+    assert wms_cache.layer_available(wms_url, benchmark.STAND_IN_LAYER)
+    assert server.requests == 1
+    assert not wms_cache.layer_available(wms_url, "unknown_layer")
@@ -0,0 +1,176 @@
+import os
+import math
+import re
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from qgis.core import (QgsSettings, QgsCoordinateTransform, QgsCoordinateReferenceSystem, QgsProject, QgsMessageLog,
+                       Qgis)
+from qgis.PyQt.QtCore import QUrl
+from .cache import DiskCache, cache_root, fetch_url
+from .profiling import current_profiler
+
+# Web Mercator ground resolution at zoom 0 on the equator (m/px, 256 px tiles)
+ZOOM0_RESOLUTION = 156543.03392804097
+
+# Tile servers that limit parallel connections. The OpenStreetMap tile usage policy allows at most 2.
+MAX_CONNECTIONS = {"tile.openstreetmap.org": 2}
+
+# Tile servers whose usage policy forbids bulk downloads: tiles are only fetched for a map being exported,
+# never pre-seeded or packaged for offline use
+NO_BULK_DOWNLOAD = ("tile.openstreetmap.org",)
+
+
+def tile_host(url_template):
+    """
+    Returns the host of an XYZ URL template, e.g. "tile.openstreetmap.org".
+    """
+    return urlparse(url_template).netloc.lower()
+
+
+def bulk_download_allowed(url_template):
+    """
+    Returns False for tile servers that must not be seeded ahead of an export (see NO_BULK_DOWNLOAD).
+    """
+    return tile_host(url_template) not in NO_BULK_DOWNLOAD
+
+
+def provider_key(title):
+    """
+    Returns the cache namespace of an XYZ provider, e.g. "World Imagery" -> "world_imagery".
+    """
+    return re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")
+
+
+def zoom_for_scale(scale, latitude, dpi=300, zmax=19):
+    """
+    Returns the lowest zoom level whose tiles are at least as detailed as the print resolution.
+    """
+    resolution = scale * 0.0254 / dpi  # metres per printed pixel
+    zoom = math.ceil(math.log2(ZOOM0_RESOLUTION * math.cos(math.radians(latitude)) / resolution))
+    return max(0, min(zmax, zoom))
+
+
+def tiles_for_bounds(bounds, zoom, margin=1):
+    """
+    Lists the (x, y) tiles covering bounds (lon_min, lat_min, lon_max, lat_max) at a zoom level.
+    """
+    def tile_xy(lon, lat):
+        n = 2 ** zoom
+        x = int((lon + 180.0) / 360.0 * n)
+        lat_rad = math.radians(lat)
+        y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    lon_min, lat_min, lon_max, lat_max = bounds
+    x_min, y_min = tile_xy(lon_min, lat_max)  # Tile rows grow southwards
+    x_max, y_max = tile_xy(lon_max, lat_min)
+    last = 2 ** zoom - 1
+    return [(x, y)
+            for x in range(max(0, x_min - margin), min(last, x_max + margin) + 1)
+            for y in range(max(0, y_min - margin), min(last, y_max + margin) + 1)]
+
+
+class TileCache:
+    """
+    On-disk XYZ tile cache. Tiles are stored as <provider>/<z>/<x>/<y> so QGIS can read
+    them back through a file:// XYZ URL.
+    """
+
+    def __init__(self, disk_cache, workers=8):
+        self.disk_cache = disk_cache
+        self.workers = workers
+        self.background = None  # Executor of seeds that do not block the caller, created on first use
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Creates the tile cache configured in the QGIS settings, or returns None when it is disabled.
+        MapCraft/tile_cache/enabled, /max_mb (default 2048) and /ttl_days (default 30).
+        """
+        settings = QgsSettings()
+        if not settings.value("MapCraft/tile_cache/enabled", True, type=bool):
+            return None
+        max_mb = settings.value("MapCraft/tile_cache/max_mb", 2048, type=int)
+        ttl_days = settings.value("MapCraft/tile_cache/ttl_days", 30, type=int)
+        disk_cache = DiskCache(os.path.join(cache_root(), "tiles"), max_mb * 1024 ** 2, ttl_days * 24 * 3600)
+        return cls(disk_cache)
+
+    def local_url(self, provider):
+        """
+        Returns the file:// XYZ URL template of a provider's cached tiles.
+        """
+        folder = os.path.join(self.disk_cache.directory, provider)
+        return QUrl.fromLocalFile(folder).toString(QUrl.FullyEncoded) + "/{z}/{x}/{y}"
+
+    def missing_tiles(self, provider, url_template, bounds, zoom):
+        """
+        Returns (cache key, URL) of the tiles of bounds at a zoom level that are not in the cache.
+        """
+        missing = []
+        for x, y in tiles_for_bounds(bounds, zoom):
+            key = f"{zoom}/{x}/{y}"
+            if self.disk_cache.get(provider, key) is None:
+                url = url_template.replace("{z}", str(zoom)).replace("{x}", str(x)).replace("{y}", str(y))
+                missing.append((key, url))
+        return missing
+
+    def seed(self, provider, url_template, bounds, zoom):
+        """
+        Downloads the missing tiles of bounds (lon_min, lat_min, lon_max, lat_max) at a zoom level.
+
+        Returns:
+            bool: True if every tile is in the cache afterwards.
+        """
+        # Make room before seeding, so the tiles of this map are never evicted right away
+        self.disk_cache.evict()
+
+        missing = self.missing_tiles(provider, url_template, bounds, zoom)
+        if not missing:
+            return True
+
+        # The download threads count their requests for the map being built on this thread
+        profiler = current_profiler()
+        workers = min(self.workers, MAX_CONNECTIONS.get(tile_host(url_template), self.workers))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            downloads = list(pool.map(lambda entry: (entry[0], fetch_url(entry[1], profiler)), missing))
+
+        complete = True
+        for key, data in downloads:
+            if data:
+                self.disk_cache.put(provider, key, data)
+            else:
+                complete = False
+
+        # The new tiles are the most recently used ones, older tiles go first if the seed outgrew the cache
+        self.disk_cache.evict()
+        QgsMessageLog.logMessage(f"Tile cache {provider}: {len(missing)} tiles requested, complete: {complete}",
+                                 "MapCraft", Qgis.Info)
+        return complete
+
+    def seed_extent(self, provider, url_template, extent, scale, zmax=19, dpi=300, wait=True):
+        """
+        Seeds the tiles of a map extent at the zoom level matching the print scale.
+
+        Args:
+            extent (QgsReferencedRectangle): Map extent with its CRS.
+            wait (bool): Block until the tiles are downloaded. Otherwise missing tiles are seeded in a background
+                thread for the next export (not for servers without bulk downloads) and None is returned at once.
+
+        Returns:
+            int or None: The seeded zoom level, or None if some tiles are not in the cache.
+        """
+        to_wgs84 = QgsCoordinateTransform(extent.crs(), QgsCoordinateReferenceSystem("EPSG:4326"),
+                                          QgsProject.instance())
+        wgs84 = to_wgs84.transformBoundingBox(extent)
+        zoom = zoom_for_scale(scale, wgs84.center().y(), dpi, zmax)
+        bounds = (wgs84.xMinimum(), wgs84.yMinimum(), wgs84.xMaximum(), wgs84.yMaximum())
+        if wait:
+            return zoom if self.seed(provider, url_template, bounds, zoom) else None
+
+        if not self.missing_tiles(provider, url_template, bounds, zoom):
+            return zoom
+        if bulk_download_allowed(url_template):
+            if self.background is None:
+                self.background = ThreadPoolExecutor(max_workers=1)
+            self.background.submit(self.seed, provider, url_template, bounds, zoom)
+        return None
@@ -0,0 +1,197 @@
+import os
+import math
+import time
+import hashlib
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from osgeo import gdal
+from qgis.core import QgsSettings, QgsMessageLog, Qgis
+from qgis.PyQt.QtCore import Qt, QBuffer, QByteArray, QIODevice
+from qgis.PyQt.QtGui import QImage, QPainter
+from .cache import DiskCache, cache_root, fetch_url
+from .profiling import current_profiler
+
+# Largest GetMap image requested at once, most state services reject bigger requests
+MAX_REQUEST_PIXELS = 2048
+
+# Seconds a GetCapabilities answer is reused by WmsCache.layer_available before the service is asked again
+CAPABILITIES_TTL = 3600
+
+
+def getmap_url(wms_url, layer_name, crs, bbox, width, height, dpi):
+    """
+    Builds a WMS 1.3.0 GetMap URL. bbox is (xmin, ymin, xmax, ymax) in a projected CRS (easting/northing axis order).
+    """
+    params = {
+        "SERVICE": "WMS",
+        "VERSION": "1.3.0",
+        "REQUEST": "GetMap",
+        "LAYERS": layer_name,
+        "STYLES": "",
+        "CRS": crs,
+        "BBOX": ",".join(f"{value:.3f}" for value in bbox),
+        "WIDTH": width,
+        "HEIGHT": height,
+        "FORMAT": "image/png",
+        # Vendor DPI parameters, the same ones QGIS sends with dpiMode=7
+        "DPI": dpi,
+        "MAP_RESOLUTION": dpi,
+        "FORMAT_OPTIONS": f"dpi:{dpi}",
+    }
+    base_url = wms_url.rstrip("?&")
+    separator = "&" if "?" in base_url else "?"
+    return f"{base_url}{separator}{urlencode(params)}"
+
+
+def capabilities_url(wms_url):
+    """
+    Builds the WMS 1.3.0 GetCapabilities URL of a service.
+    """
+    base_url = wms_url.rstrip("?&")
+    separator = "&" if "?" in base_url else "?"
+    return f"{base_url}{separator}{urlencode({'SERVICE': 'WMS', 'VERSION': '1.3.0', 'REQUEST': 'GetCapabilities'})}"
+
+
+def wms_layer_available(wms_url, layer_name):
+    """
+    Checks that a WMS answers GetCapabilities and announces layer_name. Safe to call from worker threads.
+
+    Returns:
+        bool: True if the layer is offered by the service.
+    """
+    data = fetch_url(capabilities_url(wms_url))
+    if not data:
+        return False
+    return f"<Name>{layer_name}</Name>".encode("utf-8") in data
+
+
+def georeference(image, bbox, crs):
+    """
+    Converts a QImage covering bbox into GeoTIFF bytes.
+    """
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+
+    png_path = f"/vsimem/mapcraft_{id(image)}.png"
+    tif_path = f"/vsimem/mapcraft_{id(image)}.tif"
+    gdal.FileFromMemBuffer(png_path, bytes(data))
+    try:
+        xmin, ymin, xmax, ymax = bbox
+        gdal.Translate(tif_path, png_path, format="GTiff", outputBounds=[xmin, ymax, xmax, ymin],
+                       outputSRS=crs, creationOptions=["COMPRESS=DEFLATE", "TILED=YES"])
+        handle = gdal.VSIFOpenL(tif_path, "rb")
+        size = gdal.VSIStatL(tif_path).size
+        content = gdal.VSIFReadL(1, size, handle)
+        gdal.VSIFCloseL(handle)
+        return content
+    finally:
+        gdal.Unlink(png_path)
+        gdal.Unlink(tif_path)
+
+
+class WmsCache:
+    """
+    On-disk cache of rendered WMS map frames, stored as GeoTIFF.
+
+    Entries are keyed by (endpoint, layer name, CRS, bbox, size, DPI) and grouped per state, so
+    the images of one state can be invalidated when its service changes.
+    """
+
+    def __init__(self, disk_cache, workers=4):
+        self.disk_cache = disk_cache
+        self.workers = workers
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Creates the WMS cache configured in the QGIS settings, or returns None when it is disabled.
+        MapCraft/wms_cache/enabled, /max_mb (default 4096) and /ttl_days (default 90).
+        """
+        settings = QgsSettings()
+        if not settings.value("MapCraft/wms_cache/enabled", True, type=bool):
+            return None
+        max_mb = settings.value("MapCraft/wms_cache/max_mb", 4096, type=int)
+        ttl_days = settings.value("MapCraft/wms_cache/ttl_days", 90, type=int)
+        disk_cache = DiskCache(os.path.join(cache_root(), "wms"), max_mb * 1024 ** 2, ttl_days * 24 * 3600)
+        return cls(disk_cache)
+
+    @staticmethod
+    def cache_key(wms_url, layer_name, crs, bbox, width, height, dpi):
+        request = "|".join([wms_url, layer_name, crs, ",".join(f"{value:.3f}" for value in bbox),
+                            str(width), str(height), str(dpi)])
+        return hashlib.sha1(request.encode("utf-8")).hexdigest() + ".tif"
+
+    def get_image(self, namespace, wms_url, layer_name, crs, bbox, width, height, dpi):
+        """
+        Returns a GeoTIFF of the requested map frame, downloading it on a cache miss.
+
+        Returns:
+            str or None: Path of the cached GeoTIFF, or None if the service did not deliver every part.
+        """
+        key = self.cache_key(wms_url, layer_name, crs, bbox, width, height, dpi)
+        path = self.disk_cache.get(namespace, key)
+        if path:
+            return path
+
+        self.disk_cache.evict()
+
+        # Split big frames into requests the services accept
+        xmin, ymin, xmax, ymax = bbox
+        x_res = (xmax - xmin) / width
+        y_res = (ymax - ymin) / height
+        parts = []
+        for row in range(math.ceil(height / MAX_REQUEST_PIXELS)):
+            for col in range(math.ceil(width / MAX_REQUEST_PIXELS)):
+                px = col * MAX_REQUEST_PIXELS
+                py = row * MAX_REQUEST_PIXELS
+                part_width = min(MAX_REQUEST_PIXELS, width - px)
+                part_height = min(MAX_REQUEST_PIXELS, height - py)
+                part_bbox = (xmin + px * x_res, ymax - (py + part_height) * y_res,
+                             xmin + (px + part_width) * x_res, ymax - py * y_res)
+                parts.append((px, py, getmap_url(wms_url, layer_name, crs, part_bbox, part_width, part_height, dpi)))
+
+        # The download threads count their requests for the map being built on this thread
+        profiler = current_profiler()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            downloads = list(pool.map(lambda part: (part[0], part[1], fetch_url(part[2], profiler)), parts))
+
+        image = QImage(width, height, QImage.Format_ARGB32)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        try:
+            for px, py, data in downloads:
+                part_image = QImage.fromData(data) if data else QImage()
+                if part_image.isNull():  # Network error or a ServiceException XML document
+                    QgsMessageLog.logMessage(f"WMS {layer_name}: no image for part at {px}/{py}", "MapCraft", Qgis.Info)
+                    return None
+                painter.drawImage(px, py, part_image)
+        finally:
+            painter.end()
+
+        return self.disk_cache.put(namespace, key, georeference(image, bbox, crs))
+
+    def layer_available(self, wms_url, layer_name):
+        """
+        Like wms_layer_available(), but a service that announced the layer within the last CAPABILITIES_TTL
+        seconds is not asked again, so a batch checks every state service once. Safe to call from worker threads.
+        """
+        key = hashlib.sha1(capabilities_url(wms_url).encode("utf-8")).hexdigest() + ".xml"
+        path = self.disk_cache.get("capabilities", key)
+        if path and time.time() - os.path.getmtime(path) < CAPABILITIES_TTL:
+            with open(path, 'rb') as f:
+                return f"<Name>{layer_name}</Name>".encode("utf-8") in f.read()
+
+        data = fetch_url(capabilities_url(wms_url))
+        available = bool(data) and f"<Name>{layer_name}</Name>".encode("utf-8") in data
+        if available:  # Failures are not kept, the next map asks again
+            self.disk_cache.put("capabilities", key, data)
+        return available
+
+    def invalidate(self, namespace=None):
+        """
+        Removes the cached images of one state, or all of them when namespace is None.
+        """
+        self.disk_cache.invalidate(namespace)